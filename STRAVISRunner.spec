@@ -1,5 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# One-folder build: dist/STRAVISRunner/STRAVISRunner.exe next to its libraries. A onefile EXE
+# unpacks the whole bundle to a temp dir on every launch (and again for its worker process);
+# ship the folder instead. No UPX either: compressed DLLs are unpacked in memory at every load
+# and make virus scanners look twice. Measure with: python bench.py startup --exe dist/STRAVISRunner/STRAVISRunner.exe
 
+# not used by the GUI or its worker: pyautogui's stack (keys go through keyinput.py),
+# consolidate.py's readers and what other installed packages may drag in
+EXCLUDES = [
+    'pyautogui', 'pyscreeze', 'pymsgbox', 'pytweening', 'mouseinfo', 'pyperclip', 'pygetwindow', 'pyrect',
+    'openpyxl', 'pyarrow', 'numpy', 'pandas', 'matplotlib', 'IPython', 'streamlit', 'gradio', 'pytest',
+]
 
 a = Analysis(
     ['app_gui.py'],
@@ -10,7 +21,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     noarchive=False,
     optimize=0,
 )
@@ -19,16 +30,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='STRAVISRunner',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +44,11 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='STRAVISRunner',
+)
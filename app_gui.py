@@ -1,49 +1,19 @@
-import os
-import time
-import tkinter as tk
 import multiprocessing as mp
-from tkinter import ttk, messagebox
-
-from script_core import run_automation  # your existing automation
-
-
-ALL_ENTITIES = [
-    "D341_HSO_HGM", "D342_HSO_HGMD", "CC41_HSO_HMIN", "C741_HSO_HMSH",
-    "AN41_HSO_HMSP", "D941_HSO_HMSZ", "J34V_HSO_HOME", "EM41_HSO_HSEU",
-    "A441_HSO_HSOT", "WB41_HSOU", "D841_HSO_HSOK", "CY41_HSO_INNOVIA",
-    "WM41_HSO_MID LAB INC", "GG41_HSO_FRITZ RUCK", "GH41_HSO_EOS",
-]
-
-DEFAULT_SELECTED = [
-    "D341_HSO_HGM", "D342_HSO_HGMD", "CC41_HSO_HMIN", "C741_HSO_HMSH",
-    "AN41_HSO_HMSP", "D941_HSO_HMSZ", "J34V_HSO_HOME", "EM41_HSO_HSEU",
-    "A441_HSO_HSOT", "WB41_HSOU", "D841_HSO_HSOK",
-]
-
-
-def downloads_dir() -> str:
-    return os.path.join(os.path.expanduser("~"), "Downloads")
 
+if __name__ == "__main__":
+    # Required for multiprocessing on Windows when frozen (PyInstaller). First, so a frozen
+    # worker process goes straight to its job loop without importing Tk below.
+    mp.freeze_support()
 
-def _worker_entry(target_period, to_deselect, iterations, result_q):
-    """
-    Child process entry point.
-    Initializes COM, waits 3s for focus, runs automation, reports result back to parent via Queue.
-    """
-    try:
-        try:
-            import pythoncom
-            pythoncom.CoInitialize()
-        except Exception:
-            # If pywin32 not available or COM init fails, still try to run; parent will show error if needed
-            pythoncom = None  # noqa: F841
+import os
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
 
-        time.sleep(3)
-        # Hardcode Shift+Down rows to 20 (same as before)
-        run_automation(target_period, to_deselect, select_n=20, iterations=iterations)
-        result_q.put(("ok", "Automation finished without raising errors."))
-    except Exception as e:
-        result_q.put(("err", f"Automation failed: {e}"))
+from entities import ALL_ENTITIES, DEFAULT_SELECTED
+from exports import downloads_dir
+from progress import ProgressModel, format_seconds
+from worker_pool import WorkerPool
 
 
 class App(tk.Tk):
@@ -54,15 +24,19 @@ class App(tk.Tk):
         self.geometry("820x600")
         self.resizable(True, True)
 
-        # State for child process & queue
-        self.proc: mp.Process | None = None
+        # Warm worker process (imports, COM ready) waiting for jobs, started once the window is up;
+        # the one running the current job
+        self.pool = WorkerPool()
+        self.worker = None
         self.result_q: mp.Queue | None = None
         self.poll_job = None
+        self.output_dir = downloads_dir()
+        self.progress: ProgressModel | None = None
 
         ttk.Label(self, text="STRAVIS Automation Runner", font=("Segoe UI", 14, "bold")).pack(pady=(12, 2))
         ttk.Label(
             self,
-            text="Fill the inputs, click Run, then immediately switch focus to STRAVIS.",
+            text="Fill the inputs, click Run, then switch to STRAVIS: the run starts once it is in front.",
             foreground="#555"
         ).pack()
 
@@ -73,16 +47,17 @@ class App(tk.Tk):
             foreground="#0a5"
         ).pack(pady=(2, 8))
 
-        # Where files go
-        ttk.Label(
-            self,
-            text=f"ℹ️ All files will be saved into your system's Downloads folder",
-            foreground="#0a5"
-        ).pack(pady=(0, 10))
-
         body = ttk.Frame(self)
         body.pack(fill="both", expand=True, padx=16, pady=10)
 
+        # Where files go (saved as <period>_<entity>_<timestamp>.xlsx)
+        row = ttk.Frame(body)
+        row.pack(fill="x", pady=6)
+        ttk.Label(row, text="Output folder:", width=26).pack(side="left")
+        self.output_dir_var = tk.StringVar(value=downloads_dir())
+        ttk.Entry(row, textvariable=self.output_dir_var, width=48).pack(side="left")
+        ttk.Button(row, text="Browse…", command=self.browse_output_dir).pack(side="left", padx=4)
+
         # Target period
         row = ttk.Frame(body)
         row.pack(fill="x", pady=6)
@@ -128,11 +103,31 @@ class App(tk.Tk):
             command=self._update_run_state
         ).pack(side="left")
 
+        # Resume: skip entities whose export from an earlier (failed) run is still intact
+        resume_row = ttk.Frame(body)
+        resume_row.pack(fill="x", pady=(2, 2))
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            resume_row,
+            text="Resume previous run (skip entities already exported to the output folder)",
+            variable=self.resume_var
+        ).pack(side="left")
+
+        # Progress: bar, entity N of M / throughput / ETA, and the time each entity took
+        prog = ttk.Frame(self)
+        prog.pack(fill="x", padx=16)
+        self.progress_bar = ttk.Progressbar(prog, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(fill="x")
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(prog, textvariable=self.progress_var, foreground="#444").pack(anchor="w", pady=(2, 0))
+        self.durations_list = tk.Listbox(prog, height=4)
+        self.durations_list.pack(fill="x", pady=(2, 0))
+
         # Status + Run/Stop buttons
         bottom = ttk.Frame(self)
         bottom.pack(fill="x", padx=16, pady=12)
 
-        self.status_var = tk.StringVar(value="Ready.")
+        self.status_var = tk.StringVar(value="Starting worker…")
         ttk.Label(bottom, textvariable=self.status_var, foreground="#444").pack(side="left")
 
         btns = ttk.Frame(bottom)
@@ -143,6 +138,8 @@ class App(tk.Tk):
         self.run_btn.pack(side="right")
 
         self._update_run_state()
+        # idle callbacks run after the pending geometry / drawing ones, i.e. once the window shows
+        self.after_idle(self._on_first_draw)
 
         # Close handler to ensure child process is terminated
         self.protocol("WM_DELETE_WINDOW", self._on_close)
@@ -154,6 +151,11 @@ class App(tk.Tk):
         style.configure("TButton", padding=6)
         style.configure("TCheckbutton", padding=2)
 
+    def browse_output_dir(self):
+        path = filedialog.askdirectory(initialdir=self.output_dir_var.get() or downloads_dir())
+        if path:
+            self.output_dir_var.set(path)
+
     # ----- selection helpers -----
     def select_defaults(self):
         for e, v in self.vars.items():
@@ -168,7 +170,28 @@ class App(tk.Tk):
             v.set(False)
 
     def _update_run_state(self):
-        self.run_btn.config(state=("normal" if self.logged_in_var.get() and self.proc is None else "disabled"))
+        self.run_btn.config(state=("normal" if self.logged_in_var.get() and self.worker is None else "disabled"))
+
+    def _on_first_draw(self):
+        probe = os.environ.get("STRAVIS_STARTUP_PROBE")
+        if probe:
+            # bench.py startup: record when the window was drawn and quit
+            self.update_idletasks()
+            with open(probe, "w") as f:
+                f.write(repr(time.time()))
+            self.destroy()
+            return
+        self.pool.start()
+        self._watch_worker()
+
+    def _watch_worker(self):
+        """Status line until the warm worker is ready (runs clicked before that just start later)."""
+        if self.worker is not None:
+            return
+        if self.pool.ready():
+            self.status_var.set(f"Ready (worker warmed up in {self.pool.warm_seconds():.1f}s).")
+        else:
+            self.after(200, self._watch_worker)
 
     # ----- run flow -----
     def on_run(self):
@@ -189,80 +212,118 @@ class App(tk.Tk):
 
         to_deselect = [e for e in ALL_ENTITIES if e not in selected]
         iterations = len(selected)
+        output_dir = self.output_dir_var.get().strip() or downloads_dir()
+        self.output_dir = output_dir
 
         # Final heads-up
         msg = (
-            "After you press OK, you have ~3 seconds to bring STRAVIS to the foreground.\n"
+            "After you press OK, bring STRAVIS to the foreground: the run starts as soon as it is in front.\n"
             "Don't touch mouse/keyboard while it runs.\n"
             "Tip: Move mouse to top-left if you need to abort."
         )
         if not messagebox.askokcancel("Heads up", msg):
             return
 
-        # Spin up child process
-        self.result_q = mp.Queue()
-        self.proc = mp.Process(target=_worker_entry, args=(target_period, to_deselect, iterations, self.result_q))
-        self.proc.daemon = True  # auto-kill with parent if needed
-        self.proc.start()
-
-        self.status_var.set("Starting in 3 seconds… switch to STRAVIS now")
+        # Hand the job to the warm worker
+        self.progress = ProgressModel()
+        self.progress_bar.config(value=0)
+        self.progress_var.set("")
+        self.durations_list.delete(0, "end")
+        self.worker = self.pool.submit(dict(period=target_period, to_deselect=to_deselect, iterations=iterations,
+                                            output_dir=output_dir, resume=self.resume_var.get(),
+                                            clicked=time.time()))
+        self.result_q = self.worker.result_q
+
+        self.status_var.set("Waiting for STRAVIS in the foreground… switch to it now")
         self.run_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
 
         # start polling for completion messages
         self._poll_results()
 
-    def _poll_results(self):
-        # If process ended, try to read final message
-        if self.proc is not None and not self.proc.is_alive():
-            try:
-                kind, msg = (self.result_q.get_nowait() if self.result_q else ("err", "Unknown error"))
-            except Exception:
-                kind, msg = ("err", "Automation process ended unexpectedly.")
-            finally:
-                self._finalize_run(kind, msg)
-            return
-
-        # Process still running — check queue non-blocking
-        if self.result_q is not None:
+    def _drain(self):
+        """Apply every queued progress batch; returns the final (kind, msg) if it has arrived."""
+        while self.result_q is not None:
             try:
                 kind, msg = self.result_q.get_nowait()
-                # Got a result even though proc might still be alive — finalize and ensure process is gone
-                self._finalize_run(kind, msg)
-                return
             except Exception:
-                pass
+                return None
+            if kind != "progress":
+                return kind, msg
+            started, paused = self.progress.start_latency(), self.progress.paused
+            for event in msg:
+                self.progress.update(event)
+            if started is None and self.progress.start_latency() is not None:
+                to_first, waited = self.progress.start_latency()
+                self.status_var.set(f"Running: started {to_first:.2f}s after Run "
+                                    f"({waited:.2f}s of it waiting for STRAVIS to be in front)")
+            if self.progress.paused and self.progress.paused != paused:
+                self.bell()  # the run waits for the user
+            self._show_progress()
+
+    def _show_progress(self):
+        p = self.progress
+        for entity, seconds, state in p.durations[self.durations_list.size():]:
+            self.durations_list.insert("end", f"{entity}  {seconds:.1f}s  {state}")
+            self.durations_list.see("end")
+        self.progress_bar.config(value=p.fraction())
+        parts = [f"Entity {min(p.done + p.failed + 1, p.total)} of {p.total}" if p.total else "Starting…"]
+        if p.paused:
+            parts.insert(0, f"PAUSED: close the '{p.paused}' dialog in STRAVIS")
+        if p.current:
+            parts.append(p.current)
+        elif p.step:
+            parts.append(f"step: {p.step}")
+        rate = p.throughput()
+        if rate:
+            parts.append(f"{rate:.1f}/min")
+        parts.append(f"ETA {format_seconds(p.eta())}")
+        if p.failed:
+            parts.append(f"{p.failed} failed")
+        if p.retries:
+            parts.append(f"{p.retries} retries")
+        if p.dialogs:
+            parts.append(f"{p.dialogs} dialogs handled")
+        self.progress_var.set("  ·  ".join(parts))
+
+    def _poll_results(self, ended=False):
+        result = self._drain()
+        # If process ended, the final message must already be queued
+        if result is None and self.worker is not None and not self.worker.alive():
+            if not ended:
+                # the queue's feeder may still be flushing the last message: one more look in 100ms
+                self.poll_job = self.after(100, self._poll_results, True)
+                return
+            result = ("err", "Automation process ended unexpectedly.")
+        if result is not None:
+            # Got the final result — finalize; the worker stays up for the next run
+            self._finalize_run(*result)
+            return
 
         # keep polling ~200ms
         self.poll_job = self.after(200, self._poll_results)
 
     def on_stop(self):
-        if self.proc is None:
+        if self.worker is None:
             return
         if messagebox.askokcancel("Stop automation", "Are you sure you want to stop the automation now?"):
             try:
                 if self.poll_job:
                     self.after_cancel(self.poll_job)
                     self.poll_job = None
-                if self.proc.is_alive():
-                    self.proc.terminate()
-                    self.proc.join(timeout=2)
+                # the only way to interrupt the flow; a fresh worker warms up in its place
+                self.pool.replace(self.worker)
             finally:
                 self._finalize_run("err", "Automation stopped by user.")
 
     def _finalize_run(self, kind: str, message: str):
-        # Clean up process & polling
+        # Clean up polling; the worker goes back to waiting for the next job
         if self.poll_job:
             self.after_cancel(self.poll_job)
             self.poll_job = None
-        if self.proc:
-            try:
-                if self.proc.is_alive():
-                    self.proc.terminate()
-                self.proc.close()
-            except Exception:
-                pass
-        self.proc = None
+        if self.worker is not None and self.worker in self.pool.workers:
+            self.pool.release(self.worker)
+        self.worker = None
         self.result_q = None
 
         self.status_var.set(message)
@@ -273,29 +334,27 @@ class App(tk.Tk):
             # Completed popup with option to open Downloads
             if messagebox.askyesno(
                 "Downloads complete",
-                f"{message}\n\nFiles should be in:\n{downloads_dir()}\n\nOpen the folder now?"
+                f"{message}\n\nFiles should be in:\n{self.output_dir}\n\nOpen the folder now?"
             ):
                 try:
-                    os.startfile(downloads_dir())
+                    os.startfile(self.output_dir)
                 except Exception:
-                    messagebox.showinfo("Note", f"Could not open folder. Please navigate to:\n{downloads_dir()}")
+                    messagebox.showinfo("Note", f"Could not open folder. Please navigate to:\n{self.output_dir}")
             else:
                 messagebox.showinfo("Done", message)
         else:
             # Error / Stopped
-            messagebox.showerror("Automation ended", message)
+            messagebox.showerror("Automation ended",
+                                 f"{message}\n\nTick 'Resume previous run' to export only what is missing.")
 
     def _on_close(self):
-        # Ensure child process is killed on exit
+        # Ensure worker processes are gone on exit
         try:
-            if self.proc and self.proc.is_alive():
-                self.proc.terminate()
+            self.pool.close()
         except Exception:
             pass
         self.destroy()
 
 
 if __name__ == "__main__":
-    # Required for multiprocessing on Windows when frozen (PyInstaller)
-    mp.freeze_support()
     App().mainloop()
\ No newline at end of file
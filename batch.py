@@ -0,0 +1,168 @@
+"""
+Batch mode: export a matrix of periods x entity sets in one STRAVIS session.
+
+The jobs are ordered so that consecutive jobs share as much as possible, and each
+job only repeats the navigation steps that differ from the previous one:
+
+  navigate  - Node1 double-click + Base List/Data Input (first job only)
+  period    - AY...(YTD) entry, Clear, search and select the period
+  entities  - Organization Open, select all, deselect the excluded codes
+  display   - Display, Period/Edition switch, Show books (every job)
+
+    python batch.py --period 2025.01 2025.02 2025.03 --include default
+    python batch.py --period 2025.03 --include default --include D341_HSO_HGM,D342_HSO_HGMD --dry-run
+    python batch.py --period 2025.01 2025.02 --include default --output-dir C:\\exports --resume
+
+Workbooks of closed periods come from the export cache when it has them (export_cache.py).
+"""
+import argparse
+import collections
+
+from entities import ALL_ENTITIES, DEFAULT_SELECTED
+from exports import DEFAULT_NAME_TEMPLATE
+
+Job = collections.namedtuple('Job', 'period to_deselect iterations')
+
+STEPS = ('navigate', 'period', 'entities', 'display')
+
+# rough seconds per step; only used to pick the cheaper job order
+STEP_SECONDS = {'navigate': 15.0, 'period': 4.0, 'entities': 3.0, 'display': 6.0}
+DESELECT_SECONDS = 2.0
+
+
+def make_job(period, include, all_entities=ALL_ENTITIES):
+    """Job for exporting `include` (codes to keep selected) for one period."""
+    unknown = [e for e in include if e not in all_entities]
+    if unknown:
+        raise ValueError(f"Unknown entities: {', '.join(unknown)}")
+    to_deselect = tuple(e for e in all_entities if e not in include)
+    return Job(period, to_deselect, len(include))
+
+
+def exported_entities(job, all_entities=ALL_ENTITIES):
+    """Entities whose rows the job exports, in report (Organization list) order."""
+    return [e for e in all_entities if e not in job.to_deselect][:job.iterations]
+
+
+def resume_jobs(jobs, is_done, all_entities=ALL_ENTITIES):
+    """
+    Jobs reduced to what is still missing: entities for which is_done(period, entity) holds
+    are deselected too, and jobs with nothing left are dropped.
+    """
+    remaining = []
+    for job in jobs:
+        done = [e for e in exported_entities(job, all_entities) if is_done(job.period, e)]
+        if len(done) < job.iterations:
+            remaining.append(Job(job.period, tuple(job.to_deselect) + tuple(done), job.iterations - len(done)))
+    return remaining
+
+
+def _entity_key(job):
+    return frozenset(job.to_deselect)
+
+
+def _grouped(jobs, first, second):
+    """Jobs ordered by `first` then `second`, keeping first-seen order within each."""
+    order = collections.OrderedDict()
+    for job in jobs:
+        order.setdefault(first(job), collections.OrderedDict()).setdefault(second(job), []).append(job)
+    return [job for inner in order.values() for group in inner.values() for job in group]
+
+
+def steps_after(prev, job):
+    """Steps `job` needs when the session last ran `prev` (None: nothing yet, or state unknown)."""
+    if prev is None:
+        return STEPS
+    steps = []
+    if job.period != prev.period:
+        steps.append('period')
+    if _entity_key(job) != _entity_key(prev):
+        steps.append('entities')
+    steps.append('display')
+    return tuple(steps)
+
+
+def _with_steps(ordered):
+    planned, prev = [], None
+    for job in ordered:
+        planned.append((job, steps_after(prev, job)))
+        prev = job
+    return planned
+
+
+def _step_seconds(job, step):
+    extra = DESELECT_SECONDS * len(job.to_deselect) if step == 'entities' else 0.0
+    return STEP_SECONDS[step] + extra
+
+
+def estimated_seconds(planned):
+    return sum(_step_seconds(job, step) for job, steps in planned for step in steps)
+
+
+def plan_jobs(jobs):
+    """[(job, steps)] in execution order: period-major or entity-set-major, whichever is cheaper."""
+    if not jobs:
+        return []
+    by_period = _with_steps(_grouped(jobs, lambda j: j.period, _entity_key))
+    by_entities = _with_steps(_grouped(jobs, _entity_key, lambda j: j.period))
+    return min(by_period, by_entities, key=estimated_seconds)
+
+
+def plan_summary(planned):
+    """Steps run vs. what running every job from scratch would need."""
+    naive = [(job, STEPS) for job, _ in planned]
+    run = sum(len(steps) for _, steps in planned)
+    return {
+        'jobs': len(planned),
+        'steps_run': run,
+        'steps_saved': len(STEPS) * len(planned) - run,
+        'seconds_saved_est': round(estimated_seconds(naive) - estimated_seconds(planned), 1),
+    }
+
+
+def _parse_include(spec):
+    if spec == 'default':
+        return list(DEFAULT_SELECTED)
+    if spec == 'all':
+        return list(ALL_ENTITIES)
+    return [e.strip() for e in spec.split(',') if e.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--period', nargs='+', required=True, help="periods as YYYY.MM")
+    parser.add_argument('--include', action='append', required=True,
+                        help="entity set to export: comma-separated codes, 'default' or 'all' (repeatable)")
+    parser.add_argument('--output-dir', help='save workbooks directly here (default: Downloads via the side panel)')
+    parser.add_argument('--name-template', default=DEFAULT_NAME_TEMPLATE,
+                        help='file name with {period}, {entity}, {timestamp}, {index} (default: %(default)s)')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip entities the run manifest shows as already exported (and still intact)')
+    parser.add_argument('--cache', help='export cache folder to serve and store workbooks in '
+                                        '(default: $STRAVIS_CACHE, else no cache; see export_cache.py)')
+    parser.add_argument('--trace', help='write per-step timing spans to this JSONL file (see tracing.py)')
+    parser.add_argument('--record', help='record the session timeline for offline replay (see recording.py)')
+    parser.add_argument('--timing', help="timing profile to learn pause lengths in (default: this host's, see timing.py; "
+                                         "'off' for the fixed pauses)")
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without touching STRAVIS')
+    args = parser.parse_args(argv)
+
+    jobs = [make_job(period, _parse_include(spec)) for period in args.period for spec in args.include]
+    if args.dry_run and args.resume:
+        from exports import downloads_dir
+        from manifest import RunManifest, manifest_path
+        jobs = resume_jobs(jobs, RunManifest(manifest_path(args.output_dir or downloads_dir())).verify)
+    planned = plan_jobs(jobs)
+    if args.dry_run:
+        for job, steps in planned:
+            print(f"{job.period}  {job.iterations:>2} entities  {', '.join(steps)}")
+        print(plan_summary(planned))
+        return
+
+    from script_core import run_batch
+    run_batch(jobs, args.output_dir, args.name_template, resume=args.resume, trace=args.trace,
+              record=args.record, timing_profile=args.timing, cache=args.cache)
+
+
+if __name__ == '__main__':
+    main()
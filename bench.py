@@ -0,0 +1,843 @@
+"""
+Local benchmarks for the STRAVIS automation, run against the in-memory fake tree
+(fake_uia.py) so they work on any machine without STRAVIS.
+
+    python bench.py waits [--scale 0.02]
+    python bench.py locators [--iterations 11]
+    python bench.py snapshot [--latency-us 50]
+    python bench.py events [--trials 10]
+    python bench.py search [--sizes 1000 10000 100000]
+    python bench.py export-watch [--rates 0.5 2 8]
+    python bench.py consolidate [--files 40 --rows 2000]   (needs openpyxl; pyarrow for parquet)
+    python bench.py tracing [--calls 200000]
+    python bench.py sim [--latency fast --entities 3 --tree-size 2000]   (full run_automation; fixed sleeps run in real time)
+    python bench.py sim --fault D342_HSO_HGMD:stuck   (an export that fails once; recovered and retried)
+    python bench.py replay session.rec.jsonl.gz   (run_automation against a recorded session's timing)
+    python bench.py timing [--runs 3 --entities 2]   (sim runs sharing one fresh timing profile)
+    python bench.py shards [--workers 3 --slow 1]   (one export over several simulated sessions)
+    python bench.py warm [--foreground-after 0.5]   (Run -> first action, cold process vs warm worker)
+    python bench.py startup [--exe dist/STRAVISRunner/STRAVISRunner.exe]   (import times, time to first window)
+    python bench.py cache [--entities 3]   (repeat requests for a closed and an open period, export cache on)
+    python bench.py dialogs [--faults error_box notice]   (unexpected dialogs, without and with dialog_watchdog.py)
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import fake_uia
+from fake_uia import FakeControl, FakeDesktop, build_stravis
+from locator_cache import LocatorCache
+from snapshots import safe_snapshot, fingerprint, fingerprint_changed
+from uia_events import events, FakeEventSource
+from tree_search import find_first, python_bfs_find
+from export_watcher import ExportWatcher
+import tracing
+import keyinput
+from readiness import wait_ready, window_present, window_gone, tab_selected, button_enabled, grid_populated
+
+# blind sleeps the per-entity loop used to burn: after press_open, around click_save_as_excel
+OLD_ENTITY_SLEEPS = (20, 2, 1, 1)
+
+# STRAVIS response times in seconds: report render, Save As appear, Save As close
+LATENCY_PROFILES = {
+    'fast':    {'render': 2.0, 'dialog': 0.5, 'save': 0.3},
+    'typical': {'render': 6.0, 'dialog': 1.0, 'save': 0.8},
+    'slow':    {'render': 15.0, 'dialog': 2.5, 'save': 2.0},
+}
+
+
+# ------------- waits -------------
+
+def _iteration_fixed(lat, scale):
+    # blind sleeps, then the dialog open/close that the old flow still had to wait out
+    time.sleep((sum(OLD_ENTITY_SLEEPS) + lat['dialog'] + lat['save']) * scale)
+
+
+def _iteration_ready(desktop, stravis, lat, scale):
+    # polling intervals are compressed with the rest of the simulated time
+    backoff = {'initial': 0.05 * scale, 'max_interval': 0.5 * scale}
+    parts = stravis.parts
+    grid = parts['grid']
+    parts['report'].add(grid.show(after=lat['render'] * scale))
+    wait_ready(grid_populated(stravis), timeout=20 * scale, required=False, **backoff)
+    wait_ready(tab_selected(stravis, 'Operation'), timeout=10 * scale, **backoff)
+    wait_ready(button_enabled(stravis, 'Save As Excel'), timeout=3 * scale, required=False, **backoff)
+
+    save_as = FakeControl('WindowControl', 'Save As', children=[FakeControl('ButtonControl', 'Save')])
+    desktop.add(save_as.show(after=lat['dialog'] * scale))
+    wait_ready(window_present(desktop, 'Save As'), timeout=8 * scale, **backoff)
+    save_as.hide(after=lat['save'] * scale)
+    wait_ready(window_gone(desktop, 'Save As'), timeout=10 * scale, **backoff)
+
+    desktop.remove(save_as)
+    parts['report'].remove(grid)
+
+
+def cmd_waits(args):
+    scale = args.scale
+    print(f"per-entity wait time, STRAVIS seconds (scale={scale}, {args.iterations} iterations)")
+    print(f"{'profile':<10}{'latency':>10}{'fixed':>10}{'readiness':>12}{'queries':>10}")
+    for name, lat in LATENCY_PROFILES.items():
+        desktop, stravis = build_stravis()
+        stravis.parts['op_tab'].selected = True
+
+        t0 = time.perf_counter()
+        for _ in range(args.iterations):
+            _iteration_fixed(lat, scale)
+        fixed = (time.perf_counter() - t0) / args.iterations / scale
+
+        desktop.stats.clear()
+        t0 = time.perf_counter()
+        for _ in range(args.iterations):
+            _iteration_ready(desktop, stravis, lat, scale)
+        ready = (time.perf_counter() - t0) / args.iterations / scale
+        queries = sum(desktop.stats.values()) // args.iterations
+
+        print(f"{name:<10}{sum(lat.values()):>10.1f}{fixed:>10.1f}{ready:>12.1f}{queries:>10}")
+
+
+# ------------- locators -------------
+
+def _entity_lookups(stravis, get):
+    # the ribbon walks done by switch_ribbon_tab / wait_until_tab_active / click_save_as_excel / click_operation_close
+    ribbon = get(('ribbon',), lambda: stravis.PaneControl(Name='The Ribbon', searchDepth=10))
+    tabs = get(('tabs',), lambda: ribbon.TabControl(Name='Ribbon Tabs', searchDepth=10))
+    get(('tab', 'Operation'), lambda: tabs.TabItemControl(Name='Operation', searchDepth=5))
+    op = get(('pane', 'Operation'), lambda: ribbon.PaneControl(Name='Lower Ribbon', searchDepth=8)
+             .PaneControl(Name='Operation', searchDepth=8))
+    get(('button', 'Save As Excel'), lambda: op.ToolBarControl(Name='File', searchDepth=6)
+        .ButtonControl(Name='Save As Excel', searchDepth=3))
+    get(('button', 'Close'), lambda: op.ButtonControl(Name='Close', searchDepth=20))
+
+
+def cmd_locators(args):
+    print(f"ribbon lookups over {args.iterations} entity iterations (x6 per iteration)")
+    print(f"{'mode':<10}{'searches':>10}{'visited':>10}{'ms':>8}  cache")
+    for mode in ('uncached', 'cached'):
+        desktop, stravis = build_stravis()
+        # pad the ribbon so deep searches cost what they do in STRAVIS
+        for i in range(args.padding):
+            stravis.parts['ribbon'].add(FakeControl('PaneControl', f'Group {i}', children=[
+                FakeControl('ButtonControl', f'Button {i}.{j}') for j in range(8)]), index=0)
+        cache = LocatorCache(freeze=lambda ctrl: ctrl.Element)
+        get = cache.get if mode == 'cached' else (lambda key, resolve: resolve().Element)
+        desktop.stats.clear()
+        t0 = time.perf_counter()
+        for i in range(args.iterations):
+            _entity_lookups(stravis, get)
+            if i % 4 == 3:
+                # simulate STRAVIS rebuilding the Lower Ribbon when a report is closed
+                lower = stravis.parts['ribbon'].children[-1]
+                lower.remove(lower.children[0])
+                lower.add(FakeControl('PaneControl', 'Operation', children=[
+                    FakeControl('ToolBarControl', 'File', children=[FakeControl('ButtonControl', 'Save As Excel')]),
+                    FakeControl('ButtonControl', 'Close')]))
+        ms = (time.perf_counter() - t0) * 1000
+        info = cache.stats() if mode == 'cached' else ''
+        print(f"{mode:<10}{desktop.stats['searches']:>10}{desktop.stats['nodes_visited']:>10}{ms:>8.1f}  {info}")
+
+
+# ------------- snapshot -------------
+
+def _per_poll(fn, polls):
+    t0 = time.perf_counter()
+    for _ in range(polls):
+        fn()
+    return (time.perf_counter() - t0) / polls
+
+
+def cmd_snapshot(args):
+    fake_uia.CALL_LATENCY = args.latency_us / 1e6
+    print(f"cost of one wait_for_change poll on an unchanged root "
+          f"(simulated {args.latency_us:g} us per cross-process call)")
+    print(f"{'children':>9}{'safe_snapshot ms':>18}{'fingerprint ms':>16}{'us/child':>10}{'calls':>12}")
+    for n in args.children:
+        root = FakeControl('WindowControl', 'STRAVIS', children=[
+            FakeControl('PaneControl', f'Pane {i}', children=[FakeControl('TextControl', 'x')]) for i in range(n)])
+        FakeDesktop(root)
+        before = safe_snapshot(root)
+        root.stats.clear()
+        legacy = _per_poll(lambda: safe_snapshot(root) != before, args.polls)
+        legacy_calls = sum(root.stats.values()) // args.polls
+
+        baseline = fingerprint(root, depth=1)
+        root.stats.clear()
+        fast = _per_poll(lambda: fingerprint_changed(root, baseline, depth=1), args.polls)
+        fast_calls = sum(root.stats.values()) // args.polls
+        print(f"{n:>9}{legacy * 1000:>18.2f}{fast * 1000:>16.3f}{fast * 1e6 / n:>10.2f}"
+              f"{f'{legacy_calls}->{fast_calls}':>12}")
+    fake_uia.CALL_LATENCY = 0.0
+
+
+# ------------- events -------------
+
+def _dialog_round_trip(desktop, delay, **wait_kwargs):
+    """Save As opens after `delay` s; returns (seconds late noticing it opened, seconds late noticing it closed)."""
+    save_as = FakeControl('WindowControl', 'Save As')
+    t_open = time.monotonic() + delay
+    desktop.add(save_as.show(after=delay))
+    wait_ready(window_present(desktop, 'Save As'), timeout=5, **wait_kwargs)
+    late_open = time.monotonic() - t_open
+
+    t_close = time.monotonic() + delay
+    save_as.hide(after=delay)
+    wait_ready(window_gone(desktop, 'Save As'), timeout=5, **wait_kwargs)
+    late_close = time.monotonic() - t_close
+    desktop.remove(save_as)
+    return late_open, late_close
+
+
+def cmd_events(args):
+    fake_uia.CALL_LATENCY = args.latency_us / 1e6
+    rng = random.Random(1)
+    delays = [rng.uniform(0.2, 1.2) for _ in range(args.trials)]
+    modes = (
+        # the old helpers: fixed 0.2 s polls of the tree
+        ('polling 0.2s', False, {'initial': 0.2, 'max_interval': 0.2}),
+        # event-driven, with slow polls as the fallback
+        ('events', True, {'initial': 0.5, 'max_interval': 2.0}),
+    )
+    print(f"Save As open/close detection over {args.trials} trials "
+          f"(simulated {args.latency_us:g} us per cross-process call)")
+    print(f"{'mode':<14}{'mean late ms':>14}{'max late ms':>13}{'cpu ms':>9}{'tree calls':>12}")
+    for label, use_events, kwargs in modes:
+        desktop, _ = build_stravis()
+        if use_events:
+            events.start(FakeEventSource(desktop))
+        desktop.stats.clear()
+        lates = []
+        cpu0 = time.process_time()
+        try:
+            for d in delays:
+                lates.extend(_dialog_round_trip(desktop, d, **kwargs))
+        finally:
+            events.stop()
+        cpu = time.process_time() - cpu0
+        calls = desktop.stats['searches'] + desktop.stats['exists']
+        print(f"{label:<14}{statistics.mean(lates) * 1000:>14.1f}{max(lates) * 1000:>13.1f}"
+              f"{cpu * 1000:>9.1f}{calls:>12}")
+    fake_uia.CALL_LATENCY = 0.0
+
+
+# ------------- search -------------
+
+def _synthetic_tree(n, fanout=8):
+    """Breadth-first filled tree of n nodes with the Downloads DataItem as the very last one."""
+    root = FakeControl('PaneControl', 'Data Panel')
+    FakeDesktop(root)
+    level, count = [root], 1
+    while count < n:
+        nxt = []
+        for parent in level:
+            for _ in range(fanout):
+                if count >= n - 1:
+                    break
+                nxt.append(parent.add(FakeControl('DataItemControl', f'Item {count}', value=f'v{count}')))
+                count += 1
+        if not nxt:
+            break
+        level = nxt
+    level[-1].add(FakeControl('DataItemControl', 'Downloads', value='Downloads'))
+    return root
+
+
+def _legacy_match(target):
+    # what click_save_as_tree_item checked on every node
+    def match(node):
+        if getattr(node, 'ControlTypeName', None) != 'DataItemControl':
+            return False
+        try:
+            val = node.GetValuePattern().Value
+        except Exception:
+            val = None
+        return val == target or node.Name == target
+    return match
+
+
+def cmd_search(args):
+    fake_uia.CALL_LATENCY = args.latency_us / 1e6
+    print(f"find the Save As 'Downloads' DataItem, worst case position "
+          f"(simulated {args.latency_us:g} us per cross-process call)")
+    print(f"{'nodes':>8}{'python BFS s':>14}{'calls':>9}{'find_first s':>14}{'calls':>7}{'bounded s':>11}")
+    for n in args.sizes:
+        root = _synthetic_tree(n)
+        rows = []
+        for fn in (lambda: python_bfs_find(root, _legacy_match('Downloads')),
+                   lambda: find_first(root, control_type='DataItemControl', name_or_value='Downloads'),
+                   lambda: find_first(root, control_type='DataItemControl', name_or_value='Downloads', max_depth=12)):
+            root.stats.clear()
+            t0 = time.perf_counter()
+            found = fn()
+            rows.append((time.perf_counter() - t0, sum(v for k, v in root.stats.items() if k != 'nodes_visited')))
+            assert found is not None and found.Name == 'Downloads'
+        (bfs, bfs_calls), (first, first_calls), (bounded, _) = rows
+        print(f"{n:>8}{bfs:>14.3f}{bfs_calls:>9}{first:>14.3f}{first_calls:>7}{bounded:>11.3f}")
+    fake_uia.CALL_LATENCY = 0.0
+
+
+# ------------- export-watch -------------
+
+def _write_export(path, size, mb_per_s, chunk=64 * 1024):
+    """Stand-in for Excel: writes `size` bytes to path in chunks at roughly mb_per_s."""
+    delay = chunk / (mb_per_s * 1024 * 1024)
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            n = min(chunk, size - written)
+            f.write(os.urandom(n))
+            f.flush()
+            written += n
+            time.sleep(delay)
+
+
+def cmd_export_watch(args):
+    size = int(args.size_kb * 1024)
+    with tempfile.TemporaryDirectory() as out, ExportWatcher(out, stable_for=args.stable_for) as watcher:
+        print(f"notifier: {watcher.mode}, {args.size_kb:g} KB per file, stable after {args.stable_for}s")
+        print(f"{'MB/s':>6}{'write s':>9}{'detected s':>12}{'lag s':>8}{'bytes':>10}")
+        for rate in args.rates:
+            path = os.path.join(out, f'export_{rate:g}.xlsx')
+            watcher.arm()
+            t0 = time.monotonic()
+            writer = multiprocessing.Process(target=_write_export, args=(path, size, rate))
+            writer.start()
+            export = watcher.wait_for_export(path, timeout=args.timeout)
+            detected = time.monotonic() - t0
+            # how long after the last write the export was reported
+            lag = time.time() - os.stat(path).st_mtime
+            writer.join()
+            assert export.bytes == size, (export.bytes, size)
+            print(f"{rate:>6g}{export.write_seconds:>9.2f}{detected:>12.2f}{lag:>8.2f}{export.bytes:>10}")
+
+
+# ------------- consolidate -------------
+
+def _generate_workbook(path, rows, cols):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Report')
+    ws.append(['Account'] + [f'M{c:02d}' for c in range(1, cols)])
+    for r in range(rows):
+        ws.append([f'ACC{r:05d}'] + [round(random.uniform(-1e6, 1e6), 2) for _ in range(cols - 1)])
+    wb.save(path)
+
+
+def _peak_child_rss_mb():
+    import resource
+    # ru_maxrss is KB on Linux, bytes on macOS; this is the largest single worker process
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def cmd_consolidate(args):
+    from consolidate import consolidate
+    from exports import export_path
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [export_path(tmp, '2025.03', f'E{i:03d}', i) for i in range(args.files)]
+        t0 = time.perf_counter()
+        for p in paths:
+            _generate_workbook(p, args.rows, args.cols)
+        size_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{args.files} workbooks x {args.rows} rows x {args.cols} cols, {size_mb:.1f} MB "
+              f"(generated in {time.perf_counter() - t0:.1f}s)")
+        print(f"{'workers':>8}{'seconds':>9}{'records':>10}{'peak worker MB':>16}")
+        for workers in args.workers:
+            out = os.path.join(tmp, f'out_{workers}.{args.format}')
+            t0 = time.perf_counter()
+            counts = consolidate(paths, out, workers=workers)
+            print(f"{workers:>8}{time.perf_counter() - t0:>9.2f}{sum(counts.values()):>10}{_peak_child_rss_mb():>16.0f}")
+
+
+# ------------- tracing -------------
+
+def cmd_tracing(args):
+    @tracing.traced(args=('depth',))
+    def helper(depth=10):
+        tracing.note('retries')
+        return depth
+
+    def plain(depth=10):
+        return depth
+
+    def per_call(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.calls):
+            fn()
+        return (time.perf_counter() - t0) / args.calls * 1e6
+
+    base = per_call(plain)
+    off = per_call(helper)
+    with tempfile.TemporaryDirectory() as tmp:
+        tracing.start(os.path.join(tmp, 'bench.trace.jsonl'))
+        try:
+            on = per_call(helper)
+        finally:
+            tracing.stop()
+    print(f"per call: plain {base:.2f} us, traced+disabled {off:.2f} us (+{off - base:.2f}), "
+          f"traced+enabled {on:.2f} us")
+
+
+# ------------- sim -------------
+
+def _run_simulated(sim, period, to_deselect, iterations, latency_us=0.0, record=None, timing_profile=None,
+                   nav=None, cache=None):
+    """
+    run_automation against `sim`; returns (wall seconds, trace records). Checks what was exported.
+    Pauses run at their fixed defaults unless a timing_profile file is given; nav='keys' turns
+    off pattern-based navigation (navigation.py); the export cache is off unless a cache folder is given.
+    """
+    import script_core
+    from entities import ALL_ENTITIES
+
+    sim.install()
+    fake_uia.CALL_LATENCY = latency_us / 1e6
+    expected = [e for e in ALL_ENTITIES if e not in to_deselect][:iterations]
+    env = {'STRAVIS_TRACE': None, 'STRAVIS_RECORD': record, 'STRAVIS_TIMING': timing_profile or 'off',
+           'STRAVIS_NAV': nav, 'STRAVIS_CACHE': cache or 'off'}
+    with tempfile.TemporaryDirectory() as out:
+        env['STRAVIS_TRACE'] = os.path.join(out, 'sim.trace.jsonl')
+        for k, v in env.items():
+            if v:
+                os.environ[k] = v
+        t0 = time.perf_counter()
+        try:
+            files = script_core.run_automation(period, to_deselect, iterations=iterations, output_dir=out)
+        finally:
+            for k in env:
+                os.environ.pop(k, None)
+            fake_uia.CALL_LATENCY = 0.0
+        wall = time.perf_counter() - t0
+        records = tracing.load(env['STRAVIS_TRACE'])
+
+    exported = [entity for _, entity, _ in sim.exported]
+    assert exported == expected, (exported, expected)
+    assert len(files) == iterations
+    # both navigation paths must leave the report layout on Period/Edition and move the Edition cell by one
+    assert all(c == ('Period/Edition', 'Option 1') for c in sim.choices), sim.choices
+    return wall, records
+
+
+def _print_run(sim, wall, records, entities, top):
+    selfs = tracing.self_times(records)
+    waiting = sum(selfs[r['id']] for r in records if r['name'].startswith('wait'))
+    print(f"wall {wall:.1f}s  (per entity {wall / entities:.1f}s)")
+    print(f"waiting in wait_* helpers {waiting:.1f}s, everything else (fixed sleeps, typing, searches) {wall - waiting:.1f}s")
+    print(f"tree queries {sim.queries()}  nodes visited {sim.desktop.stats['nodes_visited']}  keystrokes {sim.keys}")
+    cost = keyinput.stats()
+    print(f"input: {cost.get('strokes', 0)} strokes in {cost.get('injections', 0)} injections, "
+          f"{cost.get('inject_s', 0.0):.2f}s injecting, {cost.get('paced_s', 0.0) + cost.get('settle_s', 0.0):.1f}s pacing")
+    print(f"\n{'step':<28}{'calls':>6}{'total s':>9}{'self s':>9}{'max s':>8}{'retries':>9}{'timeouts':>10}")
+    for row in tracing.summarize(records)[:top]:
+        print(f"{row['name']:<28}{row['calls']:>6}{row['total']:>9.2f}{row['self']:>9.2f}{row['max']:>8.2f}"
+              f"{row['retries']:>9}{row['timeouts']:>10}")
+
+
+def cmd_sim(args):
+    from entities import ALL_ENTITIES, DEFAULT_SELECTED
+    from sim_stravis import SimStravis
+
+    faults = {}
+    for spec in args.fault or ():
+        entity, _, fault = spec.partition(':')
+        faults.setdefault(entity, []).append(fault)
+    sim = SimStravis(latency=args.latency, tree_size=args.tree_size, faults=faults, grid_list=args.grid_list)
+    to_deselect = [e for e in ALL_ENTITIES if e not in DEFAULT_SELECTED]
+    wall, records = _run_simulated(sim, '2025.03', to_deselect, args.entities, args.latency_us, args.record,
+                                   args.timing, args.nav)
+    print(f"\nlatency profile {args.latency}, {args.entities} entities, {args.tree_size} filler nodes, "
+          f"{args.nav} navigation")
+    _print_run(sim, wall, records, args.entities, args.top)
+
+
+def cmd_replay(args):
+    from recording import load_recording, recorded_job, summarize_latencies
+    from sim_stravis import ReplayStravis
+
+    rec = load_recording(args.recording)
+    period, to_deselect, iterations = recorded_job(rec)
+    iterations = args.entities or iterations
+    sim = ReplayStravis(rec, tree_size=args.tree_size)
+    print(f"recording from {rec['session'].get('host')} at {rec['session'].get('started')}: "
+          f"{len(rec['spans'])} spans, {len(rec['events'])} events, {len(rec['states'])} states")
+    print(f"{'reaction':<10}{'n':>4}{'median s':>10}{'max s':>8}")
+    for kind, row in sorted(summarize_latencies(sim.timeline).items()):
+        print(f"{kind:<10}{row['n']:>4}{row['median']:>10.2f}{row['max']:>8.2f}")
+    recorded = max((s['start'] + s['dur'] for s in rec['spans'] if s['parent'] is None), default=0.0)
+    wall, records = _run_simulated(sim, period, to_deselect, iterations, timing_profile=args.timing)
+    print(f"\nreplayed job {period}, {iterations} entities; recorded run took {recorded:.1f}s")
+    _print_run(sim, wall, records, iterations, args.top)
+
+
+def cmd_timing(args):
+    import timing
+    from entities import ALL_ENTITIES, DEFAULT_SELECTED
+    from sim_stravis import SimStravis
+
+    to_deselect = [e for e in ALL_ENTITIES if e not in DEFAULT_SELECTED]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'timing.json')
+        walls = []
+        for run in range(args.runs):
+            sim = SimStravis(latency=args.latency)
+            wall, records = _run_simulated(sim, '2025.03', to_deselect, args.entities, timing_profile=path)
+            walls.append(wall)
+        profile = timing.TimingProfile().open(path)
+
+    print(f"\nlatency profile {args.latency}, {args.entities} entities, one timing profile shared by {args.runs} runs")
+    for run, wall in enumerate(walls, start=1):
+        print(f"run {run}: wall {wall:.1f}s  ({wall / walls[0]:.0%} of run 1)")
+    print(f"\n{'pause':<12}{'default':>9}{'n':>5}{'p95':>8}{'now':>8}")
+    for row in profile.report():
+        p95 = f"{row['p95']:.3f}" if row['p95'] is not None else '-'
+        print(f"{row['name']:<12}{row['default']:>9.2f}{row['samples']:>5}{p95:>8}{row['interval']:>8.3f}")
+
+
+def _sim_session(latency, window):
+    """shards.run_sharded setup: a simulated STRAVIS in this worker process, behind another session's window."""
+    from sim_stravis import SimStravis
+
+    SimStravis(latency=window or latency, other_sessions=1).install()
+    return f'pid:{os.getpid()}'
+
+
+def cmd_shards(args):
+    import functools
+    import shards
+    from batch import make_job
+    from entities import ALL_ENTITIES
+
+    include = ALL_ENTITIES[:args.entities]
+    jobs = [make_job('2025.03', include)]
+    # the "window" handed to each worker is its latency profile; _sim_session turns it into a pid: binding
+    windows = ['typical'] * args.slow + [args.latency] * (args.workers - args.slow)
+    os.environ['STRAVIS_TIMING'] = 'off'
+    with tempfile.TemporaryDirectory() as out:
+        summary = shards.run_sharded(jobs, windows, out, chunk=args.chunk, timing_profile='off', poll=0.5,
+                                     setup=functools.partial(_sim_session, args.latency), own_input=True)
+        on_disk = sorted(os.listdir(out))
+    exported = [r[1] for r in summary['results']]
+    assert sorted(exported) == sorted(include) and len(set(exported)) == len(include), exported
+    assert all(any(os.path.basename(f) == name for name in on_disk) for f in summary['files'])
+    print(f"\n{args.workers} workers ({args.slow} on the slow 'typical' profile), {args.entities} entities: "
+          f"wall {summary['seconds']:.1f}s")
+    shards.print_status(summary['workers'])
+
+
+# ------------- warm worker -------------
+
+def _sim_worker(latency, foreground_after):
+    """worker_pool setup: a simulated STRAVIS behind script_core in the worker process."""
+    from sim_stravis import SimStravis
+
+    os.environ['STRAVIS_TIMING'] = 'off'
+    os.environ['STRAVIS_CACHE'] = 'off'
+    SimStravis(latency=latency, foreground_after=foreground_after).install()
+
+
+def _start_latency(worker):
+    """Wait for the job's result; (Run -> first action on STRAVIS, of that waiting for it to be in front)."""
+    from progress import ProgressModel
+
+    model = ProgressModel()
+    while True:
+        kind, msg = worker.result_q.get(timeout=120)
+        if kind != 'progress':
+            assert kind == 'ok', msg
+            return model.start_latency()
+        for event in msg:
+            model.update(event)
+
+
+def cmd_warm(args):
+    import functools
+    from entities import ALL_ENTITIES
+    from worker_pool import WorkerPool
+
+    setup = functools.partial(_sim_worker, args.latency, args.foreground_after)
+    job = dict(period='2025.03', to_deselect=ALL_ENTITIES[1:], iterations=1)
+    rows = []
+    with tempfile.TemporaryDirectory() as out:
+        job['output_dir'] = out
+        # cold: a fresh process per click, as app_gui did (it then also slept a fixed 3 s)
+        for _ in range(args.runs):
+            pool = WorkerPool(setup=setup)
+            worker = pool.submit(dict(job, clicked=time.time()))
+            rows.append(('cold',) + _start_latency(worker))
+            pool.close()
+        # warm: one worker started up front, ready before the click
+        pool = WorkerPool(setup=setup).start()
+        while not pool.ready():
+            time.sleep(0.05)
+        print(f"warm worker ready after {pool.warm_seconds():.2f}s (imports, COM, UIA client, simulation)")
+        for _ in range(args.runs):
+            # a sim worker serves one run; the next one warms up while this one runs
+            worker = pool.submit(dict(job, clicked=time.time()))
+            rows.append(('warm',) + _start_latency(worker))
+            pool.replace(worker)
+            while not pool.ready():
+                time.sleep(0.05)
+        pool.close()
+
+    print(f"\nRun clicked -> attached to STRAVIS ({args.latency} latencies, STRAVIS in front "
+          f"{'at once' if args.foreground_after is None else f'after {args.foreground_after}s'})")
+    print(f"{'worker':<8}{'total s':>9}{'waiting s':>11}{'start-up s':>12}")
+    for kind, total, waited in rows:
+        print(f"{kind:<8}{total:>9.3f}{waited:>11.3f}{total - waited:>12.3f}")
+
+
+# ------------- export cache -------------
+
+def cmd_cache(args):
+    import script_core
+    from batch import make_job
+    from entities import ALL_ENTITIES
+    from export_cache import ExportCache
+    from sim_stravis import SimStravis
+
+    n = args.entities
+    # (period, entities): repeat requests for closed 2025.03, one asking for two more; open 2025.04 twice
+    requests = [('2025.03', n), ('2025.03', n), ('2025.03', n + 2), ('2025.04', n), ('2025.04', n)]
+    os.environ['STRAVIS_TIMING'] = 'off'
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'cache')
+        ExportCache(folder).close_period('2025.03')
+        for i, (period, count) in enumerate(requests):
+            sim = SimStravis(latency=args.latency).install()
+            out = os.path.join(tmp, f'out{i}')
+            t0 = time.perf_counter()
+            summary = script_core.run_batch([make_job(period, ALL_ENTITIES[:count])], out, cache=folder)
+            wall = time.perf_counter() - t0
+            assert len(summary['files']) == count and all(os.path.exists(f) for f in summary['files'])
+            rows.append((period, count, len(sim.exported), summary['cache'], wall))
+        cache = ExportCache(folder)
+        size, entries = cache.size(), len(cache.entries)
+    os.environ.pop('STRAVIS_TIMING', None)
+
+    print(f"\n{args.latency} latencies; 2025.03 closed, 2025.04 open (TTL 0)")
+    print(f"{'request':<16}{'automated':>10}{'served':>8}{'hit rate':>10}{'saved s':>9}{'wall s':>8}")
+    for period, count, automated, c, wall in rows:
+        print(f"{f'{period} x{count}':<16}{automated:>10}{c['hits']:>8}{c['hit_rate']:>10.0%}"
+              f"{c['seconds_saved']:>9.1f}{wall:>8.1f}")
+    print(f"cache: {entries} entries, {size / 1024:.0f} KB")
+
+
+# ------------- dialogs -------------
+
+def cmd_dialogs(args):
+    import script_core
+    from batch import make_job
+    from entities import ALL_ENTITIES
+    from sim_stravis import SimStravis
+
+    entities = ALL_ENTITIES[:args.entities]
+    os.environ.update(STRAVIS_TIMING='off', STRAVIS_CACHE='off')
+    rows = []
+    for fault in args.faults:
+        for rules in ('off', None):
+            # the first entity's report gets the dialog; 'off': no watchdog, as before
+            if rules:
+                os.environ['STRAVIS_DIALOG_RULES'] = rules
+            sim = SimStravis(latency=args.latency, faults={entities[0]: [fault]}).install()
+            with tempfile.TemporaryDirectory() as out:
+                t0 = time.perf_counter()
+                try:
+                    summary = script_core.run_batch([make_job('2025.03', entities)], out)
+                    failed, dialogs = len(summary['failed']), summary['dialogs']
+                except Exception as e:
+                    print(f"run failed: {e}")
+                    failed, dialogs = len(entities), []
+                wall = time.perf_counter() - t0
+            os.environ.pop('STRAVIS_DIALOG_RULES', None)
+            # exports saved with another layout / Edition than the flow chose, i.e. keystrokes that went astray
+            wrong = sum(c != ('Period/Edition', 'Option 1') for c in sim.choices)
+            handled = ', '.join(f"{d['action']} ({d.get('held', 0.0):.1f}s)" for d in dialogs) or '-'
+            rows.append((fault, 'on' if rules is None else 'off', wall, len(sim.exported), failed, wrong, handled))
+    for k in ('STRAVIS_TIMING', 'STRAVIS_CACHE'):
+        os.environ.pop(k, None)
+
+    print(f"\n{args.latency} latencies, {len(entities)} entities, the dialog on the first one")
+    print(f"{'dialog':<17}{'watchdog':>9}{'wall s':>8}{'saved':>7}{'failed':>8}{'wrong':>7}  handled (held)")
+    for fault, watchdog, wall, saved, failed, wrong, handled in rows:
+        print(f"{fault:<17}{watchdog:>9}{wall:>8.1f}{saved:>7}{failed:>8}{wrong:>7}  {handled}")
+
+
+# ------------- startup -------------
+
+def _import_times(module):
+    """[(module, self s, cumulative s, depth)] from python -X importtime, in import order."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)', line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)) / 1e6, int(m.group(2)) / 1e6, (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def _first_window(command, timeout=60):
+    """Seconds from launching `command` to the GUI's first drawn window (app_gui's STRAVIS_STARTUP_PROBE)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        probe = os.path.join(tmp, 'drawn')
+        env = dict(os.environ, STRAVIS_STARTUP_PROBE=probe)
+        t0 = time.time()
+        proc = subprocess.run(command, env=env, capture_output=True, text=True, timeout=timeout)
+        if not os.path.exists(probe):
+            tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:]
+            raise RuntimeError(f"no window drawn (exit {proc.returncode}{': ' + tail[0] if tail else ''})")
+        with open(probe) as f:
+            return float(f.read()) - t0
+
+
+def cmd_startup(args):
+    for module in ('app_gui', 'worker_pool', 'script_core'):
+        rows = _import_times(module)
+        end = max(i for i, r in enumerate(rows) if r[0] == module and r[3] == 0)
+        # children are listed right before their parent: walk back over the module's subtree
+        start = end
+        while start > 0 and rows[start - 1][3] > 0:
+            start -= 1
+        print(f"\nimport {module}: {rows[end][2] * 1000:.1f} ms; its imports by cumulative time")
+        print(f"{'module':<34}{'self ms':>9}{'cumulative ms':>15}")
+        direct = sorted((r for r in rows[start:end] if r[3] == 1), key=lambda r: -r[2])
+        for name, own, cum, _ in direct[:args.top]:
+            print(f"{name:<34}{own * 1000:>9.1f}{cum * 1000:>15.1f}")
+
+    commands = [('source', [sys.executable, 'app_gui.py'])]
+    if args.exe:
+        commands.append(('exe', [args.exe]))
+    print(f"\ntime to first window ({args.runs} launches)")
+    for label, command in commands:
+        try:
+            times = [_first_window(command) for _ in range(args.runs)]
+        except Exception as e:
+            print(f"{label:<8}{e}")
+            continue
+        print(f"{label:<8}median {statistics.median(times):.2f}s  first {times[0]:.2f}s  max {max(times):.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('waits', help='fixed sleeps vs readiness waits per entity iteration')
+    p.add_argument('--scale', type=float, default=0.02, help='time compression factor for the simulation')
+    p.add_argument('--iterations', type=int, default=3)
+    p.set_defaults(func=cmd_waits)
+
+    p = sub.add_parser('locators', help='ribbon lookups with and without the locator cache')
+    p.add_argument('--iterations', type=int, default=11)
+    p.add_argument('--padding', type=int, default=40, help='extra ribbon groups to search through')
+    p.set_defaults(func=cmd_locators)
+
+    p = sub.add_parser('snapshot', help='poll cost of safe_snapshot vs batched fingerprint by child count')
+    p.add_argument('--children', type=int, nargs='+', default=[10, 100, 500, 2000])
+    p.add_argument('--latency-us', type=float, default=50.0, help='simulated cost of one cross-process call')
+    p.add_argument('--polls', type=int, default=20)
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser('events', help='wake-up latency and CPU of event-driven vs polling waits')
+    p.add_argument('--trials', type=int, default=10)
+    p.add_argument('--latency-us', type=float, default=50.0, help='simulated cost of one cross-process call')
+    p.set_defaults(func=cmd_events)
+
+    p = sub.add_parser('search', help='python BFS vs condition search on synthetic trees')
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    p.add_argument('--latency-us', type=float, default=20.0, help='simulated cost of one cross-process call')
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser('export-watch', help='export detection against a writer process at controlled rates')
+    p.add_argument('--rates', type=float, nargs='+', default=[0.5, 2.0, 8.0], help='writer speed in MB/s')
+    p.add_argument('--size-kb', type=float, default=512)
+    p.add_argument('--stable-for', type=float, default=0.5)
+    p.add_argument('--timeout', type=float, default=60.0)
+    p.set_defaults(func=cmd_export_watch)
+
+    p = sub.add_parser('consolidate', help='streaming consolidation of generated workbooks')
+    p.add_argument('--files', type=int, default=40)
+    p.add_argument('--rows', type=int, default=2000)
+    p.add_argument('--cols', type=int, default=12)
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    p.add_argument('--format', choices=('parquet', 'csv'), default='parquet')
+    p.set_defaults(func=cmd_consolidate)
+
+    p = sub.add_parser('tracing', help='per-call overhead of @traced when disabled and enabled')
+    p.add_argument('--calls', type=int, default=200000)
+    p.set_defaults(func=cmd_tracing)
+
+    p = sub.add_parser('sim', help='run_automation end to end against the simulated STRAVIS (sim_stravis.py)')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--entities', type=int, default=3)
+    p.add_argument('--tree-size', type=int, default=0, help='filler nodes in the navigator tree')
+    p.add_argument('--latency-us', type=float, default=0.0, help='simulated cost of one cross-process call')
+    p.add_argument('--top', type=int, default=20)
+    p.add_argument('--record', help='also write a session recording (for trying out replay)')
+    p.add_argument('--timing', help='learn/use pause lengths in this timing profile (default: fixed pauses)')
+    p.add_argument('--nav', choices=('patterns', 'keys'), default='patterns',
+                   help='move through lists/grids/drop-downs by UIA patterns or by keystrokes')
+    p.add_argument('--grid-list', action='store_true', help='model the report list as a DataGrid, like the report')
+    p.add_argument('--fault', action='append', metavar='ENTITY:FAULT',
+                   help="make one export of ENTITY fail once (no_dialog, stuck, no_close; see sim_stravis.py); "
+                        "the run recovers and retries it")
+    p.set_defaults(func=cmd_sim)
+
+    p = sub.add_parser('replay', help='run_automation against the timing of a recorded session')
+    p.add_argument('recording', help='file written with batch.py --record / STRAVIS_RECORD')
+    p.add_argument('--entities', type=int, help='entities to export (default: as recorded)')
+    p.add_argument('--tree-size', type=int, default=0, help='filler nodes in the navigator tree')
+    p.add_argument('--top', type=int, default=20)
+    p.add_argument('--timing', help='learn/use pause lengths in this timing profile (default: fixed pauses)')
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser('timing', help='repeated sim runs learning one timing profile (timing.py)')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--entities', type=int, default=2)
+    p.add_argument('--runs', type=int, default=3)
+    p.set_defaults(func=cmd_timing)
+
+    p = sub.add_parser('shards', help='one export sharded over several simulated STRAVIS sessions (shards.py)')
+    p.add_argument('--workers', type=int, default=3)
+    p.add_argument('--slow', type=int, default=1, help='workers whose session uses the typical (slow) latencies')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--entities', type=int, default=9)
+    p.add_argument('--chunk', type=int, default=None, help='entities per unit (default: shards.py picks)')
+    p.set_defaults(func=cmd_shards)
+
+    p = sub.add_parser('warm', help='Run-to-first-action time of a cold worker process vs the warm pool (worker_pool.py)')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--runs', type=int, default=3)
+    p.add_argument('--foreground-after', type=float, default=None,
+                   help='seconds until the simulated user brings STRAVIS to the front (default: already in front)')
+    p.set_defaults(func=cmd_warm)
+
+    p = sub.add_parser('cache', help='repeat requests against the simulator with the export cache (export_cache.py)')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--entities', type=int, default=2)
+    p.set_defaults(func=cmd_cache)
+
+    p = sub.add_parser('dialogs', help='unexpected dialogs in simulated runs, without and with the watchdog')
+    p.add_argument('--latency', choices=('instant', 'fast', 'typical'), default='fast')
+    p.add_argument('--entities', type=int, default=2)
+    p.add_argument('--faults', nargs='+', default=['session_warning', 'overwrite', 'error_box', 'notice'],
+                   choices=('session_warning', 'overwrite', 'error_box', 'notice'))
+    p.set_defaults(func=cmd_dialogs)
+
+    p = sub.add_parser('startup', help='GUI start-up: import time per module and time to first window')
+    p.add_argument('--exe', help='also launch the packaged build, e.g. dist/STRAVISRunner/STRAVISRunner.exe')
+    p.add_argument('--runs', type=int, default=3)
+    p.add_argument('--top', type=int, default=10)
+    p.set_defaults(func=cmd_startup)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
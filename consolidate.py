@@ -0,0 +1,190 @@
+"""
+Merge exported workbooks into one dataset.
+
+Each workbook is read with openpyxl in read-only mode (rows are streamed from the
+xlsx, never loaded as a whole) and flattened into one long table, one record per
+non-empty cell:
+
+  period, entity, source, sheet, row, column, value_text, value_num
+
+`column` is the header text above the cell (the first row with two or more
+filled cells is taken as the header), period/entity come from the file name
+(exports.parse_export_name) unless given. Files are processed in a process
+pool; every worker writes its records to a part file in chunks, and the parts
+are appended to the output in input order, so memory stays bounded by the chunk
+size whatever the number or size of the exports.
+
+    python consolidate.py --out month_end.parquet C:\\exports\\2025.03
+    python consolidate.py --out month_end.csv --workers 4 a.xlsx b.xlsx
+"""
+import argparse
+import concurrent.futures
+import csv
+import glob
+import os
+import shutil
+import tempfile
+
+from exports import DEFAULT_NAME_TEMPLATE, parse_export_name
+
+COLUMNS = ('period', 'entity', 'source', 'sheet', 'row', 'column', 'value_text', 'value_num')
+CHUNK_ROWS = 5000
+
+
+def _header_name(value, col):
+    text = '' if value is None else str(value).strip()
+    return text or f'col{col}'
+
+
+def iter_records(path, period=None, entity=None, template=DEFAULT_NAME_TEMPLATE):
+    """Yield one COLUMNS tuple per non-empty cell of every sheet, streaming."""
+    from openpyxl import load_workbook
+
+    fields = parse_export_name(path, template)
+    period = period or fields.get('period', '')
+    entity = entity or fields.get('entity', '')
+    source = os.path.basename(path)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            header = None
+            for r, values in enumerate(ws.iter_rows(values_only=True), start=1):
+                filled = [(c, v) for c, v in enumerate(values, start=1) if v is not None and v != '']
+                if not filled:
+                    continue
+                if header is None and len(filled) >= 2:
+                    header = {c: _header_name(v, c) for c, v in enumerate(values, start=1)}
+                    continue
+                for c, v in filled:
+                    column = header.get(c, f'col{c}') if header else f'col{c}'
+                    num = float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+                    yield (period, entity, source, ws.title, r, column, str(v), num)
+    finally:
+        # read-only workbooks keep the zip open until closed
+        wb.close()
+
+
+def _write_part(path, part_path, template):
+    """Worker: stream one workbook into a CSV part file. Returns (path, records)."""
+    n = 0
+    with open(part_path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        chunk = []
+        for rec in iter_records(path, template=template):
+            chunk.append(rec)
+            if len(chunk) >= CHUNK_ROWS:
+                w.writerows(chunk)
+                n += len(chunk)
+                chunk = []
+        w.writerows(chunk)
+        n += len(chunk)
+    return path, n
+
+
+def _read_part(part_path):
+    with open(part_path, newline='', encoding='utf-8') as f:
+        for period, entity, source, sheet, row, column, text, num in csv.reader(f):
+            yield period, entity, source, sheet, int(row), column, text, (float(num) if num else None)
+
+
+class _CsvSink:
+    def __init__(self, out):
+        self.f = open(out, 'w', newline='', encoding='utf-8')
+        csv.writer(self.f).writerow(COLUMNS)
+
+    def append(self, part_path):
+        # part files are already CSV in the output column order
+        with open(part_path, newline='', encoding='utf-8') as part:
+            shutil.copyfileobj(part, self.f)
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, out):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([('period', pa.string()), ('entity', pa.string()), ('source', pa.string()),
+                                 ('sheet', pa.string()), ('row', pa.int32()), ('column', pa.string()),
+                                 ('value_text', pa.string()), ('value_num', pa.float64())])
+        self.writer = pq.ParquetWriter(out, self.schema)
+
+    def append(self, part_path):
+        chunk = []
+        for rec in _read_part(part_path):
+            chunk.append(rec)
+            if len(chunk) >= CHUNK_ROWS:
+                self._write(chunk)
+                chunk = []
+        if chunk:
+            self._write(chunk)
+
+    def _write(self, chunk):
+        cols = list(zip(*chunk))
+        self.writer.write_table(self.pa.table(dict(zip(COLUMNS, cols)), schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _sink(out):
+    if out.lower().endswith('.parquet'):
+        return _ParquetSink(out)
+    if out.lower().endswith('.csv'):
+        return _CsvSink(out)
+    raise ValueError(f"Output must be .parquet or .csv: {out}")
+
+
+def consolidate(paths, out, workers=None, template=DEFAULT_NAME_TEMPLATE):
+    """Write the records of all `paths` to `out` (.parquet or .csv). Returns {path: records}."""
+    paths = list(paths)
+    counts = {}
+    sink = _sink(out)
+    try:
+        with tempfile.TemporaryDirectory(prefix='consolidate-') as tmp, \
+                concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = [os.path.join(tmp, f'{i:05d}.csv') for i in range(len(paths))]
+            futures = [pool.submit(_write_part, p, part, template) for p, part in zip(paths, parts)]
+            # append in input order; later files keep converting in the background meanwhile
+            for fut, part in zip(futures, parts):
+                path, n = fut.result()
+                sink.append(part)
+                os.remove(part)
+                counts[path] = n
+    finally:
+        sink.close()
+    return counts
+
+
+def find_exports(inputs):
+    """Expand directories to the workbooks in them (Excel lock files skipped)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = glob.glob(os.path.join(item, '*.xlsx'))
+            paths.extend(sorted(p for p in found if not os.path.basename(p).startswith('~$')))
+        else:
+            paths.append(item)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='exported workbooks or folders containing them')
+    parser.add_argument('--out', required=True, help='dataset to write (.parquet or .csv)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--name-template', default=DEFAULT_NAME_TEMPLATE,
+                        help='template the exports were saved with, to read period/entity (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    paths = find_exports(args.inputs)
+    if not paths:
+        raise SystemExit('No workbooks found.')
+    counts = consolidate(paths, args.out, args.workers, args.name_template)
+    print(f"{sum(counts.values())} records from {len(counts)} workbooks -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
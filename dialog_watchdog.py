@@ -0,0 +1,298 @@
+"""
+Watchdog for dialogs the flow did not open.
+
+When STRAVIS or Windows puts up an unplanned modal (file-exists overwrite prompt,
+session warning, error box), the flow used to keep typing TABs and ENTERs into it
+and then wait out the full timeouts of wait_until_tab_active, click_operation_close
+and find_with_retry before failing. During a session (script_core.session) a
+DialogWatchdog thread now looks at the top-level windows whenever one opens or
+closes (uia_events) and at least every `interval` seconds, and handles each new
+modal window by the first rule that matches it:
+
+  ignore   a window the flow drives itself (Save As, Base List/Data Input)
+  confirm  press its confirm button (rule.button, else Yes / OK / Continue);
+           no default rule confirms anything, see DEFAULT_RULES
+  dismiss  close it (WindowPattern.Close, else Cancel / Close / No / OK, else Esc)
+  pause    leave it to the user: the run waits until it is closed, with an alert
+  abort    close it and abort the step the flow is in; export_entities then
+           recovers and retries the entity (see script_core.recover)
+
+While a handled dialog is up, the flow's keystrokes (keyinput.gates) and waits
+(uia_events.events.gates) are held, so nothing is typed into it; the waits are
+woken as soon as it is handled, so they react at once instead of at their timeout.
+
+Rules are matched against the window title and the text in it; the defaults are
+DEFAULT_RULES, only for windows of the STRAVIS process unless a rule says
+any_process. More rules (tried first) come from a JSON file:
+
+    STRAVIS_DIALOG_RULES=rules.json   (=off: no watchdog)
+
+    [{"title": "^Print$", "action": "dismiss"},
+     {"text": "(?i)locked by", "action": "pause"},
+     {"title": "^Data Check$", "action": "confirm", "button": "OK"},
+     {"title": "^Windows Security$", "action": "dismiss", "any_process": true}]
+
+Every handled dialog is a progress event ('dialog', see progress.py) and a line
+in the run summary.
+"""
+import collections
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+import keyinput
+import progress
+from uia_events import events, WINDOW_KINDS
+
+IGNORE, CONFIRM, DISMISS, PAUSE, ABORT = 'ignore', 'confirm', 'dismiss', 'pause', 'abort'
+ACTIONS = (IGNORE, CONFIRM, DISMISS, PAUSE, ABORT)
+
+# title / text: regular expressions (re.search), None matches anything; button: name or list of names to confirm with
+Rule = collections.namedtuple('Rule', 'action title text button any_process', defaults=(None, None, None, False))
+
+DEFAULT_RULES = (
+    Rule(IGNORE, title=r'^(Save As|Base List/Data Input)$'),
+    # never overwrite: in Downloads mode the file can be another entity's. Answered No; the entity is
+    # retried and then recorded failed with the prompt's text, like save_as_direct's "already exists" error
+    Rule(ABORT, title=r'^Confirm Save As$'),
+    # an expired or expiring login needs the user; OK alone would leave the run typing into a logged-out client
+    Rule(PAUSE, text=r'(?i)\bsession\b|\bsign(ed)? ?in\b|\blog ?in\b|\btime-?out\b|\bexpire'),
+    # error boxes by their title ('Error', 'STRAVIS - Error', 'Application Error'), the .NET unhandled exception box
+    Rule(ABORT, title=r'(?i)^(.+ - )?(application )?error$'),
+    Rule(ABORT, text=r'^Unhandled exception has occurred in'),
+    # anything else STRAVIS puts up: hold the run until someone has looked at it
+    Rule(PAUSE),
+)
+CONFIRM_BUTTONS = ('Yes', 'OK', 'Continue')
+DISMISS_BUTTONS = ('Cancel', 'Close', 'No', 'OK')
+# seconds a confirmed / dismissed dialog may take to go away before it is left to the user
+DIALOG_TIMEOUT = 3.0
+
+
+def load_rules(path=None):
+    """Rules from `path` or $STRAVIS_DIALOG_RULES (tried first), then DEFAULT_RULES. None: watchdog off."""
+    path = path or os.environ.get('STRAVIS_DIALOG_RULES')
+    if not path:
+        return list(DEFAULT_RULES)
+    if path.lower() == 'off':
+        return None
+    with open(path, encoding='utf-8') as f:
+        rules = [Rule(**entry) for entry in json.load(f)]
+    for rule in rules:
+        if rule.action not in ACTIONS:
+            raise RuntimeError(f"Dialog rule {rule}: action must be one of {', '.join(ACTIONS)}")
+    return rules + list(DEFAULT_RULES)
+
+
+def classify(rules, title, text, own=True):
+    """First rule matching a window called `title` showing `text` (own: it belongs to STRAVIS), or None."""
+    for rule in rules:
+        if not (own or rule.any_process):
+            continue
+        if rule.title is not None and not re.search(rule.title, title or ''):
+            continue
+        if rule.text is not None and not re.search(rule.text, text or ''):
+            continue
+        return rule
+    return None
+
+
+def dialog_text(window, depth=3):
+    """The text shown in `window` (its TextControls' names, `depth` levels down)."""
+    parts, level = [], [window]
+    for _ in range(depth):
+        level = [c for ctrl in level for c in ctrl.GetChildren()]
+        parts += [c.Name for c in level if c.ControlTypeName == 'TextControl' and c.Name]
+    return ' '.join(' '.join(parts).split())
+
+
+def _modal(window):
+    try:
+        return bool(window.GetWindowPattern().IsModal)
+    except Exception:
+        return False  # no WindowPattern (popups, tool windows): nothing that blocks the flow
+
+
+def press(window, names):
+    """Press the first of the buttons `names` that `window` has; False if it has none of them."""
+    for name in names:
+        btn = window.ButtonControl(Name=name, searchDepth=5)
+        if btn.Exists(0, 0):
+            try:
+                btn.GetInvokePattern().Invoke()
+            except Exception:
+                btn.Click()
+            return True
+    return False
+
+
+def close(window):
+    try:
+        window.GetWindowPattern().Close(waitTime=0)
+        return True
+    except Exception:
+        pass
+    if press(window, DISMISS_BUTTONS):
+        return True
+    # the flow is held, so the Esc cannot land anywhere else
+    window.SetFocus()
+    keyinput.keys('esc')
+    return True
+
+
+class DialogWatchdog:
+    def __init__(self, root, stravis, rules=DEFAULT_RULES, interval=0.25, thread_context=None):
+        """
+        root: callable returning the desktop (ui.GetRootControl), called on the watchdog thread
+        stravis: the attached main window; rules: see load_rules
+        thread_context: context manager factory the watchdog thread runs in (COM init)
+        """
+        self.root = root
+        self.stravis = stravis
+        self.rules = list(rules)
+        self.interval = interval
+        self.thread_context = thread_context or contextlib.nullcontext
+        self.handled = []         # {'name', 'text', 'action', 'held'} per dialog, in order
+        self.flow = None          # the thread running the flow: the one held and aborted
+        self.pid = None
+        self._known = set()
+        self._held = {}           # window key -> (handled entry, monotonic time it appeared)
+        self._abort = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----- flow side -----
+    def start(self):
+        """Watch from now on; the calling thread is the flow's. Windows already open are left alone."""
+        self.flow = threading.current_thread()
+        self.pid = self.stravis.ProcessId
+        self._known = set(self._windows())
+        keyinput.gates.append(self.checkpoint)
+        events.gates.append(self.checkpoint)
+        self._thread = threading.Thread(target=self._watch, name='dialog-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        for gates in (keyinput.gates, events.gates):
+            if self.checkpoint in gates:
+                gates.remove(self.checkpoint)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        events.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def checkpoint(self):
+        """Run by the flow before each keystroke and around each wait: hold while a dialog is up, raise aborts."""
+        if threading.current_thread() is not self.flow:
+            return
+        with self._cond:
+            self._cond.wait_for(lambda: not self._held or self._abort is not None or self._stop.is_set())
+            if self._abort is not None:
+                error, self._abort = self._abort, None
+                raise error
+
+    def clear_abort(self):
+        """Drop an abort the flow has not hit yet (recovery is already under way)."""
+        with self._cond:
+            self._abort = None
+
+    # ----- watchdog thread -----
+    def _windows(self):
+        """{key: (window, own)} of the top-level windows and the windows STRAVIS's own windows own."""
+        found = {}
+        for w in self.root().GetChildren():
+            if w.ControlTypeName != 'WindowControl':
+                continue
+            own = w.ProcessId == self.pid
+            found[tuple(w.GetRuntimeId())] = (w, own)
+            if own:
+                # message boxes of a dialog (Confirm Save As of Save As) can sit under it
+                for c in w.GetChildren():
+                    if c.ControlTypeName == 'WindowControl':
+                        found[tuple(c.GetRuntimeId())] = (c, True)
+        return found
+
+    def _watch(self):
+        with self.thread_context():
+            while not self._stop.is_set():
+                seen = events.mark()
+                try:
+                    self.scan()
+                except Exception:
+                    pass  # a window closed while it was being looked at; the next scan sees the rest
+                events.sleep(self.interval, WINDOW_KINDS, since=seen)
+
+    def scan(self):
+        present = self._windows()
+        # a handle Windows hands out again is a new window
+        self._known &= present.keys()
+        for key, (window, own) in present.items():
+            if key not in self._known:
+                self._known.add(key)
+                self._handle(key, window, own)
+        self._release(present)
+
+    def _handle(self, key, window, own):
+        name = window.Name
+        text = dialog_text(window)
+        rule = classify(self.rules, name, text, own)
+        if rule is None or rule.action == IGNORE or not _modal(window):
+            return
+        action = rule.action
+        entry = {'name': name, 'text': text[:200], 'action': action}
+        # from here on nothing the flow types can land in the dialog
+        with self._cond:
+            self._held[key] = (entry, time.monotonic())
+        self.handled.append(entry)
+        print(f"Dialog '{name}' ({text[:80]}): {action}")
+        progress.emit('dialog', name=name, text=entry['text'], action=action, state='open')
+        done = False
+        try:
+            if action == CONFIRM:
+                buttons = rule.button or CONFIRM_BUTTONS
+                done = press(window, (buttons,) if isinstance(buttons, str) else buttons)
+            elif action in (DISMISS, ABORT):
+                done = close(window)
+        except Exception as e:
+            print(f"Dialog '{name}': {action} failed: {e}")
+        if action == ABORT:
+            with self._cond:
+                self._abort = RuntimeError(f"Aborted by the '{name}' dialog: {text[:200]}")
+                self._cond.notify_all()
+        if action != PAUSE and not (done and self._gone(window)):
+            entry['action'] = PAUSE
+            print(f"Dialog '{name}' is still open: close it in STRAVIS to continue")
+            progress.emit('dialog', name=name, text=entry['text'], action=PAUSE, state='open')
+        # the flow's waits run their checkpoint now, instead of at the end of their poll interval
+        events.wake()
+
+    def _gone(self, window, timeout=DIALOG_TIMEOUT):
+        end = time.monotonic() + timeout
+        while True:
+            seen = events.mark()
+            if not window.Exists(0, 0):
+                return True
+            if time.monotonic() >= end:
+                return False
+            events.sleep(0.05, WINDOW_KINDS, since=seen)
+
+    def _release(self, present):
+        """Let the flow go on once the dialogs holding it are closed."""
+        with self._cond:
+            gone = [key for key in self._held if key not in present]
+            for key in gone:
+                entry, since = self._held.pop(key)
+                entry['held'] = round(time.monotonic() - since, 2)
+                progress.emit('dialog', name=entry['name'], action=entry['action'], state='closed',
+                              seconds=entry['held'])
+            if gone:
+                self._cond.notify_all()
+        if gone:
+            events.wake()
@@ -0,0 +1,12 @@
+ALL_ENTITIES = [
+    "D341_HSO_HGM", "D342_HSO_HGMD", "CC41_HSO_HMIN", "C741_HSO_HMSH",
+    "AN41_HSO_HMSP", "D941_HSO_HMSZ", "J34V_HSO_HOME", "EM41_HSO_HSEU",
+    "A441_HSO_HSOT", "WB41_HSOU", "D841_HSO_HSOK", "CY41_HSO_INNOVIA",
+    "WM41_HSO_MID LAB INC", "GG41_HSO_FRITZ RUCK", "GH41_HSO_EOS",
+]
+
+DEFAULT_SELECTED = [
+    "D341_HSO_HGM", "D342_HSO_HGMD", "CC41_HSO_HMIN", "C741_HSO_HMSH",
+    "AN41_HSO_HMSP", "D941_HSO_HMSZ", "J34V_HSO_HOME", "EM41_HSO_HSEU",
+    "A441_HSO_HSOT", "WB41_HSOU", "D841_HSO_HSOK",
+]
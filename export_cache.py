@@ -0,0 +1,286 @@
+"""
+Export cache: workbooks of closed periods are served from disk instead of being
+exported from STRAVIS again (~40 s of UI automation each).
+
+An entry is keyed by a hash of (period, entity, report settings), the settings
+being what the flow applies before saving (script_core.REPORT_SETTINGS: layout,
+Edition, Display options), so a workbook made with other settings is never
+served. Files are stored by content hash (objects/ab/ab12....xlsx); identical
+workbooks are kept once. Before a run, run_batch looks every (period, entity)
+up, copies the hits into the output folder under their usual names and only
+automates the misses; each new export is stored afterwards.
+
+An entry is served if its period is marked closed (closed periods do not
+change) or, for an open period, if it is younger than the cache's TTL (default
+0: open periods are always exported again). The cache holds at most max_bytes;
+the least recently served entries are evicted first.
+
+The cache is off unless a run names its folder (batch.py --cache <folder>, or
+STRAVIS_CACHE=<folder>). Several runs may share one: they take turns saving the
+index (index.json.lock) and each save merges in what the others stored.
+
+    python export_cache.py --cache D:\\cache                          # periods, entries, size
+    python export_cache.py --cache D:\\cache --close 2025.01 2025.02  # served from now on
+    python export_cache.py --cache D:\\cache --reopen 2025.02
+    python export_cache.py --cache D:\\cache --ttl 3600 --max-gb 5
+    python export_cache.py --cache D:\\cache --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+
+from batch import exported_entities, resume_jobs
+from exports import export_path
+from export_watcher import Export
+from manifest import file_sha256, locked, write_json
+
+INDEX_NAME = 'index.json'
+DEFAULT_MAX_BYTES = 2 << 30
+# seconds of automation a hit saves when the entry does not know how long its export took
+DEFAULT_EXPORT_SECONDS = 40.0
+
+
+def cache_dir(path=None):
+    """Cache folder to use: `path`, else $STRAVIS_CACHE. None (neither given, or 'off'): no cache."""
+    path = path or os.environ.get('STRAVIS_CACHE')
+    if not path or path.lower() == 'off':
+        return None
+    return path
+
+
+def entry_key(period, entity, settings):
+    blob = json.dumps({'period': period, 'entity': entity, 'settings': settings}, sort_keys=True)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ExportCache:
+    def __init__(self, folder, max_bytes=None, ttl=None):
+        """max_bytes / ttl override what the cache's index has (set with export_cache.py --max-gb / --ttl)."""
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_NAME)
+        self.entries = {}
+        self.closed = set()
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.ttl = 0.0
+        self.stats = {'lookups': 0, 'hits': 0, 'stored': 0, 'evicted': 0, 'bytes_served': 0, 'seconds_saved': 0.0}
+        # this cache's changes since the last save, merged into the index by save()
+        self._changed, self._dropped, self._periods = set(), set(), {}
+        os.makedirs(os.path.join(folder, 'objects'), exist_ok=True)
+        data = self._read()
+        self.entries = data.get('entries', {})
+        self.closed = set(data.get('closed', []))
+        self.max_bytes = data.get('max_bytes', self.max_bytes)
+        self.ttl = data.get('ttl', self.ttl)
+        self._settings = (self.max_bytes, self.ttl)
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if ttl is not None:
+            self.ttl = ttl
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self):
+        """Write the index back, merged with what other runs saved meanwhile (this cache's changes win)."""
+        with locked(self.path):
+            data = self._read()
+            entries = data.get('entries', {})
+            for key in self._dropped:
+                entries.pop(key, None)
+            entries.update((key, self.entries[key]) for key in self._changed)
+            closed = set(data.get('closed', []))
+            for period, now_closed in self._periods.items():
+                (closed.add if now_closed else closed.discard)(period)
+            if (self.max_bytes, self.ttl) == self._settings:
+                self.max_bytes, self.ttl = data.get('max_bytes', self.max_bytes), data.get('ttl', self.ttl)
+            self.entries, self.closed = entries, closed
+            # other runs' entries count towards max_bytes too
+            self.evict()
+            write_json(self.path, {'closed': sorted(self.closed), 'max_bytes': self.max_bytes, 'ttl': self.ttl,
+                                   'entries': self.entries})
+            self._changed.clear()
+            self._dropped.clear()
+            self._periods.clear()
+            self._settings = (self.max_bytes, self.ttl)
+
+    def _put(self, key, entry):
+        self.entries[key] = entry
+        self._changed.add(key)
+        self._dropped.discard(key)
+
+    def _drop(self, key):
+        self._changed.discard(key)
+        self._dropped.add(key)
+        return self.entries.pop(key)
+
+    def _object(self, entry):
+        return os.path.join(self.folder, 'objects', entry['sha256'][:2], entry['sha256'] + entry['ext'])
+
+    # ----- periods -----
+    def close_period(self, *periods):
+        self.closed.update(periods)
+        self._periods.update(dict.fromkeys(periods, True))
+        self.save()
+
+    def reopen_period(self, *periods):
+        self.closed.difference_update(periods)
+        self._periods.update(dict.fromkeys(periods, False))
+        self.save()
+
+    def _fresh(self, entry):
+        return entry['period'] in self.closed or time.time() - entry['stored'] < self.ttl
+
+    # ----- lookups -----
+    def lookup(self, period, entity, settings):
+        """The entry to serve for (period, entity, settings), or None; drops entries whose file is damaged."""
+        self.stats['lookups'] += 1
+        key = entry_key(period, entity, settings)
+        entry = self.entries.get(key)
+        if entry is None or not self._fresh(entry):
+            return None
+        obj = self._object(entry)
+        try:
+            intact = (os.path.getsize(obj) == entry['bytes']
+                      and (not obj.lower().endswith('.xlsx') or zipfile.is_zipfile(obj))
+                      and file_sha256(obj) == entry['sha256'])
+        except OSError:
+            intact = False
+        if not intact:
+            self._drop(key)
+            self.save()
+            return None
+        return entry
+
+    def fetch(self, period, entity, settings, dest):
+        """Copy the cached workbook for (period, entity, settings) to `dest`; the entry, or None on a miss."""
+        entry = self.lookup(period, entity, settings)
+        if entry is None:
+            return None
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        shutil.copyfile(self._object(entry), dest)
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self._changed.add(entry_key(period, entity, settings))
+        self.stats['hits'] += 1
+        self.stats['bytes_served'] += entry['bytes']
+        self.stats['seconds_saved'] += entry.get('seconds') or DEFAULT_EXPORT_SECONDS
+        return entry
+
+    def store(self, period, entity, settings, path, seconds=None):
+        """Add the workbook at `path` (exported in `seconds`) under (period, entity, settings)."""
+        sha = file_sha256(path)
+        entry = {'period': period, 'entity': entity, 'settings': settings, 'sha256': sha,
+                 'ext': os.path.splitext(path)[1].lower() or '.xlsx', 'bytes': os.path.getsize(path),
+                 'seconds': None if seconds is None else round(seconds, 1),
+                 'stored': time.time(), 'last_used': time.time(), 'hits': 0}
+        obj = self._object(entry)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp = f'{obj}.{os.getpid()}.tmp'
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, obj)
+        self._put(entry_key(period, entity, settings), entry)
+        self.stats['stored'] += 1
+        self.save()
+        return entry
+
+    # ----- size -----
+    def size(self):
+        """Bytes stored (each object once, however many entries share it)."""
+        return sum({e['sha256']: e['bytes'] for e in self.entries.values()}.values())
+
+    def evict(self):
+        """Drop least recently served entries until the cache fits max_bytes, and their files."""
+        by_age = sorted(self.entries.items(), key=lambda kv: kv[1]['last_used'])
+        dropped = []
+        while by_age and self.size() > self.max_bytes:
+            key, _ = by_age.pop(0)
+            dropped.append(self._drop(key))
+            self.stats['evicted'] += 1
+        self._remove_objects(dropped)
+
+    def _remove_objects(self, entries):
+        # only files no remaining entry shares; never a sweep of objects/, which another writer may be adding to
+        kept = {e['sha256'] for e in self.entries.values()}
+        for entry in entries:
+            if entry['sha256'] not in kept:
+                try:
+                    os.remove(self._object(entry))
+                except OSError:
+                    pass
+
+    def clear(self):
+        self.save()  # take in the entries other runs stored, so they go too
+        dropped = [self._drop(key) for key in list(self.entries)]
+        self._remove_objects(dropped)
+        self.save()
+
+    def report(self):
+        """This run's hit rate and the automation time the hits saved."""
+        lookups = self.stats['lookups']
+        return dict(self.stats, seconds_saved=round(self.stats['seconds_saved'], 1),
+                    hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else None)
+
+
+def serve_jobs(cache, jobs, settings, output_dir, name_template):
+    """
+    Copy every cached (period, entity) of `jobs` into output_dir under its export_path name.
+    Returns (jobs reduced to the misses, {(period, entity): Export} of what was served).
+    """
+    served = {}
+    for job in jobs:
+        for index, entity in enumerate(exported_entities(job)):
+            dest = export_path(output_dir, job.period, entity, index, name_template)
+            entry = cache.fetch(job.period, entity, settings, dest)
+            if entry is not None:
+                served[(job.period, entity)] = Export(dest, entry['bytes'], 0.0, 0.0)
+    if served:
+        cache.save()  # last_used / hits
+    return resume_jobs(jobs, lambda period, entity: (period, entity) in served), served
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cache', help='cache folder (default: $STRAVIS_CACHE)')
+    parser.add_argument('--close', nargs='+', metavar='PERIOD', help='mark periods closed: always served from the cache')
+    parser.add_argument('--reopen', nargs='+', metavar='PERIOD', help='mark periods open again')
+    parser.add_argument('--ttl', type=float, help='seconds an open period\'s export is served for (0: never)')
+    parser.add_argument('--max-gb', type=float, help='size bound; least recently used entries are evicted')
+    parser.add_argument('--clear', action='store_true', help='remove every entry')
+    args = parser.parse_args(argv)
+
+    folder = cache_dir(args.cache)
+    if folder is None:
+        raise SystemExit('Name the cache folder: --cache <folder> or STRAVIS_CACHE=<folder>')
+    cache = ExportCache(folder)
+    if args.close:
+        cache.close_period(*args.close)
+    if args.reopen:
+        cache.reopen_period(*args.reopen)
+    if args.ttl is not None or args.max_gb is not None:
+        cache.ttl = args.ttl if args.ttl is not None else cache.ttl
+        cache.max_bytes = int(args.max_gb * (1 << 30)) if args.max_gb is not None else cache.max_bytes
+        cache.evict()
+        cache.save()
+    if args.clear:
+        cache.clear()
+
+    print(f"{folder}: {len(cache.entries)} entries, {cache.size() / (1 << 20):.1f} of "
+          f"{cache.max_bytes / (1 << 20):.0f} MB, open periods served for {cache.ttl:.0f}s")
+    periods = sorted({e['period'] for e in cache.entries.values()} | cache.closed)
+    print(f"{'period':<10}{'state':<8}{'entries':>8}{'MB':>8}{'hits':>6}")
+    for period in periods:
+        entries = [e for e in cache.entries.values() if e['period'] == period]
+        print(f"{period:<10}{'closed' if period in cache.closed else 'open':<8}{len(entries):>8}"
+              f"{sum(e['bytes'] for e in entries) / (1 << 20):>8.1f}{sum(e.get('hits', 0) for e in entries):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Confirms that an export actually landed on disk.
+
+ExportWatcher remembers what is in the output folder, then waits for a new (or
+rewritten) workbook and only reports it once its size and mtime have stopped
+changing for `stable_for` seconds. Between scans it sleeps on a directory change
+notification: inotify on Linux, FindFirstChangeNotification on Windows (pywin32),
+plain interval polling of os.scandir otherwise.
+"""
+import collections
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import time
+
+# path, bytes, seconds from arm() until the file appeared, seconds it took to finish writing
+Export = collections.namedtuple('Export', 'path bytes appeared_after write_seconds')
+
+# lock / temp files Excel and the file dialog leave next to the real export
+IGNORED = ('~$*', '*.tmp', '*.crdownload', '*.partial')
+
+
+class _Inotify:
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(ready)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Win32ChangeNotification:
+    def __init__(self, directory):
+        import win32con
+        import win32event
+        import win32file
+        self._event, self._file = win32event, win32file
+        flags = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME | win32con.FILE_NOTIFY_CHANGE_SIZE
+                 | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        self.handle = win32file.FindFirstChangeNotification(directory, False, flags)
+
+    def wait(self, timeout):
+        fired = self._event.WaitForSingleObject(self.handle, int(timeout * 1000)) == self._event.WAIT_OBJECT_0
+        if fired:
+            self._file.FindNextChangeNotification(self.handle)
+        return fired
+
+    def close(self):
+        self._file.FindCloseChangeNotification(self.handle)
+
+
+class _Polling:
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+def _notifier(directory):
+    for cls in (_Inotify, _Win32ChangeNotification):
+        try:
+            return cls(directory)
+        except Exception:
+            continue
+    return _Polling()
+
+
+class ExportWatcher:
+    def __init__(self, directory, patterns=('*.xlsx', '*.xls'), stable_for=0.5, poll_interval=0.25):
+        self.directory = directory
+        self.patterns = patterns
+        self.stable_for = stable_for
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+        self._notify = _notifier(directory)
+        self.mode = type(self._notify).__name__.strip('_')
+        self.results = []
+        self.arm()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._notify.close()
+
+    def _scan(self):
+        files = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if not any(fnmatch.fnmatch(name, p) for p in self.patterns):
+                        continue
+                    if any(fnmatch.fnmatch(name, p) for p in IGNORED):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.path] = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return files
+
+    def arm(self):
+        """Take the baseline; the next wait_for_export reports files written after this point."""
+        self._baseline = self._scan()
+        self._armed_at = time.monotonic()
+
+    def wait_for_export(self, expected=None, timeout=60.0):
+        """
+        Wait for a new or rewritten workbook (the `expected` path if given) whose size and mtime
+        are stable. Returns an Export, or raises RuntimeError on timeout.
+        """
+        expected = os.path.normcase(os.path.abspath(expected)) if expected else None
+        deadline = time.monotonic() + timeout
+        first_seen = {}   # path -> monotonic time first seen
+        last = {}         # path -> ((size, mtime), monotonic time it last changed)
+        while True:
+            now = time.monotonic()
+            for path, sig in self._scan().items():
+                if self._baseline.get(path) == sig:
+                    continue
+                if expected and os.path.normcase(os.path.abspath(path)) != expected:
+                    continue
+                first_seen.setdefault(path, now)
+                if path not in last or last[path][0] != sig:
+                    last[path] = (sig, now)
+                elif sig[0] > 0 and now - last[path][1] >= self.stable_for:
+                    result = Export(path, sig[0], first_seen[path] - self._armed_at, now - first_seen[path])
+                    self.results.append(result)
+                    self._baseline[path] = sig
+                    return result
+            if now >= deadline:
+                what = expected or f"a new workbook in {self.directory}"
+                raise RuntimeError(f"Export not written within {timeout}s: {what}")
+            # something is being written: rescan after the stability window, else sleep on the notifier
+            wait = self.stable_for if last else self.poll_interval
+            self._notify.wait(min(wait, max(deadline - now, 0)))
@@ -0,0 +1,53 @@
+"""
+Where exported workbooks go and what they are called.
+
+With an output directory the Save As step types the full path straight into the
+file name box (see script_core.save_as_direct), so every export lands at a
+predictable name instead of whatever STRAVIS proposes in Downloads.
+"""
+import os
+import re
+import string
+from datetime import datetime
+
+# fields: {period}, {entity}, {timestamp}, {index} (1-based position in the run)
+DEFAULT_NAME_TEMPLATE = '{period}_{entity}_{timestamp}.xlsx'
+
+_INVALID_CHARS = re.compile(r'[<>:"/\\|?*]')
+
+
+def downloads_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), "Downloads")
+
+
+def export_path(output_dir, period, entity, index=0, template=DEFAULT_NAME_TEMPLATE, when=None):
+    stamp = (when or datetime.now()).strftime('%Y%m%d-%H%M%S')
+    name = template.format(period=period, entity=entity, timestamp=stamp, index=index + 1)
+    name = _INVALID_CHARS.sub('_', name)
+    if not name.lower().endswith(('.xlsx', '.xls')):
+        name += '.xlsx'
+    return os.path.join(output_dir, name)
+
+
+_FIELD_PATTERNS = {
+    'period': r'(?P<period>\d{4}\.\d{2})',
+    'entity': r'(?P<entity>.+?)',
+    'timestamp': r'(?P<timestamp>\d{8}-\d{6})',
+    'index': r'(?P<index>\d+)',
+}
+
+
+def parse_export_name(path, template=DEFAULT_NAME_TEMPLATE):
+    """Fields export_path put into the file name ({'period': ..., 'entity': ...}), or {} if it does not match."""
+    if not template.lower().endswith(('.xlsx', '.xls')):
+        template += '.xlsx'
+    pattern, seen = '', set()
+    for literal, field, _, _ in string.Formatter().parse(template):
+        pattern += re.escape(_INVALID_CHARS.sub('_', literal))
+        if field in seen:
+            pattern += f'(?P={field})'
+        elif field:
+            pattern += _FIELD_PATTERNS.get(field, f'(?P<{field}>.+?)')
+            seen.add(field)
+    m = re.fullmatch(pattern, os.path.basename(path), re.IGNORECASE)
+    return {k: v for k, v in m.groupdict().items() if v is not None} if m else {}
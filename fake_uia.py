@@ -0,0 +1,606 @@
+"""
+In-memory stand-in for the parts of the uiautomation API that script_core uses.
+
+Controls can be scheduled to appear / disappear after a delay (show(after=...),
+hide(after=...)) so waits can be exercised against realistic latencies on any OS.
+Searches are lazy like uiautomation's: desktop.WindowControl(Name='Save As') only
+walks the tree when Exists() / an attribute is used. Every tree query is counted
+in desktop.stats so benchmarks can report how much work a helper caused; setting
+CALL_LATENCY adds a simulated cross-process round-trip cost to each of them.
+Mutations raise the same notifications UIA would (see uia_events.FakeEventSource),
+at the moment the change becomes visible.
+"""
+import collections
+import itertools
+import threading
+import time
+
+from uia_events import WINDOW_OPENED, WINDOW_CLOSED, STRUCTURE, FOCUS, PROPERTY
+
+CONTROL_TYPES = (
+    'ButtonControl', 'CheckBoxControl', 'ComboBoxControl', 'CustomControl', 'DataGridControl',
+    'DataItemControl', 'EditControl', 'GroupControl', 'HeaderControl', 'ListControl',
+    'ListItemControl', 'MenuItemControl', 'PaneControl', 'TabControl', 'TabItemControl',
+    'TableControl', 'TextControl', 'ToolBarControl', 'TreeControl', 'TreeItemControl',
+    'WindowControl',
+)
+
+# UIA property ids understood by conditions and GetCachedPropertyValue
+RUNTIME_ID_PROPERTY = 30000
+CONTROL_TYPE_PROPERTY = 30003
+NAME_PROPERTY = 30005
+AUTOMATION_ID_PROPERTY = 30011
+VALUE_PROPERTY = 30045
+TOGGLE_STATE_PROPERTY = 30086
+
+TREE_SCOPE_ELEMENT = 1
+TREE_SCOPE_CHILDREN = 2
+TREE_SCOPE_DESCENDANTS = 4
+PROPERTY_CONDITION_MATCH_SUBSTRING = 2
+
+# seconds burnt per counted call; 0 keeps the fake as fast as plain Python
+CALL_LATENCY = 0.0
+
+_runtime_ids = itertools.count(1)
+
+
+def _round_trip(stats, kind):
+    stats[kind] += 1
+    if CALL_LATENCY:
+        end = time.perf_counter() + CALL_LATENCY
+        while time.perf_counter() < end:
+            pass
+
+
+class _Pattern:
+    def __init__(self, ctrl):
+        self._ctrl = ctrl
+
+
+class _InvokePattern(_Pattern):
+    def Invoke(self):
+        self._ctrl._fire()
+
+
+class _SelectionItemPattern(_Pattern):
+    @property
+    def IsSelected(self):
+        return self._ctrl.selected
+
+    def Select(self, waitTime=0):
+        self._ctrl.set(selected=True)
+        self._ctrl._fire()
+
+
+class _ValuePattern(_Pattern):
+    @property
+    def Value(self):
+        return self._ctrl.value
+
+    def SetValue(self, value, waitTime=0):
+        self._ctrl.set(value=value)
+        if self._ctrl.on_value:
+            self._ctrl.on_value(self._ctrl, value)
+
+
+class _TogglePattern(_Pattern):
+    @property
+    def ToggleState(self):
+        return self._ctrl.toggle_state
+
+    def Toggle(self, waitTime=0):
+        self._ctrl.set(toggle_state=0 if self._ctrl.toggle_state else 1)
+        self._ctrl._fire()
+
+
+class _ExpandCollapsePattern(_Pattern):
+    @property
+    def ExpandCollapseState(self):
+        return 1 if self._ctrl.expanded else 0
+
+    def Expand(self, waitTime=0):
+        self._ctrl._expand(True)
+
+    def Collapse(self, waitTime=0):
+        self._ctrl._expand(False)
+
+
+class _WindowPattern(_Pattern):
+    @property
+    def IsModal(self):
+        return self._ctrl.modal
+
+    def Close(self, waitTime=0):
+        """on_close(ctrl) decides what closing does (a dialog's Cancel); default: the window goes away."""
+        self._ctrl.stats['actions'] += 1
+        if self._ctrl.on_close:
+            self._ctrl.on_close(self._ctrl)
+        elif self._ctrl.parent is not None:
+            self._ctrl.parent.remove(self._ctrl)
+
+
+class _ScrollItemPattern(_Pattern):
+    def ScrollIntoView(self, waitTime=0):
+        _round_trip(self._ctrl.stats, 'actions')
+
+
+class _GridPattern(_Pattern):
+    """Rows are the grid's visible children, cells the rows' children."""
+
+    def _rows(self):
+        return self._ctrl.GetChildren()
+
+    @property
+    def RowCount(self):
+        return len(self._rows())
+
+    @property
+    def ColumnCount(self):
+        return max((len(r.children) for r in self._rows()), default=0)
+
+    def GetItem(self, row, column):
+        _round_trip(self._ctrl.stats, 'props')
+        rows = self._rows()
+        if row < len(rows) and column < len(rows[row].children):
+            return rows[row].children[column]
+        return None
+
+
+class FakeControl:
+    def __init__(self, ControlTypeName='PaneControl', Name='', AutomationId='', children=(),
+                 value=None, enabled=True, selected=False, toggle_state=0, on_invoke=None, on_expand=None,
+                 on_value=None):
+        self._type = ControlTypeName
+        self._name = Name
+        self._aid = AutomationId
+        self.value = value
+        self.enabled = enabled
+        self.selected = selected
+        self.toggle_state = toggle_state
+        self.focused = False
+        self.on_invoke = on_invoke
+        # combo boxes / tree items: on_expand(ctrl, expand) replaces the default (flip `expanded` at once)
+        self.on_expand = on_expand
+        self.on_value = on_value  # on_value(ctrl, value) after ValuePattern.SetValue
+        self.handle = 0  # NativeWindowHandle / ProcessId, set on top-level windows where it matters
+        self.pid = 0
+        self.modal = False  # WindowPattern.IsModal
+        self.on_close = None  # on_close(ctrl) on WindowPattern.Close
+        self.expanded = False
+        self.parent = None
+        self.children = []
+        self.listeners = []
+        self.stats = collections.Counter()
+        self.shown_at = 0.0
+        self.hidden_at = None
+        self.runtime_id = (42, next(_runtime_ids))
+        for c in children:
+            self.add(c)
+
+    def __repr__(self):
+        return f"<Fake {self._type} Name={self._name!r} AutomationId={self._aid!r}>"
+
+    # ----- tree building -----
+    def add(self, child, index=None):
+        child.parent = self
+        child._share_stats(self.stats)
+        self.children.insert(len(self.children) if index is None else index, child)
+        if child.visible():
+            child._emit_shown()
+        return child
+
+    def remove(self, child):
+        # a removed element is dead, even if someone still holds a reference to it
+        was_visible = child.visible()
+        if was_visible:
+            child._emit_hidden()
+        self.children.remove(child)
+        child.parent = None
+        child.hidden_at = time.monotonic()
+
+    def _share_stats(self, stats):
+        self.stats = stats
+        for c in self.children:
+            c._share_stats(stats)
+
+    def show(self, after=0.0):
+        self.shown_at = time.monotonic() + after
+        self.hidden_at = None
+        if after > 0:
+            self._schedule(after, self._emit_shown)
+        elif self.parent is not None:
+            self._emit_shown()
+        return self
+
+    def hide(self, after=0.0):
+        self.hidden_at = time.monotonic() + after
+        if after > 0:
+            self._schedule(after, self._emit_hidden)
+        else:
+            self._emit_hidden()
+        return self
+
+    def set(self, **props):
+        """Change state (selected, enabled, value, toggle_state, ...) and raise a property event."""
+        for k, v in props.items():
+            setattr(self, k, v)
+        self._emit(PROPERTY)
+
+    # ----- notifications -----
+    def _schedule(self, after, fn):
+        t = threading.Timer(after, fn)
+        t.daemon = True
+        t.start()
+
+    def _emit(self, kind):
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        for listener in list(root.listeners):
+            listener(kind, self)
+
+    def _is_top_level_window(self):
+        return self._type == 'WindowControl' and self.parent is not None and self.parent.parent is None
+
+    def _emit_shown(self):
+        if self.parent is not None:
+            self._emit(WINDOW_OPENED if self._is_top_level_window() else STRUCTURE)
+
+    def _emit_hidden(self):
+        if self.parent is not None:
+            self._emit(WINDOW_CLOSED if self._is_top_level_window() else STRUCTURE)
+
+    def visible(self, now=None):
+        now = time.monotonic() if now is None else now
+        node = self
+        while node is not None:
+            if now < node.shown_at or (node.hidden_at is not None and now >= node.hidden_at):
+                return False
+            node = node.parent
+        return True
+
+    def walk(self):
+        yield self
+        for c in self.children:
+            yield from c.walk()
+
+    def _fire(self):
+        self.stats['actions'] += 1
+        if self.on_invoke:
+            self.on_invoke(self)
+
+    def _expand(self, expand):
+        self.stats['actions'] += 1
+        if self.on_expand:
+            self.on_expand(self, expand)
+        else:
+            self.set(expanded=expand)
+
+    # ----- uiautomation-like properties (each read counts as one cross-process call) -----
+    @property
+    def Name(self):
+        _round_trip(self.stats, 'props')
+        return self._name
+
+    @Name.setter
+    def Name(self, value):
+        self._name = value
+
+    @property
+    def ControlTypeName(self):
+        _round_trip(self.stats, 'props')
+        return self._type
+
+    @property
+    def AutomationId(self):
+        _round_trip(self.stats, 'props')
+        return self._aid
+
+    @property
+    def IsEnabled(self):
+        _round_trip(self.stats, 'props')
+        return self.enabled
+
+    @property
+    def NativeWindowHandle(self):
+        _round_trip(self.stats, 'props')
+        return self.handle
+
+    @property
+    def ProcessId(self):
+        _round_trip(self.stats, 'props')
+        return self.pid
+
+    @property
+    def HasKeyboardFocus(self):
+        _round_trip(self.stats, 'props')
+        return self.focused
+
+    @property
+    def Element(self):
+        return self
+
+    # ----- uiautomation-like methods -----
+    def Exists(self, maxSearchSeconds=0, searchIntervalSeconds=0.5):
+        _round_trip(self.stats, 'exists')
+        return self.visible()
+
+    def GetChildren(self):
+        _round_trip(self.stats, 'get_children')
+        now = time.monotonic()
+        return [c for c in self.children if c.visible(now)]
+
+    def GetRuntimeId(self):
+        _round_trip(self.stats, 'props')
+        return list(self.runtime_id)
+
+    def GetInvokePattern(self):
+        return _InvokePattern(self)
+
+    def GetSelectionItemPattern(self):
+        return _SelectionItemPattern(self)
+
+    def GetValuePattern(self):
+        return _ValuePattern(self)
+
+    def GetTogglePattern(self):
+        return _TogglePattern(self)
+
+    def GetExpandCollapsePattern(self):
+        if self._type in ('ComboBoxControl', 'TreeItemControl') or self.on_expand:
+            return _ExpandCollapsePattern(self)
+        return None
+
+    def GetWindowPattern(self):
+        return _WindowPattern(self) if self._type == 'WindowControl' else None
+
+    def GetScrollItemPattern(self):
+        return _ScrollItemPattern(self)
+
+    def GetGridPattern(self):
+        return _GridPattern(self) if self._type in ('DataGridControl', 'TableControl') else None
+
+    def GetParentControl(self):
+        _round_trip(self.stats, 'props')
+        return self.parent
+
+    def GetTopLevelControl(self):
+        _round_trip(self.stats, 'props')
+        node = self
+        while node.parent is not None and node.parent.parent is not None:
+            node = node.parent
+        return node
+
+    def Click(self, *args, **kwargs):
+        self._fire()
+
+    def DoubleClick(self, *args, **kwargs):
+        self._fire()
+
+    def SetFocus(self):
+        self.focused = True
+        self._emit(FOCUS)
+        return True
+
+    def Control(self, **kwargs):
+        return FakeSearch(self, None, **kwargs)
+
+    # IUIAutomationElement-style batched query: children plus cached properties in one call
+    def _property(self, property_id):
+        return {RUNTIME_ID_PROPERTY: self.runtime_id, CONTROL_TYPE_PROPERTY: self._type,
+                NAME_PROPERTY: self._name, AUTOMATION_ID_PROPERTY: self._aid,
+                VALUE_PROPERTY: self.value, TOGGLE_STATE_PROPERTY: self.toggle_state}.get(property_id)
+
+    def _scoped(self, scope):
+        """Visible nodes in TreeScope order: the element itself, then children or all descendants (pre-order)."""
+        now = time.monotonic()
+        if scope & TREE_SCOPE_ELEMENT:
+            yield self
+        if scope & TREE_SCOPE_DESCENDANTS:
+            stack = list(reversed(self.children))
+            while stack:
+                node = stack.pop()
+                if node.visible(now):
+                    yield node
+                    stack.extend(reversed(node.children))
+        elif scope & TREE_SCOPE_CHILDREN:
+            yield from (c for c in self.children if c.visible(now))
+
+    # IUIAutomationElement-style batched queries: matching elements plus cached properties in one call
+    @property
+    def automation(self):
+        return automation
+
+    def FindAllBuildCache(self, scope, condition, cache_request):
+        _round_trip(self.stats, 'batched')
+        return _ElementArray([_CachedElement(n, cache_request) for n in self._scoped(scope)
+                              if condition is None or condition.matches(n)])
+
+    def FindFirstBuildCache(self, scope, condition, cache_request):
+        _round_trip(self.stats, 'batched')
+        for n in self._scoped(scope):
+            if condition is None or condition.matches(n):
+                return _CachedElement(n, cache_request)
+        return None
+
+    def BuildUpdatedCache(self, cache_request):
+        _round_trip(self.stats, 'batched')
+        return _CachedElement(self, cache_request, with_children=True)
+
+    def __getattr__(self, attr):
+        if attr in CONTROL_TYPES:
+            return lambda **kwargs: FakeSearch(self, attr, **kwargs)
+        raise AttributeError(attr)
+
+
+class _CachedElement:
+    def __init__(self, ctrl, cache_request=None, with_children=False):
+        self.ctrl = ctrl
+        self.automation = automation
+        self.CachedName = ctrl._name
+        self.CachedControlType = ctrl._type
+        self._values = {pid: ctrl._property(pid) for pid in
+                        (RUNTIME_ID_PROPERTY, CONTROL_TYPE_PROPERTY, NAME_PROPERTY, AUTOMATION_ID_PROPERTY, VALUE_PROPERTY,
+                         TOGGLE_STATE_PROPERTY)}
+        self._children = None
+        # a cache request with TreeScope Subtree brings the whole subtree back in the same call
+        if with_children and cache_request is not None and cache_request.TreeScope & (TREE_SCOPE_CHILDREN | TREE_SCOPE_DESCENDANTS):
+            deep = cache_request.TreeScope & TREE_SCOPE_DESCENDANTS
+            now = time.monotonic()
+            self._children = [_CachedElement(c, cache_request, with_children=bool(deep))
+                              for c in ctrl.children if c.visible(now)]
+
+    def GetCachedPropertyValue(self, property_id):
+        return self._values.get(property_id)
+
+    def GetCachedChildren(self):
+        return _ElementArray(self._children) if self._children else None
+
+    def FindAllBuildCache(self, scope, condition, cache_request):
+        return self.ctrl.FindAllBuildCache(scope, condition, cache_request)
+
+    def FindFirstBuildCache(self, scope, condition, cache_request):
+        return self.ctrl.FindFirstBuildCache(scope, condition, cache_request)
+
+    def BuildUpdatedCache(self, cache_request):
+        return self.ctrl.BuildUpdatedCache(cache_request)
+
+
+class _ElementArray:
+    def __init__(self, items):
+        self._items = items
+        self.Length = len(items)
+
+    def GetElement(self, index):
+        return self._items[index]
+
+
+class _Condition:
+    def __init__(self, test):
+        self.matches = test
+
+
+class _CacheRequest:
+    def __init__(self):
+        self.properties = []
+        self.TreeScope = TREE_SCOPE_ELEMENT
+        self.TreeFilter = None
+
+    def AddProperty(self, property_id):
+        self.properties.append(property_id)
+
+
+class FakeAutomation:
+    """The IUIAutomation factory methods used to build conditions and cache requests."""
+
+    def CreateTrueCondition(self):
+        return _Condition(lambda node: True)
+
+    def CreatePropertyCondition(self, property_id, value):
+        return _Condition(lambda node: node._property(property_id) == value)
+
+    def CreatePropertyConditionEx(self, property_id, value, flags):
+        if flags & PROPERTY_CONDITION_MATCH_SUBSTRING:
+            return _Condition(lambda node: value in (node._property(property_id) or ''))
+        return self.CreatePropertyCondition(property_id, value)
+
+    def CreateAndCondition(self, a, b):
+        return _Condition(lambda node: a.matches(node) and b.matches(node))
+
+    def CreateOrCondition(self, a, b):
+        return _Condition(lambda node: a.matches(node) or b.matches(node))
+
+    def CreateCacheRequest(self):
+        return _CacheRequest()
+
+
+automation = FakeAutomation()
+
+
+class FakeSearch:
+    """Lazy search result, resolved on every Exists() / attribute access like uiautomation's Control."""
+
+    def __init__(self, search_from, control_type, Name=None, AutomationId=None, searchDepth=0xFFFFFFFF, **_ignored):
+        self._from = search_from
+        self._type = control_type
+        self._name = Name
+        self._aid = AutomationId
+        self._depth = searchDepth
+
+    def __repr__(self):
+        return f"<FakeSearch {self._type or 'Control'} Name={self._name!r} AutomationId={self._aid!r}>"
+
+    def _match(self, node):
+        return ((self._type is None or node._type == self._type)
+                and (self._name is None or node._name == self._name)
+                and (self._aid is None or node._aid == self._aid))
+
+    def _find(self):
+        root = self._from._find() if isinstance(self._from, FakeSearch) else self._from
+        if root is None or not root.visible():
+            return None
+        _round_trip(root.stats, 'searches')
+        now = time.monotonic()
+        stack = [(c, 1) for c in reversed(root.children)]
+        while stack:
+            node, depth = stack.pop()
+            if not node.visible(now):
+                continue
+            root.stats['nodes_visited'] += 1
+            if self._match(node):
+                return node
+            if depth < self._depth:
+                stack.extend((c, depth + 1) for c in reversed(node.children))
+        return None
+
+    def Exists(self, maxSearchSeconds=5, searchIntervalSeconds=0.5):
+        end = time.monotonic() + maxSearchSeconds
+        while True:
+            if self._find() is not None:
+                return True
+            if time.monotonic() >= end:
+                return False
+            time.sleep(searchIntervalSeconds)
+
+    def Control(self, **kwargs):
+        return FakeSearch(self, None, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr in CONTROL_TYPES:
+            return lambda **kwargs: FakeSearch(self, attr, **kwargs)
+        node = self._find()
+        if node is None:
+            raise LookupError(f"Find Control Timeout: {self!r}")
+        return getattr(node, attr)
+
+
+def FakeDesktop(*windows):
+    return FakeControl('PaneControl', 'Desktop', children=windows)
+
+
+def build_stravis(grid_rows=5):
+    """
+    Minimal STRAVIS window: ribbon (tabs + Lower Ribbon/Operation/File) and an empty
+    report area. Returns (desktop, stravis); named parts are reachable via stravis.parts.
+    """
+    op_tab = FakeControl('TabItemControl', 'Operation')
+    op_tab.on_invoke = lambda c: c.set(selected=True)
+    save_btn = FakeControl('ButtonControl', 'Save As Excel')
+    close_btn = FakeControl('ButtonControl', 'Close')
+    ribbon = FakeControl('PaneControl', 'The Ribbon', children=[
+        FakeControl('TabControl', 'Ribbon Tabs', children=[FakeControl('TabItemControl', 'Home'), op_tab]),
+        FakeControl('PaneControl', 'Lower Ribbon', children=[
+            FakeControl('PaneControl', 'Operation', children=[
+                FakeControl('ToolBarControl', 'File', children=[save_btn]),
+                close_btn,
+            ]),
+        ]),
+    ])
+    grid = FakeControl('DataGridControl', 'Report', children=[
+        FakeControl('DataItemControl', f'Row {i}') for i in range(grid_rows)
+    ])
+    report = FakeControl('PaneControl', 'Report Area')
+    stravis = FakeControl('WindowControl', 'STRAVIS', children=[ribbon, report])
+    stravis.parts = {'ribbon': ribbon, 'op_tab': op_tab, 'save_btn': save_btn,
+                     'close_btn': close_btn, 'report': report, 'grid': grid}
+    return FakeDesktop(stravis), stravis
@@ -0,0 +1,237 @@
+"""
+Keyboard input for the flow: key sequences injected in batches, paced explicitly.
+
+pyautogui sleeps pyautogui.PAUSE (0.1 s) after every hotkey/press/write call and
+uiautomation.SendKeys waits after every call, on top of the flow's own pauses.
+Here a sequence of strokes goes to the sink in one injection (one SendInput call
+on Windows) unless the caller asks for a pace between its strokes:
+
+    keys('ctrl+f')                                # one chord
+    keys('tab', 'tab', 'tab', 'enter')            # four strokes, one injection
+    keys(*['down'] * 15, pace='key')              # timing.pause('key') between strokes
+    keys('tab', settle='tab_focus')               # and/or after the sequence
+    write('2025.03')                              # text, one injection
+    hold('shift', *['down'] * 20, lead='shift_hold', pace='list_key')
+
+pace / settle / lead are a timing.PAUSES name (learned per host, see timing.py)
+or seconds. Chords are key names joined by '+': 'ctrl+a', 'alt+down', 'f5', 'x'.
+
+The sink is SendInputSink on Windows; use_sink() swaps in another one, e.g.
+RecordingSink (keeps what was injected and when, for checking a flow on Linux)
+or sim_stravis' simulated keyboard. stats() is the input cost of the run so far:
+strokes, injections, seconds inside the sink and seconds spent pacing.
+
+gates are checks run before every injection; one may block (hold the keystrokes
+while a dialog the flow did not open is up) or raise (abort the step), see
+dialog_watchdog.py. Key releases skip them: a held modifier is always let go.
+"""
+import collections
+import ctypes
+import sys
+import time
+
+import timing
+from tracing import note
+
+# stroke: ('key', chord) pressed and released, ('down', key) / ('up', key) held or let go, ('text', str)
+KEY, DOWN, UP, TEXT = 'key', 'down', 'up', 'text'
+
+_sink = None
+_stats = collections.Counter()
+# callables run before each injection, in the injecting thread
+gates = []
+
+
+# ------------- sinks -------------
+
+class RecordingSink:
+    """Keeps every injection as (seconds since creation, [strokes]) instead of sending it anywhere."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.injections = []
+
+    def inject(self, strokes):
+        self.injections.append((round(time.perf_counter() - self.t0, 4), list(strokes)))
+
+    def strokes(self):
+        return [s for _, batch in self.injections for s in batch]
+
+
+_VK = {
+    'backspace': 0x08, 'tab': 0x09, 'enter': 0x0D, 'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12,
+    'pause': 0x13, 'capslock': 0x14, 'esc': 0x1B, 'escape': 0x1B, 'space': 0x20,
+    'pageup': 0x21, 'pagedown': 0x22, 'end': 0x23, 'home': 0x24,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28, 'insert': 0x2D, 'delete': 0x2E,
+    'win': 0x5B, 'apps': 0x5D,
+}
+_VK.update({f'f{n}': 0x6F + n for n in range(1, 13)})
+# keys on the extended part of the keyboard; without the flag they arrive as the numpad keys
+_EXTENDED = {0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2D, 0x2E, 0x5B, 0x5D}
+
+_INPUT_KEYBOARD = 1
+_KEYEVENTF_EXTENDEDKEY = 0x0001
+_KEYEVENTF_KEYUP = 0x0002
+_KEYEVENTF_UNICODE = 0x0004
+
+
+def _vk(key):
+    key = key.lower()
+    if key in _VK:
+        return _VK[key]
+    if len(key) == 1 and key.isalnum():
+        return ord(key.upper())
+    raise RuntimeError(f"Unknown key '{key}'")
+
+
+class SendInputSink:
+    """user32.SendInput: each injection is one call carrying all of its key events."""
+
+    def __init__(self):
+        if sys.platform != 'win32':
+            raise RuntimeError('SendInput needs Windows; use keyinput.use_sink() elsewhere')
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                        ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                        ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        class _U(ctypes.Union):
+            _fields_ = [('ki', KEYBDINPUT), ('mi', MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('u', _U)]
+
+        self.INPUT, self.KEYBDINPUT, self._U, self.POINT = INPUT, KEYBDINPUT, _U, wintypes.POINT
+        self.user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self.user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+        self.user32.SendInput.restype = wintypes.UINT
+
+    def _key(self, vk, up=False):
+        flags = (_KEYEVENTF_KEYUP if up else 0) | (_KEYEVENTF_EXTENDEDKEY if vk in _EXTENDED else 0)
+        return self.INPUT(type=_INPUT_KEYBOARD, u=self._U(ki=self.KEYBDINPUT(wVk=vk, dwFlags=flags)))
+
+    def _char(self, unit, up=False):
+        flags = _KEYEVENTF_UNICODE | (_KEYEVENTF_KEYUP if up else 0)
+        return self.INPUT(type=_INPUT_KEYBOARD, u=self._U(ki=self.KEYBDINPUT(wScan=unit, dwFlags=flags)))
+
+    def _failsafe(self):
+        # pyautogui's FAILSAFE: the mouse pushed into a screen corner stops the run
+        pt = self.POINT()
+        if not self.user32.GetCursorPos(ctypes.byref(pt)):
+            return
+        w, h = self.user32.GetSystemMetrics(0) - 1, self.user32.GetSystemMetrics(1) - 1
+        if (pt.x, pt.y) in ((0, 0), (w, 0), (0, h), (w, h)):
+            raise RuntimeError('Stopped: mouse moved to a screen corner (fail-safe)')
+
+    def events(self, strokes):
+        out = []
+        for kind, value in strokes:
+            if kind == KEY:
+                vks = [_vk(k) for k in value.split('+')]
+                out += [self._key(vk) for vk in vks] + [self._key(vk, up=True) for vk in reversed(vks)]
+            elif kind in (DOWN, UP):
+                out.append(self._key(_vk(value), up=kind == UP))
+            elif kind == TEXT:
+                data = value.encode('utf-16-le')
+                for i in range(0, len(data), 2):
+                    unit = int.from_bytes(data[i:i + 2], 'little')
+                    out += [self._char(unit), self._char(unit, up=True)]
+        return out
+
+    def inject(self, strokes):
+        self._failsafe()
+        events = self.events(strokes)
+        if not events:
+            return
+        arr = (self.INPUT * len(events))(*events)
+        sent = self.user32.SendInput(len(events), arr, ctypes.sizeof(self.INPUT))
+        if sent != len(events):
+            raise RuntimeError(f"SendInput injected {sent} of {len(events)} key events "
+                               f"(error {ctypes.get_last_error()}; blocked by a higher-integrity window?)")
+
+
+def use_sink(sink):
+    """Send input to `sink` (anything with inject(strokes)); None goes back to SendInput."""
+    global _sink
+    _sink = sink
+
+
+def _current():
+    global _sink
+    if _sink is None:
+        _sink = SendInputSink()
+    return _sink
+
+
+# ------------- sequences -------------
+
+def _wait(what, key):
+    if not what:
+        return
+    start = time.perf_counter()
+    if isinstance(what, str):
+        timing.pause(what)
+    else:
+        time.sleep(what)
+    _stats[key] += time.perf_counter() - start
+
+
+def _inject(strokes, gated=True):
+    if gated:
+        for gate in list(gates):
+            gate()
+    start = time.perf_counter()
+    _current().inject(strokes)
+    _stats['inject_s'] += time.perf_counter() - start
+    _stats['injections'] += 1
+
+
+def send(strokes, pace=0, settle=None, gated=True):
+    """
+    Inject `strokes`: all at once, or one at a time with `pace` between them; then wait `settle`.
+    gated=False: do not run the gates first (releasing keys must not wait for a dialog).
+    """
+    strokes = list(strokes)
+    _stats['sequences'] += 1
+    _stats['strokes'] += len(strokes)
+    note('keystrokes', len(strokes))
+    if not pace:
+        _inject(strokes, gated)
+    else:
+        for i, stroke in enumerate(strokes):
+            if i:
+                _wait(pace, 'paced_s')
+            _inject([stroke], gated)
+    _wait(settle, 'settle_s')
+
+
+def keys(*chords, pace=0, settle=None):
+    send([(KEY, c.lower()) for c in chords], pace=pace, settle=settle)
+
+
+def write(text, settle=None):
+    send([(TEXT, text)], settle=settle)
+
+
+def hold(modifier, *chords, lead=None, pace=0, settle=None):
+    """Hold `modifier` down (for `lead` first, so the target sees it) while `chords` are sent."""
+    send([(DOWN, modifier)])
+    try:
+        _wait(lead, 'paced_s')
+        send([(KEY, c.lower()) for c in chords], pace=pace)
+    finally:
+        send([(UP, modifier)], settle=settle, gated=False)
+
+
+def stats():
+    """Input cost so far: sequences, strokes, injections, and seconds injecting / pacing / settling."""
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in sorted(_stats.items())}
+
+
+def reset_stats():
+    _stats.clear()
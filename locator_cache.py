@@ -0,0 +1,76 @@
+"""
+Per-run cache for controls that are looked up over and over (ribbon, Lower Ribbon,
+toolbar buttons).
+
+Each logical key (e.g. ('tab', 'Operation')) is resolved once with a deep search,
+then remembered by its UIA runtime ID. Before a cached control is reused it is
+revalidated cheaply (Exists on the element + same runtime ID); a stale entry is
+dropped and the key re-resolved.
+"""
+
+
+class LocatorCache:
+    def __init__(self, freeze=None):
+        # freeze turns a searched (lazy) control into one bound to its element, so that
+        # revalidation does not trigger another tree search
+        self.freeze = freeze or (lambda ctrl: ctrl)
+        self._ids = {}        # logical key -> runtime id
+        self._controls = {}   # runtime id -> control
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, resolve):
+        """
+        Return the control for `key`, calling resolve() only on a miss.
+        resolve must return an existing control (already checked with Exists / find_with_retry)
+        or None; None is returned as-is and not cached.
+        """
+        rid = self._ids.get(key)
+        if rid is not None:
+            ctrl = self._controls.get(rid)
+            if ctrl is not None and self._still_valid(ctrl, rid):
+                self.hits += 1
+                return ctrl
+            self.stale += 1
+            self._drop(rid)
+
+        self.misses += 1
+        ctrl = resolve()
+        if ctrl is None:
+            return None
+        try:
+            ctrl = self.freeze(ctrl)
+            rid = tuple(ctrl.GetRuntimeId())
+        except Exception:
+            return ctrl
+        self._ids[key] = rid
+        self._controls[rid] = ctrl
+        return ctrl
+
+    def _still_valid(self, ctrl, rid):
+        try:
+            return ctrl.Exists(0, 0) and tuple(ctrl.GetRuntimeId()) == rid
+        except Exception:
+            return False
+
+    def _drop(self, rid):
+        self._controls.pop(rid, None)
+        for k in [k for k, v in self._ids.items() if v == rid]:
+            del self._ids[k]
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._ids.clear()
+            self._controls.clear()
+            return
+        rid = self._ids.get(key)
+        if rid is not None:
+            self._drop(rid)
+
+    def reset(self):
+        self.invalidate()
+        self.hits = self.misses = self.stale = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'entries': len(self._ids)}
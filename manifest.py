@@ -0,0 +1,141 @@
+"""
+Run manifest: which (period, entity) exports already landed, so a failed run can
+resume with only the missing ones.
+
+The manifest is a JSON file next to the exports, rewritten (atomically) after
+every entity. Runs saving into the same folder take turns (a lock file next to
+it) and each one's save merges in what the others recorded. An entry counts as
+done only if its file still exists, has the recorded size and SHA-256, and (for
+.xlsx) is a readable zip container.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+import zipfile
+
+MANIFEST_NAME = 'stravis_manifest.json'
+
+DONE = 'done'
+FAILED = 'failed'
+# seconds a save waits for another writer's lock
+LOCK_TIMEOUT = 30.0
+
+
+def file_sha256(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_path(output_dir):
+    return os.path.join(output_dir, MANIFEST_NAME)
+
+
+if sys.platform == 'win32':
+    import msvcrt
+
+    def _lock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(f):
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def locked(path, timeout=LOCK_TIMEOUT):
+    """Hold the lock on `path` (`path`.lock) while reading, merging and rewriting it. Not reentrant."""
+    with open(path + '.lock', 'a+b') as f:
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                _lock(f)
+                break
+            except OSError:
+                if time.monotonic() >= end:
+                    raise RuntimeError(f"{path} is still locked by another run after {timeout:.0f}s")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def write_json(path, data):
+    """Replace `path` with `data` atomically, through a temporary file of this writer's own."""
+    tmp = f'{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+class RunManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._read()
+        self._changed = set()     # keys recorded since the last save
+
+    def _read(self):
+        entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for entry in json.load(f).get('entries', []):
+                    entries[(entry['period'], entry['entity'])] = entry
+        return entries
+
+    def save(self):
+        """Write the entries back, merged with what other runs recorded meanwhile (this run's win)."""
+        with locked(self.path):
+            entries = self._read()
+            entries.update((key, self.entries[key]) for key in self._changed)
+            self.entries = entries
+            write_json(self.path, {'entries': list(entries.values())})
+            self._changed.clear()
+
+    def record(self, period, entity, path=None, status=DONE, error=None):
+        entry = {'period': period, 'entity': entity, 'path': path, 'status': status,
+                 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if status == DONE:
+            entry['bytes'] = os.path.getsize(path)
+            entry['sha256'] = file_sha256(path)
+        if error:
+            entry['error'] = error
+        self.entries[(period, entity)] = entry
+        self._changed.add((period, entity))
+        self.save()
+        return entry
+
+    def verify(self, period, entity):
+        """True if the export for (period, entity) is recorded done and its file is intact."""
+        entry = self.entries.get((period, entity))
+        if not entry or entry['status'] != DONE:
+            return False
+        path = entry['path']
+        try:
+            if os.path.getsize(path) != entry['bytes']:
+                return False
+            if path.lower().endswith('.xlsx') and not zipfile.is_zipfile(path):
+                return False
+            return file_sha256(path) == entry['sha256']
+        except OSError:
+            return False
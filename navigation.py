@@ -0,0 +1,219 @@
+"""
+Move around lists, grids and drop-downs through UIA control patterns instead of
+keystroke loops.
+
+  select_item        SelectionItem.Select (+ ScrollIntoView, SetFocus) on a row or item
+  find_row           the list/grid row whose Name contains a text (e.g. an entity code)
+  grid_cell          GridPattern.GetItem(row, column)
+  choose_combo_item  ExpandCollapse.Expand, select an item by name or by offset from the
+                     current one, Collapse
+  read_checklist     names and check states of a whole list in one batched read
+  set_checked        Toggle exactly the items whose check state is not the wanted one
+  enter_text         ValuePattern.SetValue on a search / period field, confirmed, then wait
+                     for the list it filters
+
+Each helper returns a falsy value when the control does not support the pattern or
+the target is not there, so the caller can fall back to the keystrokes the flow
+used before. STRAVIS_NAV=keys forces the keystroke paths everywhere.
+
+uiautomation pattern calls sleep OPERATION_WAIT_TIME (0.5 s) afterwards unless
+told otherwise; every call here passes waitTime=0 and waits on the UI instead.
+"""
+import os
+
+from readiness import wait_ready
+from tree_search import find_first, find_all, NAME_PROPERTY, TOGGLE_STATE_PROPERTY
+from uia_events import STRUCTURE, PROPERTY
+
+ROW_TYPES = ('DataItemControl', 'ListItemControl', 'TreeItemControl')
+
+
+def enabled():
+    return os.environ.get('STRAVIS_NAV', '').lower() != 'keys'
+
+
+def _pattern(ctrl, getter):
+    if ctrl is None or not enabled():
+        return None
+    try:
+        return getattr(ctrl, getter)()
+    except Exception:
+        return None
+
+
+def select_item(item, focus=True):
+    """Select `item` (list/grid row, combo item), scrolled into view and focused. True on success."""
+    sel = _pattern(item, 'GetSelectionItemPattern')
+    if sel is None:
+        return False
+    scroll = _pattern(item, 'GetScrollItemPattern')
+    try:
+        if scroll is not None:
+            scroll.ScrollIntoView(waitTime=0)
+        sel.Select(waitTime=0)
+        if focus:
+            item.SetFocus()
+    except Exception:
+        return False
+    return True
+
+
+def find_row(root, text, types=ROW_TYPES):
+    """First row below root (of the given control types, in that order) named `text`, else containing it."""
+    if root is None or not enabled():
+        return None
+    for control_type in types:
+        row = (find_first(root, control_type=control_type, name=text)
+               or find_first(root, control_type=control_type, name_contains=text))
+        if row is not None:
+            return row
+    return None
+
+
+def grid_cell(grid, row, column):
+    """Cell (row, column) of a grid supporting GridPattern, or None."""
+    gp = _pattern(grid, 'GetGridPattern')
+    if gp is None:
+        return None
+    try:
+        if row >= gp.RowCount or column >= gp.ColumnCount:
+            return None
+        return gp.GetItem(row, column)
+    except Exception:
+        return None
+
+
+def _combo_items(combo):
+    """List items of a combo box: its own ListItem children or those of its drop-down list."""
+    items = []
+    for child in combo.GetChildren():
+        if child.ControlTypeName == 'ListItemControl':
+            items.append(child)
+        elif child.ControlTypeName == 'ListControl':
+            items.extend(c for c in child.GetChildren() if c.ControlTypeName == 'ListItemControl')
+    return items
+
+
+def _is_selected(item):
+    try:
+        return bool(item.GetSelectionItemPattern().IsSelected)
+    except Exception:
+        return False
+
+
+def choose_combo_item(combo, name=None, offset=None, timeout=3.0):
+    """
+    Open `combo`, select the item called `name` (or `offset` positions after the selected
+    one, like pressing DOWN `offset` times) and close it again. True on success; on False
+    the combo is left closed and nothing was chosen.
+    """
+    ec = _pattern(combo, 'GetExpandCollapsePattern')
+    if ec is None:
+        return False
+    items = []
+
+    def listed():
+        items[:] = _combo_items(combo)
+        return bool(items)
+    listed.desc = 'combo items listed'
+    listed.kinds = (STRUCTURE, PROPERTY)
+
+    def collapsed():
+        return ec.ExpandCollapseState == 0
+    collapsed.desc = 'combo collapsed'
+    collapsed.kinds = (STRUCTURE, PROPERTY)
+
+    try:
+        ec.Expand(waitTime=0)
+        target = None
+        if wait_ready(listed, timeout=timeout, required=False):
+            if name is not None:
+                target = next((i for i in items if i.Name == name), None)
+            elif offset is not None:
+                current = next((n for n, i in enumerate(items) if _is_selected(i)), 0)
+                if 0 <= current + offset < len(items):
+                    target = items[current + offset]
+        chosen = target is not None and select_item(target, focus=False)
+    except Exception:
+        chosen = False
+    try:
+        ec.Collapse(waitTime=0)
+        wait_ready(collapsed, timeout=timeout, required=False)
+    except Exception:
+        return False
+    return chosen
+
+
+def read_checklist(root, types=ROW_TYPES):
+    """
+    {name: (control, checked)} for the checkable items below root (first control type that
+    has any), read in one batched request; None if the items do not expose Toggle.
+    """
+    if root is None or not enabled():
+        return None
+    for control_type in types:
+        try:
+            found = find_all(root, control_type, (TOGGLE_STATE_PROPERTY,))
+        except Exception:
+            return None
+        index = {props[NAME_PROPERTY]: (ctrl, props[TOGGLE_STATE_PROPERTY] == 1)
+                 for ctrl, props in found
+                 if props[NAME_PROPERTY] and props[TOGGLE_STATE_PROPERTY] is not None}
+        if index:
+            return index
+    return None
+
+
+def match_names(index, codes):
+    """{code: item name or None}: exact name first, else the single item whose name starts with the code."""
+    out = {}
+    for code in codes:
+        if code in index:
+            out[code] = code
+            continue
+        hits = [name for name in index if name.startswith(code)]
+        out[code] = hits[0] if len(hits) == 1 else None
+    return out
+
+
+def set_checked(index, want):
+    """
+    Toggle every item of read_checklist's `index` whose state differs from want(name).
+    Returns the names toggled, or None if a toggle failed (state then partly changed).
+    """
+    toggled = []
+    for name, (ctrl, checked) in index.items():
+        if bool(want(name)) == checked:
+            continue
+        try:
+            ctrl.GetTogglePattern().Toggle(waitTime=0)
+        except Exception:
+            return None
+        toggled.append(name)
+    return toggled
+
+
+def enter_text(field, text, ready=None, timeout=1.0):
+    """
+    Set `field`'s text in one ValuePattern.SetValue and confirm it took, then wait (at most
+    `timeout`, without failing) for `ready`, e.g. readiness.search_applied. False if the
+    field has no value pattern or kept another value; type the text instead then.
+    """
+    vp = _pattern(field, 'GetValuePattern')
+    if vp is None:
+        return False
+
+    def taken():
+        return field.GetValuePattern().Value == text
+    taken.desc = f"field value '{text}'"
+    taken.kinds = (PROPERTY,)
+
+    try:
+        vp.SetValue(text, waitTime=0)
+        if not wait_ready(taken, timeout=timeout, required=False):
+            return False
+    except Exception:
+        return False
+    if ready is not None:
+        wait_ready(ready, timeout=timeout, required=False)
+    return True
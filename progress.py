@@ -0,0 +1,201 @@
+"""
+Progress events from the automation to whoever is watching (the GUI).
+
+The flow calls emit() at the points a user cares about:
+
+  ('run',    {'total': 11, 'jobs': 1})                  export of `total` entities starts
+  ('step',   {'name': 'entities', 'state': 'start'})    a navigation step starts / ends
+  ('entity', {'entity': 'D341_HSO_HGM', 'period': ...}) an entity's export starts
+  ('saved',  {'entity': ..., 'path': ..., 'bytes': ...})
+  ('failed', {'entity': ..., 'error': ...})
+  ('retry',  {'what': ..., 'count': 1})                 a lookup or wait had to try again
+  ('dialog', {'name': ..., 'action': 'pause', 'state': 'open'})   a dialog the flow did not open
+                                                        (dialog_watchdog.py); 'closed' with seconds held
+
+and, while a run starts (worker_pool.py):
+
+  ('dispatched', {'clicked': t})                        the worker took the job clicked at t
+  ('foreground', {'waited': 1.2})                       STRAVIS came to the front
+  ('attached',   {})                                    attached to it and focused it
+
+Every event also carries 't' (time.time()). With no listener emit() returns at
+once. QueueSink, the listener the GUI's worker process installs, only appends to
+a list; a background thread sends what piled up to a multiprocessing queue at
+most every `interval` seconds, as one ('progress', [events]) message, with the
+step and retry chatter folded down. ProgressModel turns those events back into
+what the GUI shows: entity N of M, per-entity times, throughput and an ETA from
+the observed time per entity.
+"""
+import threading
+import time
+
+# callables receiving every (kind, data) event
+listeners = []
+
+
+def emit(kind, **data):
+    if not listeners:
+        return
+    data['t'] = time.time()
+    for fn in list(listeners):
+        fn((kind, data))
+
+
+class step:
+    """Context manager emitting step start / end (with seconds) around a block."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        emit('step', name=self.name, state='start')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        emit('step', name=self.name, state='end' if exc_type is None else 'error',
+             seconds=round(time.time() - self.start, 2))
+        return False
+
+
+def coalesce(events):
+    """Keep the important events; of the steps only the latest, of the retries one summed event."""
+    out, retries, last_step = [], None, None
+    for kind, data in events:
+        if kind == 'retry':
+            if retries is None:
+                retries = ('retry', dict(data, count=0))
+            retries[1]['count'] += data.get('count', 1)
+            retries[1]['what'], retries[1]['t'] = data.get('what'), data['t']
+        elif kind == 'step':
+            last_step = (kind, data)
+        else:
+            out.append((kind, data))
+    # a step or retry newer than everything kept goes last, so the receiver ends on the current state
+    out += [e for e in (last_step, retries) if e is not None]
+    out.sort(key=lambda e: e[1]['t'])
+    return out
+
+
+class QueueSink:
+    def __init__(self, queue, interval=0.25):
+        self.queue = queue
+        self.interval = interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='progress-sink', daemon=True)
+        self._thread.start()
+
+    def __call__(self, event):
+        with self._lock:
+            self._pending.append(event)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self.queue.put(('progress', coalesce(pending)))
+
+    def close(self):
+        """Stop the sender and send what is left (before the final result goes on the same queue)."""
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.flush()
+
+
+class ProgressModel:
+    def __init__(self, recent=5):
+        self.recent = recent
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.step = None
+        self.current = None       # entity being exported
+        self.durations = []       # (entity, seconds per iteration, 'saved' | 'failed')
+        self.started = None       # first entity's start
+        self._mark = None         # end of the previous iteration (or start of the first)
+        self.clicked = None       # when Run was clicked
+        self.focus_wait = None    # seconds the worker waited for STRAVIS to come to the front
+        self.attached = None      # when the flow attached to STRAVIS
+        self.dialogs = 0          # unexpected dialogs handled and closed
+        self.paused = None        # dialog the run is waiting for the user to close
+
+    def update(self, event):
+        kind, data = event
+        t = data.get('t', time.time())
+        if kind == 'run':
+            self.total += data.get('total', 0)
+        elif kind == 'step':
+            self.step = data['name'] if data.get('state') == 'start' else None
+        elif kind == 'entity':
+            self.current = data.get('entity')
+            if self._mark is None:
+                self._mark = self.started = t
+        elif kind in ('saved', 'failed'):
+            # an iteration is entity start to the next entity's end: open, save and close included
+            seconds = t - (self._mark if self._mark is not None else t)
+            self.durations.append((data.get('entity'), round(seconds, 1), kind))
+            self._mark = t
+            self.current = None
+            if kind == 'saved':
+                self.done += 1
+            else:
+                self.failed += 1
+        elif kind == 'retry':
+            self.retries += data.get('count', 1)
+        elif kind == 'dispatched':
+            self.clicked = data.get('clicked')
+        elif kind == 'foreground':
+            self.focus_wait = data.get('waited', 0.0)
+        elif kind == 'attached':
+            self.attached = t
+        elif kind == 'dialog':
+            if data.get('state') == 'closed':
+                self.dialogs += 1
+                self.paused = None
+            elif data.get('action') == 'pause':
+                self.paused = data.get('name')
+
+    def per_entity(self):
+        """Median of the recent iteration times, or None before the first entity finished."""
+        times = sorted(s for _, s, _ in self.durations[-self.recent:])
+        if not times:
+            return None
+        # not statistics.median: importing statistics would add ~8 ms to the GUI start-up
+        mid = len(times) // 2
+        return times[mid] if len(times) % 2 else (times[mid - 1] + times[mid]) / 2
+
+    def eta(self):
+        per = self.per_entity()
+        if per is None or not self.total:
+            return None
+        return max(self.total - self.done - self.failed, 0) * per
+
+    def throughput(self, now=None):
+        """Entities per minute since the first one started."""
+        if not self.durations or self.started is None:
+            return None
+        elapsed = (now or time.time()) - self.started
+        return 60.0 * (self.done + self.failed) / elapsed if elapsed > 0 else None
+
+    def start_latency(self):
+        """(seconds from Run to the first action on STRAVIS, of those spent waiting for it to be in front), or None."""
+        if self.clicked is None or self.attached is None:
+            return None
+        return self.attached - self.clicked, self.focus_wait or 0.0
+
+    def fraction(self):
+        return (self.done + self.failed) / self.total if self.total else 0.0
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return '–'
+    seconds = int(round(seconds))
+    return f"{seconds // 60}m {seconds % 60:02d}s" if seconds >= 60 else f"{seconds}s"
@@ -0,0 +1,151 @@
+"""
+Readiness waits for the STRAVIS flow.
+
+Instead of sleeping for the worst case, poll a named predicate with adaptive
+backoff (short intervals first, growing up to max_interval) until it holds or a
+hard ceiling is reached. Predicates only use plain control lookups
+(XxxControl / Exists / GetChildren), so they work the same against the real
+uiautomation tree and the in-memory fake in fake_uia.py.
+
+When a UI event source is running (uia_events.events), the sleeps between polls
+wake up as soon as a notification relevant to the predicate arrives.
+"""
+import time
+
+from tracing import traced, note, annotate
+from tree_search import find_all, NAME_PROPERTY
+from uia_events import events, ALL_KINDS, WINDOW_KINDS, STRUCTURE, PROPERTY, FOCUS
+
+
+@traced(args=('timeout',))
+def wait_ready(check, timeout=10.0, initial=0.05, factor=1.5, max_interval=0.5, required=True):
+    """
+    Poll check() until it returns truthy or timeout (the hard ceiling) expires.
+    Returns True when ready. On timeout raises RuntimeError, or returns False if required=False
+    (use that where the wait replaces a blind sleep and the flow should carry on regardless).
+    """
+    desc = getattr(check, 'desc', None) or getattr(check, '__name__', 'predicate')
+    kinds = getattr(check, 'kinds', ALL_KINDS)
+    annotate('what', desc)
+    deadline = time.monotonic() + timeout
+    interval = initial
+    last_err = None
+    while True:
+        seen = events.mark()
+        try:
+            if check():
+                return True
+        except Exception as e:
+            last_err = e
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        note('retries')
+        events.sleep(min(interval, remaining), kinds, since=seen)
+        interval = min(interval * factor, max_interval)
+    note('timeouts')
+    if required:
+        raise RuntimeError(f"Not ready: {desc} within {timeout}s (last error: {last_err})")
+    return False
+
+
+def _named(desc, fn, kinds=ALL_KINDS):
+    fn.desc = desc
+    fn.kinds = kinds
+    return fn
+
+
+# ------------- named predicates -------------
+
+def window_present(root, name, searchDepth=1):
+    """Top-level window `name` exists (root is the desktop, i.e. ui.GetRootControl())."""
+    def check():
+        return root.WindowControl(Name=name, searchDepth=searchDepth).Exists(0, 0)
+    return _named(f"window '{name}' present", check, WINDOW_KINDS)
+
+
+def window_gone(root, name, searchDepth=1):
+    def check():
+        return not root.WindowControl(Name=name, searchDepth=searchDepth).Exists(0, 0)
+    return _named(f"window '{name}' gone", check, WINDOW_KINDS)
+
+
+def tab_selected(window, tab_name='Operation', ribbon_name='The Ribbon', tabs_name='Ribbon Tabs', find_tab=None):
+    """
+    Ribbon tab is selected (or holds keyboard focus), same test as wait_until_tab_active.
+    find_tab lets the caller supply a cached locator instead of walking the ribbon each poll.
+    """
+    def check():
+        if find_tab is not None:
+            tab = find_tab()
+        else:
+            ribbon = window.PaneControl(Name=ribbon_name, searchDepth=10)
+            tabs = ribbon.TabControl(Name=tabs_name, searchDepth=10)
+            tab = tabs.TabItemControl(Name=tab_name, searchDepth=5)
+        if not tab.Exists(0, 0):
+            return False
+        try:
+            if tab.GetSelectionItemPattern().IsSelected:
+                return True
+        except Exception:
+            pass
+        return bool(getattr(tab, 'HasKeyboardFocus', False))
+    return _named(f"tab '{tab_name}' selected", check, (PROPERTY, FOCUS, STRUCTURE))
+
+
+def button_enabled(root, name, searchDepth=30):
+    def check():
+        btn = root.ButtonControl(Name=name, searchDepth=searchDepth)
+        return btn.Exists(0, 0) and bool(btn.IsEnabled)
+    return _named(f"button '{name}' enabled", check, (PROPERTY, STRUCTURE))
+
+
+GRID_TYPES = ('DataGridControl', 'TableControl')
+
+
+def _grids(root):
+    """The grids under root, DataGrids first, each type in tree order."""
+    try:
+        return [grid for control_type in GRID_TYPES for grid, _ in find_all(root, control_type)]
+    except Exception:
+        pass
+    # no batched queries available (e.g. COM error): walk the tree from Python
+    found, stack = [], list(reversed(root.GetChildren()))
+    while stack:
+        node = stack.pop()
+        if node.ControlTypeName in GRID_TYPES:
+            found.append(node)
+        stack.extend(reversed(node.GetChildren()))
+    return sorted(found, key=lambda grid: GRID_TYPES.index(grid.ControlTypeName))
+
+
+def grid_ids(root):
+    """Runtime ids of the grids (DataGrid / Table) under root, e.g. the lists there before a report opens."""
+    return frozenset(tuple(grid.GetRuntimeId()) for grid in _grids(root))
+
+
+def new_grid(root, before=frozenset()):
+    """First grid under root that is not one of `before` (grid_ids taken earlier), or None."""
+    return next((grid for grid in _grids(root) if tuple(grid.GetRuntimeId()) not in before), None)
+
+
+def grid_populated(root, min_rows=1, before=frozenset()):
+    """
+    A report grid under root has at least min_rows children. before: grid_ids from before the
+    report was opened; those grids (a list that is itself a grid) do not count as the report.
+    """
+    def check():
+        grid = new_grid(root, before)
+        return grid is not None and len(grid.GetChildren()) >= min_rows
+    return _named(f"report grid populated (>= {min_rows} rows)", check, (STRUCTURE,) + WINDOW_KINDS)
+
+
+def search_applied(root, text, types=('DataItemControl', 'ListItemControl', 'TreeItemControl')):
+    """The list under root is filtered to `text`: rows are shown and every one contains it (any rows for '')."""
+    def check():
+        for control_type in types:
+            names = [props[NAME_PROPERTY] or '' for _, props in find_all(root, control_type)]
+            if names:
+                return all(text in name for name in names)
+        return False
+    return _named(f"list filtered to '{text}'", check, (STRUCTURE, PROPERTY))
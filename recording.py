@@ -0,0 +1,198 @@
+"""
+Record a real STRAVIS session and replay its timing anywhere.
+
+SessionRecorder writes a gzipped JSONL timeline while run_batch runs (batch.py
+--record, or STRAVIS_RECORD=<file>):
+
+  {"kind": "session", "host": ..., "started": ...}
+  {"kind": "span",  "span": {<tracing span: name, start, dur, parent, attrs>}}
+  {"kind": "event", "t": 12.41, "event": "window_opened"}
+  {"kind": "state", "t": 12.46, "windows": [...], "stravis": [[count, hash], ...]}
+
+Spans say what the flow did and when, events when UIA notified, states what the
+top-level windows and the STRAVIS tree fingerprint looked like after each burst
+of events. All times share the trace clock (tracing.now()).
+
+derive_latencies turns a recording into per-occurrence STRAVIS reaction times
+(report render after press_open, Save As appearing / closing, ...), preferring
+the UIA event that ended a wait over the wait's own (poll-rounded) duration.
+sim_stravis.ReplayStravis is the simulated backend driven by those times in
+recorded order, so a changed flow can be timed against a real session offline:
+
+    python bench.py replay session.rec.jsonl.gz
+"""
+import contextlib
+import gzip
+import json
+import platform
+import statistics
+import threading
+import time
+
+import tracing
+from uia_events import events, WINDOW_OPENED, WINDOW_CLOSED, STRUCTURE, PROPERTY
+
+
+class SessionRecorder:
+    def __init__(self, path, state=None, thread_context=None, debounce=0.05):
+        """
+        state: callable returning a JSON-able dict describing the UI (sampled after events)
+        thread_context: context manager factory the sampler thread runs in (COM init)
+        """
+        self.path = path
+        self.state = state
+        self.thread_context = thread_context or contextlib.nullcontext
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_state = None
+
+    def start(self):
+        """Start recording; tracing must already be running (its clock is the time base)."""
+        self.f = gzip.open(self.path, 'wt', encoding='utf-8')
+        self._write({'kind': 'session', 'host': platform.node(), 'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+                     'version': 1})
+        tracing.listeners.append(self._on_span)
+        events.taps.append(self._on_event)
+        if self.state is not None:
+            self._dirty.set()
+            self._thread = threading.Thread(target=self._sample, name='session-recorder', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._on_span in tracing.listeners:
+            tracing.listeners.remove(self._on_span)
+        if self._on_event in events.taps:
+            events.taps.remove(self._on_event)
+        self._stop.set()
+        self._dirty.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self.f.close()
+
+    def _write(self, entry):
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            if not self.f.closed:
+                self.f.write(line + '\n')
+
+    def _on_span(self, record):
+        self._write({'kind': 'span', 'span': record})
+
+    def _on_event(self, kind):
+        self._write({'kind': 'event', 't': round(tracing.now() or 0.0, 6), 'event': kind})
+        self._dirty.set()
+
+    def _sample(self):
+        with self.thread_context():
+            while not self._stop.is_set():
+                self._dirty.wait()
+                if self._stop.is_set():
+                    break
+                # let a burst of notifications settle, then look once
+                time.sleep(self.debounce)
+                self._dirty.clear()
+                try:
+                    state = self.state()
+                except Exception as e:
+                    state = {'error': str(e)}
+                if state != self._last_state:
+                    self._last_state = state
+                    self._write(dict(state, kind='state', t=round(tracing.now() or 0.0, 6)))
+
+
+def load_recording(path):
+    rec = {'session': {}, 'spans': [], 'events': [], 'states': []}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            kind = entry.pop('kind')
+            if kind == 'session':
+                rec['session'] = entry
+            elif kind == 'span':
+                rec['spans'].append(entry['span'])
+            elif kind == 'event':
+                rec['events'].append(entry)
+            elif kind == 'state':
+                rec['states'].append(entry)
+    rec['spans'].sort(key=lambda s: s['start'])
+    return rec
+
+
+# (sim reaction, span name, parent span name, 'what' prefix for wait_ready, event kinds that end it)
+_WAITS = (
+    ('open_base', 'wait_for_change', 'open_base_input', None, (STRUCTURE,)),
+    ('display', 'wait_for_change', 'display_report', None, (STRUCTURE,)),
+    ('dropdown', 'wait_for_change', 'press_e', None, (STRUCTURE,)),
+    ('close', 'wait_for_change', 'click_operation_close', None, (STRUCTURE,)),
+    ('dialog', 'wait_ready', 'click_save_as_excel', "window 'Save As' present", (WINDOW_OPENED,)),
+    ('save', 'wait_ready', 'save_as_direct', "window 'Save As' gone", (WINDOW_CLOSED,)),
+)
+
+
+def _ended_by_event(span, event_times):
+    """Time from span start to the last matching event inside it, else the span's duration."""
+    start, end = span['start'], span['start'] + span['dur']
+    inside = [t for t in event_times if start <= t <= end]
+    return (inside[-1] - start) if inside else span['dur']
+
+
+def derive_latencies(rec):
+    """{reaction: [seconds, ...]} in the order they happened in the recording."""
+    spans = rec['spans']
+    by_id = {s['id']: s for s in spans}
+    times = {}
+    for e in rec['events']:
+        times.setdefault(e['event'], []).append(e['t'])
+
+    def parent_name(s):
+        p = by_id.get(s['parent'])
+        return p['name'] if p else None
+
+    out = {}
+    for reaction, name, parent, what, kinds in _WAITS:
+        event_times = sorted(t for k in kinds for t in times.get(k, ()))
+        for s in spans:
+            if s['name'] != name or parent_name(s) != parent or s.get('timeouts'):
+                continue
+            if what and not str(s.get('what', '')).startswith(what):
+                continue
+            out.setdefault(reaction, []).append(round(_ended_by_event(s, event_times), 4))
+
+    # report render: from the end of press_open to the grid showing up (the wait after it)
+    render_events = sorted(t for k in (STRUCTURE, PROPERTY) for t in times.get(k, ()))
+    for s in spans:
+        if s['name'] != 'wait_ready' or not str(s.get('what', '')).startswith('report grid populated'):
+            continue
+        siblings = [p for p in spans if p['name'] == 'press_open' and p['parent'] == s['parent']
+                    and p['start'] <= s['start']]
+        opened = siblings[-1]['start'] + siblings[-1]['dur'] if siblings else s['start']
+        waited = _ended_by_event(s, render_events)
+        out.setdefault('render', []).append(round(s['start'] - opened + waited, 4))
+
+    for s in spans:
+        if s['name'] == 'export_entity' and 'write_seconds' in s:
+            out.setdefault('write', []).append(round(max(s['write_seconds'] - s.get('stable_for', 0.0), 0.0), 4))
+    return out
+
+
+def recorded_job(rec):
+    """(period, to_deselect, iterations) of the first job in the recording, for replaying the same run."""
+    period, to_deselect, iterations = None, [], 0
+    for s in rec['spans']:
+        if s['name'] == 'job' and period is None:
+            period = s.get('period')
+        elif s['name'] == 'select_entities' and not to_deselect:
+            to_deselect = list(s.get('to_deselect', []))
+        elif s['name'] == 'export_entities' and not iterations:
+            iterations = s.get('iterations', 0)
+    return period, to_deselect, iterations
+
+
+def summarize_latencies(latencies):
+    return {k: {'n': len(v), 'median': statistics.median(v), 'max': max(v)} for k, v in latencies.items() if v}
+
@@ -1,17 +1,54 @@
-import time, re, ctypes, collections
-import pyautogui
-import uiautomation as ui
-
-# Virtual-Key codes
-VK_SHIFT    = 0x10
-VK_DOWN     = 0x28
-KEYEVENTF_KEYDOWN = 0x0000
-KEYEVENTF_KEYUP   = 0x0002
-
-pyautogui.FAILSAFE = True
+import os, time, re, contextlib
+try:
+    import uiautomation as ui
+except Exception:
+    # no Windows desktop session (e.g. Linux): usable only through use_backend(), see sim_stravis.py
+    ui = None
+
+from readiness import wait_ready, window_present, window_gone, tab_selected, button_enabled, grid_populated, search_applied
+from readiness import grid_ids, new_grid
+from locator_cache import LocatorCache
+from snapshots import safe_snapshot, fingerprint, fingerprint_changed
+from uia_events import events, UIAEventSource, WINDOW_KINDS, TREE_KINDS, PROPERTY, FOCUS
+from tree_search import find_first
+import navigation
+from batch import Job, plan_jobs, plan_summary, resume_jobs, exported_entities
+from entities import ALL_ENTITIES
+from exports import DEFAULT_NAME_TEMPLATE, export_path, downloads_dir
+from export_watcher import ExportWatcher
+from manifest import RunManifest, manifest_path, FAILED
+from recording import SessionRecorder
+from export_cache import ExportCache, cache_dir, serve_jobs
+from dialog_watchdog import DialogWatchdog, load_rules
+import tracing
+from tracing import traced, note
+import timing
+from timing import pause
+import keyinput
+import progress
+
+# how run_batch subscribes to UI notifications for the attached window (see uia_events.py)
+_event_source = lambda stravis: UIAEventSource(stravis.NativeWindowHandle)
+# the session's DialogWatchdog (dialog_watchdog.py); kept after the session for its summary
+watchdog = None
+
+
+def use_backend(ui_module, event_source=None, input_sink=None):
+    """
+    Drive something other than the real desktop: ui_module stands in for uiautomation,
+    event_source(stravis) builds the notification source and input_sink receives the
+    keystrokes (keyinput.py).
+    """
+    global ui, _event_source
+    ui = ui_module
+    if event_source is not None:
+        _event_source = event_source
+    if input_sink is not None:
+        keyinput.use_sink(input_sink)
 
 # ------------- helpers copied from your script (unchanged unless parameterized) -------------
 
+@traced(args=('Name', 'AutomationId', 'searchDepth', 'timeout'))
 def find_control(root, **kwargs):
     Name = kwargs.pop('Name', None)
     AutomationId = kwargs.pop('AutomationId', None)
@@ -27,64 +64,80 @@ def find_control(root, **kwargs):
                 return ctrl
         except Exception:
             pass
+        note('retries')
+        progress.emit('retry', what=f"find {Name or AutomationId}")
         time.sleep(retry_interval)
+    note('timeouts')
     return None
 
-# def log_down():
-#     try:
-#         ctypes.windll.user32.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYDOWN, 0)
-#         print("shift key held")
-#     except Exception as e:
-#         raise RuntimeError("could not press shift")
-
-# def log_up():
-#     try:
-#         ctypes.windll.user32.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYUP, 0)
-#         print("shift key released")
-#     except Exception as e:
-#         raise RuntimeError("could not release shift")
-
-
-# def shift_select_down(n=20, delay=0.05):
-#     # ctypes.windll.user32.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYDOWN, 0)
-#     log_down()
-#     time.sleep(0.05)
-#     for _ in range(n):
-#         ctypes.windll.user32.keybd_event(VK_DOWN, 0, KEYEVENTF_KEYDOWN, 0)
-#         ctypes.windll.user32.keybd_event(VK_DOWN, 0, KEYEVENTF_KEYUP,   0)
-#         time.sleep(delay)
-#     # ctypes.windll.user32.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYUP, 0)
-#     log_up()
-
-def shift_select_down(n=20, delay=0.08):
-    pyautogui.keyDown('shift')
-    time.sleep(0.15)  # give the target widget time to “see” the modifier
-    pyautogui.press('down', presses=n, interval=delay)
-    pyautogui.keyUp('shift')
-
-
-def deselect_entity(code, search_delay=1.0, clear_delay=0.2):
-    pyautogui.hotkey('ctrl', 'f')
-    time.sleep(clear_delay)
-    pyautogui.write(code, interval=0.02)
-    time.sleep(search_delay)
-
-    ui.SendKeys('{DOWN}')
-    time.sleep(0.1)
-    ui.SendKeys('{SPACE}')
-
-    pyautogui.hotkey('ctrl', 'f')
-    pyautogui.hotkey('ctrl', 'a')
-    time.sleep(clear_delay)
-    pyautogui.press('backspace')
-    time.sleep(0.1)
 
+@traced(args=('n',))
+def shift_select_down(n=20, delay=None):
+    # shift_hold gives the target widget time to “see” the modifier
+    keyinput.hold('shift', *['down'] * n, lead='shift_hold', pace='list_key' if delay is None else delay)
+
+
+# search contexts where Ctrl+F focused no edit box: typed into from then on, without waiting for one again
+_no_search_field = set()
+
+
+def _search_field(context):
+    """The search box Ctrl+F just focused (an edit in the STRAVIS window or one of FLOW_WINDOWS), or None."""
+    if context in _no_search_field:
+        return None
+
+    def resolve():
+        found = []
+
+        def focused():
+            ctrl = ui.GetFocusedControl()
+            if ctrl is not None and ctrl.ControlTypeName == 'EditControl' \
+                    and ctrl.GetTopLevelControl().Name in ('STRAVIS',) + FLOW_WINDOWS:
+                found.append(ctrl)
+                return True
+            return False
+        focused.desc = 'search box focused'
+        focused.kinds = (FOCUS,)
+        return found[0] if wait_ready(focused, timeout=1, required=False) else None
+    field = locators.get(('search', context), resolve)
+    if field is None:
+        _no_search_field.add(context)
+    return field
+
+
+@traced(args=('text',))
+def search_for(context, text, results):
+    """
+    After Ctrl+F: set the search text through the value pattern and wait for `results` to
+    show only the hits; else type it and sleep as before.
+    """
+    field = _search_field(context) if navigation.enabled() else None
+    ready = search_applied(results, text) if results is not None else None
+    if field is not None and navigation.enter_text(field, text, ready=ready, timeout=timing.PAUSES['search'][0]):
+        return
+    note('typed')
+    pause('clear')
+    keyinput.write(text, settle='search')
+
+
+@traced(args=('code',))
+def deselect_entity(code, results=None):
+    keyinput.keys('ctrl+f')
+    search_for('organization', code, results)
+
+    keyinput.keys('down', 'space', pace='key')
+
+    field = _search_field('organization') if navigation.enabled() else None
+    if field is not None and navigation.enter_text(field, ''):
+        return
+    keyinput.keys('ctrl+f', 'ctrl+a', settle='clear')
+    keyinput.keys('backspace', settle='key')
+
+@traced()
 def press_open():
-    for _ in range(3):
-        ui.SendKeys('{TAB}')
-        time.sleep(0.1)
-    ui.SendKeys('{ENTER}')
+    keyinput.keys('tab', 'tab', 'tab', 'enter', pace='key')
 
+@traced(args=('timeout',))
 def find_with_retry(factory_fn, timeout=8, interval=0.2):
     end = time.time() + timeout
     last_err = None
@@ -95,20 +148,60 @@ def find_with_retry(factory_fn, timeout=8, interval=0.2):
                 return ctrl
         except Exception as e:
             last_err = e
-        time.sleep(interval)
+        note('retries')
+        progress.emit('retry', what=f"find ({last_err})" if last_err else 'find')
+        events.sleep(interval, WINDOW_KINDS)
+    note('timeouts')
     raise RuntimeError(f"Find_with_retry timeout. Last error: {last_err}")
 
 
+# ------------- cached ribbon locators (reset per run, see locator_cache.py) -------------
+
+locators = LocatorCache(freeze=lambda ctrl: ui.Control.CreateControlFromElement(ctrl.Element))
+
+
+def _existing(ctrl, maxSearchSeconds=0, searchIntervalSeconds=0.2):
+    return ctrl if ctrl.Exists(maxSearchSeconds, searchIntervalSeconds) else None
+
+
+@traced()
+def ribbon_control(window, ribbon_name='The Ribbon', timeout=8):
+    return locators.get(('ribbon', ribbon_name),
+                        lambda: find_with_retry(lambda: window.PaneControl(Name=ribbon_name, searchDepth=10), timeout=timeout))
+
+
+@traced(args=('tab_name',))
+def ribbon_tab(window, tab_name, ribbon_name='The Ribbon', tabs_name='Ribbon Tabs', timeout=8):
+    def resolve_tabs():
+        ribbon = ribbon_control(window, ribbon_name, timeout=timeout)
+        return find_with_retry(lambda: ribbon.TabControl(Name=tabs_name, searchDepth=10), timeout=timeout)
+
+    def resolve_tab():
+        tabs = locators.get(('tabs', ribbon_name, tabs_name), resolve_tabs)
+        return find_with_retry(lambda: tabs.TabItemControl(Name=tab_name, searchDepth=5), timeout=timeout)
+
+    return locators.get(('tab', ribbon_name, tabs_name, tab_name), resolve_tab)
+
+
+@traced()
+def operation_pane(window, ribbon_name='The Ribbon'):
+    """The Lower Ribbon 'Operation' pane, or None if it is not there."""
+    def resolve():
+        lower = ribbon_control(window, ribbon_name).PaneControl(Name='Lower Ribbon', searchDepth=8)
+        return _existing(lower.PaneControl(Name='Operation', searchDepth=8), 5)
+    return locators.get(('pane', ribbon_name, 'Lower Ribbon', 'Operation'), resolve)
+
+
+@traced(args=('tab_name',))
 def switch_ribbon_tab(window, tab_name, ribbon_name='The Ribbon', tabs_name='Ribbon Tabs'):
-    ribbon = find_with_retry(lambda: window.PaneControl(Name=ribbon_name, searchDepth=6))
-    tabs   = find_with_retry(lambda: ribbon.TabControl(Name=tabs_name, searchDepth=4))
-    tab    = find_with_retry(lambda: tabs.TabItemControl(Name=tab_name, searchDepth=3))
+    tab = ribbon_tab(window, tab_name, ribbon_name, tabs_name)
     try:
         tab.Click()
     except Exception:
         tab.GetInvokePattern().Invoke()
 
 
+@traced(args=('Name', 'AutomationId', 'searchDepth'))
 def click_button(root, *, Name=None, AutomationId=None, searchDepth=10, timeout=5.0):
     btn = find_control(root, Name=Name, AutomationId=AutomationId, searchDepth=searchDepth, timeout=timeout)
     if not btn:
@@ -117,52 +210,39 @@ def click_button(root, *, Name=None, AutomationId=None, searchDepth=10, timeout=
     btn.Click()
 
 
-def safe_snapshot(root):
-    snap = []
-    try:
-        children = list(root.GetChildren())
-    except Exception:
-        return snap
-
-    for c in children:
-        try:
-            if not c.Exists(0, 0):
-                continue
-        except Exception:
-            continue
-        try:
-            rid = tuple(c.GetRuntimeId())
-        except Exception:
-            rid = None
-        try:
-            ctype = getattr(c, 'ControlTypeName', None)
-        except Exception:
-            ctype = None
-        try:
-            name = c.Name
-        except Exception:
-            name = ""
-        snap.append((rid, ctype, name))
-    return snap
-
-
-def wait_for_change(root, snapshot_fn=None, timeout=10.0, interval=0.5):
+@traced(args=('timeout', 'depth'))
+def wait_for_change(root, snapshot_fn=None, timeout=10.0, interval=0.5, depth=1, scope=None):
+    """
+    Wait until the UI under root changes. By default compares batched fingerprints
+    (snapshots.py) of `depth` levels; pass snapshot_fn=safe_snapshot for the old per-child walk.
+    scope: search kwargs (e.g. {'AutomationId': 'pnlCndOrganization'}) to watch only that subtree.
+    """
+    if scope:
+        root = root.Control(searchDepth=30, **scope)
     if snapshot_fn is None:
-        snapshot_fn = safe_snapshot
-    before = snapshot_fn(root)
+        before = fingerprint(root, depth)
+        changed = lambda: fingerprint_changed(root, before, depth)
+    else:
+        before = snapshot_fn(root)
+        changed = lambda: snapshot_fn(root) != before
     end = time.time() + timeout
+    seen = events.mark()
     while time.time() < end:
-        time.sleep(interval)
-        after = snapshot_fn(root)
-        if after != before:
+        events.sleep(interval, TREE_KINDS, since=seen)
+        seen = events.mark()
+        if changed():
             return True
+        note('retries')
+    note('timeouts')
     return False
 
 
+@traced(args=('name', 'timeout'))
 def wait_for_base_input(stravis, name='Base List/Data Input', timeout=12):
     deadline = time.time() + timeout
     last_err = None
     while time.time() < deadline:
+        seen = events.mark()
         try:
             win = ui.WindowControl(Name=name)
             if win.Exists(1, 0.1):
@@ -172,38 +252,79 @@ def wait_for_base_input(stravis, name='Base List/Data Input', timeout=12):
                 return pane
         except Exception as e:
             last_err = e
-        time.sleep(0.2)
+        note('retries')
+        events.sleep(0.2, TREE_KINDS, since=seen)
+    note('timeouts')
     raise RuntimeError(f"Timed out waiting for '{name}' (last error: {last_err})")
 
 
-def press_e(root_for_waits=None):
-    for _ in range(15):
-        ui.SendKeys('{DOWN}')
-        time.sleep(0.1)
-    for _ in range(3):
-        ui.SendKeys('{RIGHT}')
-        time.sleep(0.1)
-    for _ in range(2):
-        pyautogui.hotkey('ctrl', 'up')
+# report grid cell the press_e keystrokes end on: 15 DOWN / 3 RIGHT into the grid, then
+# Ctrl+Up twice back to the top of that column
+E_CELL = (0, 3)
+
+# what display_report / press_e set before each save; part of every export cache key (export_cache.py),
+# so change it along with them
+REPORT_SETTINGS = {'layout': 'Period/Edition', 'show_books': False, 'edition_cell': list(E_CELL), 'edition_offset': 1}
+
+
+# grids under STRAVIS before the current report was opened (the Base List's own lists, if they are
+# grids); taken by export_entity before press_open, so only the report's grid counts as the report
+_list_grids = frozenset()
+
+
+def _report_grid(root):
+    return new_grid(root, _list_grids)
+
+
+def _report_closed(stravis):
+    def closed():
+        return _report_grid(stravis) is None
+    closed.desc = 'report closed'
+    closed.kinds = TREE_KINDS
+    return closed
+
+
+def _choose_e_by_pattern(root):
+    """press_e through GridPattern / ExpandCollapse: next item in the E_CELL drop-down."""
+    if not navigation.enabled():
+        return False
+    cell = navigation.grid_cell(_report_grid(root), *E_CELL)
+    if cell is None:
+        return False
+    combo = cell if cell.ControlTypeName == 'ComboBoxControl' else find_first(cell, control_type='ComboBoxControl')
+    return navigation.choose_combo_item(combo, offset=1)
 
-    pyautogui.hotkey('alt', 'down')
+
+def _focused_combo():
+    try:
+        ctrl = ui.GetFocusedControl()
+        return ctrl if ctrl is not None and ctrl.ControlTypeName == 'ComboBoxControl' else None
+    except Exception:
+        return None
+
+
+@traced()
+def press_e(root_for_waits=None):
+    if root_for_waits is not None and _choose_e_by_pattern(root_for_waits):
+        return
+    keyinput.keys(*['down'] * 15 + ['right'] * 3, pace='key', settle='key')
+    keyinput.keys('ctrl+up', 'ctrl+up', 'alt+down')
     if root_for_waits is not None:
         wait_for_change(root_for_waits, timeout=5, interval=0.2)
 
-    ui.SendKeys('{DOWN}')
-    ui.SendKeys('{ENTER}')
+    keyinput.keys('down', 'enter')
     if root_for_waits is not None:
         wait_for_change(root_for_waits, timeout=5, interval=0.2)
 
 
+@traced(args=('tab_name', 'timeout'))
 def wait_until_tab_active(window, tab_name='Operation', ribbon_name='The Ribbon', tabs_name='Ribbon Tabs', timeout=10, interval=0.2):
     deadline = time.time() + timeout
     last_exc = None
     while time.time() < deadline:
+        seen = events.mark()
         try:
-            ribbon = window.PaneControl(Name=ribbon_name, searchDepth=10)
-            tabs = ribbon.TabControl(Name=tabs_name, searchDepth=10)
-            tab = tabs.TabItemControl(Name=tab_name, searchDepth=5)
+            tab = ribbon_tab(window, tab_name, ribbon_name, tabs_name, timeout=max(deadline - time.time(), interval))
             if tab.Exists(0, 0):
                 try:
                     if tab.GetSelectionItemPattern().IsSelected:
@@ -217,38 +338,39 @@ def wait_until_tab_active(window, tab_name='Operation', ribbon_name='The Ribbon'
                     pass
         except Exception as e:
             last_exc = e
-        time.sleep(interval)
+        note('retries')
+        events.sleep(interval, (PROPERTY, FOCUS), since=seen)
+    note('timeouts')
     raise RuntimeError(f"Tab '{tab_name}' not active within {timeout}s (last error: {last_exc})")
 
 
+@traced()
 def click_save_as_excel(stravis, timeout=8):
     wait_until_tab_active(stravis, 'Operation')
-    ribbon = stravis.PaneControl(Name='The Ribbon', searchDepth=10)
-    lower  = ribbon.PaneControl(Name='Lower Ribbon', searchDepth=6)
-    op     = lower.PaneControl(Name='Operation', searchDepth=6)
-    filetb = op.ToolBarControl(Name='File', searchDepth=6)
-
-    btn = filetb.ButtonControl(Name='Save As Excel', searchDepth=3)
-    if not btn.Exists(5, 0.2):
-        btn = ribbon.ButtonControl(Name='Save As Excel', searchDepth=30)
-    if not btn.Exists(5, 0.2):
+
+    def resolve():
+        op = operation_pane(stravis)
+        btn = None
+        if op is not None:
+            filetb = op.ToolBarControl(Name='File', searchDepth=6)
+            btn = _existing(filetb.ButtonControl(Name='Save As Excel', searchDepth=3), 5)
+        if btn is None:
+            btn = _existing(ribbon_control(stravis).ButtonControl(Name='Save As Excel', searchDepth=30), 5)
+        return btn
+
+    btn = locators.get(('button', 'File', 'Save As Excel'), resolve)
+    if btn is None:
         raise RuntimeError("Could not find 'Save As Excel' button")
 
     btn.Click()
-    wait_for_change(ui.GetRootControl(), timeout=8, interval=0.3)
+    wait_ready(window_present(ui.GetRootControl(), 'Save As'), timeout=timeout, required=False)
 
 
+@traced(args=('target',))
 def click_save_as_tree_item(target='Downloads', timeout=10):
-    deadline = time.time() + timeout
-    save_win = None
-    while time.time() < deadline:
-        w = ui.WindowControl(Name='Save As')
-        if w.Exists(0, 0):
-            save_win = w
-            break
-        time.sleep(0.2)
-    if not save_win:
+    if not wait_ready(window_present(ui.GetRootControl(), 'Save As'), timeout=timeout, required=False):
         raise RuntimeError("Save As window not found")
+    save_win = ui.WindowControl(Name='Save As')
 
     search_root = save_win
     try:
@@ -265,32 +387,7 @@ def click_save_as_tree_item(target='Downloads', timeout=10):
     except Exception:
         pass
 
-    q = collections.deque([search_root])
-    target_ctrl = None
-    while q:
-        node = q.popleft()
-        try:
-            if getattr(node, 'ControlTypeName', None) == 'DataItemControl':
-                try:
-                    vp = node.GetValuePattern()
-                    val = vp.Value
-                except Exception:
-                    val = None
-                name_ok = False
-                try:
-                    name_ok = (node.Name == target)
-                except Exception:
-                    pass
-                if val == target or name_ok:
-                    target_ctrl = node
-                    break
-        except Exception:
-            pass
-        try:
-            q.extend(node.GetChildren())
-        except Exception:
-            pass
-
+    target_ctrl = find_first(search_root, control_type='DataItemControl', name_or_value=target)
     if not target_ctrl:
         raise RuntimeError(f"Could not find DataItem with Value '{target}' in Save As")
 
@@ -305,18 +402,61 @@ def click_save_as_tree_item(target='Downloads', timeout=10):
         pass
 
 
+@traced(args=('path',))
+def save_as_direct(path, timeout=10):
+    """
+    Put the full target path into the Save As file name box, press Save and check the
+    dialog closed. Replaces the Downloads tree-item search and the TAB/ENTER sequence.
+    """
+    desktop = ui.GetRootControl()
+    if not wait_ready(window_present(desktop, 'Save As'), timeout=timeout, required=False):
+        raise RuntimeError("Save As window not found")
+    save_win = ui.WindowControl(Name='Save As')
+
+    # common file dialog: file name edit is 1001, Save button is 1
+    name_box = save_win.EditControl(AutomationId='1001', searchDepth=10)
+    if not name_box.Exists(3, 0.1):
+        raise RuntimeError("File name box not found in Save As")
+    try:
+        name_box.GetValuePattern().SetValue(path)
+    except Exception:
+        name_box.SetFocus()
+        keyinput.keys('ctrl+a')
+        keyinput.write(path)
+    if name_box.GetValuePattern().Value != path:
+        raise RuntimeError(f"Save As did not accept the file name '{path}'")
+
+    save_btn = save_win.ButtonControl(AutomationId='1', searchDepth=10)
+    try:
+        save_btn.GetInvokePattern().Invoke()
+    except Exception:
+        keyinput.keys('enter')
+
+    if not wait_ready(window_gone(desktop, 'Save As'), timeout=timeout, required=False):
+        if ui.WindowControl(Name='Confirm Save As').Exists(0, 0):
+            raise RuntimeError(f"'{path}' already exists (overwrite prompt)")
+        raise RuntimeError("Save As dialog did not close")
+
+
+@traced()
 def click_operation_close(stravis, timeout=8):
     wait_until_tab_active(stravis, 'Operation')
-    ribbon = stravis.PaneControl(Name='The Ribbon', searchDepth=10)
-    lower  = ribbon.PaneControl(Name='Lower Ribbon', searchDepth=8)
-    op     = lower.PaneControl(Name='Operation', searchDepth=8)
-
-    btn = op.ButtonControl(Name='Close', searchDepth=20)
-    if not btn.Exists(5, 0.2):
-        btn = lower.ButtonControl(Name='Close', searchDepth=30) if not btn.Exists(0,0) else btn
-    if not btn.Exists(5, 0.2):
-        btn = ribbon.ButtonControl(Name='Close', searchDepth=40)
-    if not btn.Exists(5, 0.2):
+
+    def resolve():
+        op = operation_pane(stravis)
+        if op is not None:
+            btn = _existing(op.ButtonControl(Name='Close', searchDepth=20), 5)
+            if btn is not None:
+                return btn
+        ribbon = ribbon_control(stravis)
+        lower = ribbon.PaneControl(Name='Lower Ribbon', searchDepth=8)
+        btn = _existing(lower.ButtonControl(Name='Close', searchDepth=30), 5)
+        if btn is None:
+            btn = _existing(ribbon.ButtonControl(Name='Close', searchDepth=40), 5)
+        return btn
+
+    btn = locators.get(('button', 'Operation', 'Close'), resolve)
+    if btn is None:
         raise RuntimeError("Could not find 'Close' button in the ribbon")
 
     try:
@@ -327,17 +467,22 @@ def click_operation_close(stravis, timeout=8):
     wait_for_change(stravis, timeout=8, interval=0.3)
 
 
+@traced(args=('name', 'timeout'))
 def wait_dialog_gone(name='Save As', timeout=10, interval=0.2):
     end = time.time() + timeout
     while time.time() < end:
+        seen = events.mark()
         try:
             if not ui.WindowControl(Name=name).Exists(0, 0):
                 return True
         except Exception:
             pass
-        time.sleep(interval)
+        note('retries')
+        events.sleep(interval, WINDOW_KINDS, since=seen)
+    note('timeouts')
     raise RuntimeError(f"Dialog '{name}' did not close in time")
 
+@traced(args=('AutomationId', 'Name', 'searchDepth'))
 def is_checkbox_off(root=None, AutomationId='chkBookDisp', Name=None, searchDepth=30, timeout=5.0):
     """
     Returns True iff the checkbox's ToggleState is Off (0).
@@ -385,23 +530,10 @@ def is_checkbox_off(root=None, AutomationId='chkBookDisp', Name=None, searchDept
     raise RuntimeError("Could not read ToggleState (no TogglePattern/property available)")
 
 
-# ------------- MAIN PARAMETERIZED ENTRYPOINT -------------
-
-def run_automation(target_period: str, to_deselect: list[str], select_n: int = 20, iterations: int = 11):
-    """Run the STRAVIS flow using the given period string (e.g., '2025.03')
-    and a list of entity codes to deselect.
-    """
-    if not re.match(r"^\d{4}\.\d{2}$", target_period):
-        raise ValueError("target_period must look like 'YYYY.MM', e.g. '2025.03'")
-
-    ui.SetGlobalSearchTimeout(3.0)
-
-    # 1) Attach to STRAVIS
-    stravis = ui.WindowControl(Name='STRAVIS')
-    if not stravis.Exists(10, 0.2):
-        raise RuntimeError('STRAVIS window not found')
-    stravis.SetFocus()
+# ------------- FLOW STEPS (a batch reuses the open Base List/Data Input between jobs) -------------
 
+@traced()
+def open_base_input(stravis):
     # 2) Double-click Data Collection (Node1)
     dc_node = find_control(stravis, Name='Node1', timeout=8)
     if not dc_node:
@@ -409,10 +541,8 @@ def run_automation(target_period: str, to_deselect: list[str], select_n: int = 2
     dc_node.DoubleClick()
 
     # 3) Double-click Base List/Data Input (Node2)
-    time.sleep(1)
-    ui.SendKeys('{DOWN}')
-    time.sleep(0.1)
-    ui.SendKeys('{ENTER}')
+    pause('node_open')
+    keyinput.keys('down', 'enter', pace='key')
     print("Clicked Base List/Data Input")
 
     if not wait_for_change(stravis, timeout=10, interval=0.5):
@@ -422,46 +552,54 @@ def run_automation(target_period: str, to_deselect: list[str], select_n: int = 2
     if not base_input.Exists(5, 0.2):
         raise RuntimeError('Base List/Data Input exists check failed unexpectedly')
     base_input.SetFocus()
+    return base_input
 
-    # 5) Click the period entry matching AY…(YTD)
-    pattern = re.compile(r'^AY.*\(YTD\)$')
-    queue = collections.deque([base_input])
-    period_ctrl = None
-    while queue:
-        node = queue.popleft()
-        try:
-            name = node.Name or ''
-        except Exception:
-            name = ''
-        if pattern.match(name):
-            period_ctrl = node
-            break
-        try:
-            queue.extend(node.GetChildren())
-        except Exception:
-            pass
 
+@traced(args=('target_period',))
+def select_period(base_input, target_period):
+    # 5) Click the period entry matching AY…(YTD)
+    period_ctrl = find_first(base_input, name_contains='(YTD)', name_regex=r'^AY.*\(YTD\)$')
     if not period_ctrl:
         raise RuntimeError('No period entry matching AY…(YTD) found')
 
     period_ctrl.Click()
 
     # 6) Activate Clear via Down+Space
-    ui.SendKeys('{DOWN}')
-    time.sleep(0.1)
-    ui.SendKeys('{SPACE}')
+    keyinput.keys('down', 'space', pace='key')
 
-    # 7) Ctrl+F and type the requested period
-    pyautogui.hotkey('ctrl', 'f')
-    time.sleep(0.2)
-    pyautogui.write(target_period, interval=0.02)
-    time.sleep(1)
+    # 7) Ctrl+F and enter the requested period
+    keyinput.keys('ctrl+f')
+    search_for('period', target_period, period_ctrl.GetParentControl())
 
     # 8) Select found item
-    ui.SendKeys('{DOWN}')
-    time.sleep(0.1)
-    ui.SendKeys('{SPACE}')
+    keyinput.keys('down', 'space', pace='key')
+
 
+def _select_entities_by_pattern(org_pane, to_deselect):
+    """
+    One read of the Organization list, then Toggle only the items that have to change:
+    everything checked except `to_deselect`. False if the list does not support it.
+    """
+    index = navigation.read_checklist(org_pane)
+    if not index:
+        return False
+    names = navigation.match_names(index, to_deselect)
+    missing = [code for code, name in names.items() if name is None]
+    if missing:
+        print(f"Not in the Organization list, left as is: {', '.join(missing)}")
+    excluded = {name for name in names.values() if name}
+    toggled = navigation.set_checked(index, lambda name: name not in excluded)
+    if toggled is None:
+        return False
+    print(f"Organization list: {len(index) - len(excluded)} of {len(index)} checked ({len(toggled)} toggled)")
+    tracing.annotate('toggled', len(toggled))
+    if missing:
+        tracing.annotate('missing', missing)
+    return True
+
+
+@traced(args=('to_deselect',))
+def select_entities(stravis, base_input, to_deselect):
     # 9) Ensure Operation tab, locate org pane, click Open
     wait_dialog_gone('Save As')
     switch_ribbon_tab(stravis, 'Operation')
@@ -474,79 +612,485 @@ def run_automation(target_period: str, to_deselect: list[str], select_n: int = 2
         raise RuntimeError('Open button not found in Organization pane')
     open_btn.Click()
 
-    # 10) Select all, then deselect the provided list
-    ui.SendKeys('{DOWN}')
-    time.sleep(0.1)
-    for _ in range(20):
-        ui.SendKeys('{UP}')
-        time.sleep(0.05)
-    shift_select_down(n=20, delay=0.05)
-    ui.SendKeys('{SPACE}')
+    # 10) Check everything but the provided list: straight through Toggle where the list allows,
+    # else select all and search-deselect one code at a time
+    if _select_entities_by_pattern(org_pane, to_deselect):
+        return
+    if not navigation.select_item(navigation.find_row(org_pane, ALL_ENTITIES[0])):
+        # into the list, then up to its top
+        keyinput.keys('down', settle='key')
+        keyinput.keys(*['up'] * 20, pace='list_key', settle='list_key')
+    shift_select_down(n=20)
+    keyinput.keys('space')
 
     for code in to_deselect:
-        deselect_entity(code)
+        deselect_entity(code, org_pane)
+
 
+@traced()
+def display_report(stravis, base_input):
     # 11) Run Display
     switch_ribbon_tab(stravis, 'Operation')
     click_button(base_input, Name='Display', AutomationId='btnDisp', searchDepth=30, timeout=8)
-    wait_for_change(base_input, timeout=15, interval=0.5)
+    # two levels: on a later job the report list is already there and only its rows change
+    wait_for_change(base_input, timeout=15, interval=0.5, depth=2)
 
     # click Tab and change to Period/Edition
-    ui.SendKeys('{TAB}')
-    time.sleep(0.2)
-    pyautogui.hotkey('alt', 'down')
-    for _ in range(4):
-        ui.SendKeys('{UP}')
-        time.sleep(0.1)
-    ui.SendKeys('{ENTER}')
+    keyinput.keys('tab', settle='tab_focus')
+    if not navigation.choose_combo_item(_focused_combo(), name='Period/Edition'):
+        keyinput.keys('alt+down')
+        # the old 0.1 s sleeps between the UPs used to cover the dropdown opening; wait for it instead
+        wait_for_change(stravis, timeout=5, interval=0.2)
+        keyinput.keys('up', 'up', 'up', 'up', 'enter', pace='key')
     # deselect after pressing TAB
-    if is_checkbox_off():
+    if is_checkbox_off(stravis):
         print("The 'Show books' checkbox is OFF")
-        for i in range(3):
-            ui.SendKeys('{TAB}')
-            time.sleep(0.1)
+        keyinput.keys('tab', 'tab', 'tab', pace='key', settle='key')
     else:
         # click it
-        cb = find_control(ui.WindowControl(Name='STRAVIS'), AutomationId='chkBookDisp')
+        cb = find_control(stravis, AutomationId='chkBookDisp')
         cb.Click()
         print("The 'Show books' checkbox is ON (or indeterminate)")
 
-    # 12) Iterate items and save-as flow (unchanged from your logic)
-    time.sleep(1)
-    for _ in range(2):
-        ui.SendKeys('{DOWN}')
-        time.sleep(0.1)
 
-    for i in range(iterations):
-        press_open()
-        wait_until_tab_active(stravis, 'Operation')
-        time.sleep(20)  # consider replacing with a waiter if you want
-        press_e(root_for_waits=stravis)
-
-        switch_ribbon_tab(stravis, 'Operation')
-        time.sleep(2)
-        wait_until_tab_active(stravis, 'Operation')
-        time.sleep(1)
-        click_save_as_excel(stravis)
+@traced(args=('entity', 'index'))
+def export_entity(stravis, desktop, watcher, index, period=None, entity=None, output_dir=None,
+                  name_template=DEFAULT_NAME_TEMPLATE):
+    """Open the report row at the cursor and save it; returns the Export once it is on disk."""
+    global _list_grids
+    _list_grids = grid_ids(stravis)
+    press_open()
+    wait_until_tab_active(stravis, 'Operation')
+    # report render time varies a lot; the ceiling is the old fixed 20 s sleep
+    wait_ready(grid_populated(stravis, before=_list_grids), timeout=20, required=False)
+    press_e(root_for_waits=stravis)
+
+    switch_ribbon_tab(stravis, 'Operation')
+    wait_ready(tab_selected(stravis, 'Operation', find_tab=lambda: ribbon_tab(stravis, 'Operation')), timeout=10)
+    wait_ready(button_enabled(stravis, 'Save As Excel'), timeout=3, required=False)
+    click_save_as_excel(stravis)
+    watcher.arm()
+    path = None
+    if output_dir:
+        path = export_path(output_dir, period, entity, index, name_template)
+        save_as_direct(path)
+    else:
         click_save_as_tree_item('Downloads')
-        time.sleep(1)
-        for _ in range(4):
-            ui.SendKeys('{TAB}')
-            time.sleep(0.1)
-        ui.SendKeys('{ENTER}')
-
-        switch_ribbon_tab(stravis, 'Operation')
-        click_operation_close(stravis)
-        for _ in range(4):
-            ui.SendKeys('{TAB}')
-            time.sleep(0.1)
-
-        # shift to the next entity
-        # for _ in range(3):
-        #     ui.SendKeys('{DOWN}')
-        ui.SendKeys('{DOWN}')
-    
+        wait_ready(button_enabled(ui.WindowControl(Name='Save As'), 'Save', searchDepth=10), timeout=1, required=False)
+        keyinput.keys('tab', 'tab', 'tab', 'tab', 'enter', pace='key')
+        wait_ready(window_gone(desktop, 'Save As'), timeout=10)
+    export = watcher.wait_for_export(path, timeout=60)
+    print(f"Saved {export.path} ({export.bytes} bytes, written in {export.write_seconds:.1f}s)")
+    tracing.annotate('write_seconds', round(export.write_seconds, 4))
+    tracing.annotate('stable_for', watcher.stable_for)
+    return export
+
+
+def ui_state(stravis):
+    """What a session recording stores after UI events: top-level windows and the STRAVIS fingerprint."""
+    return {'windows': sorted(w.Name for w in ui.GetRootControl().GetChildren()),
+            'stravis': [list(level) for level in fingerprint(stravis, depth=2)]}
+
+
+@traced()
+def close_report(stravis, advance=True):
+    """Close the report and (advance=True) move the keyboard cursor to the next row."""
+    switch_ribbon_tab(stravis, 'Operation')
+    click_operation_close(stravis)
+    # otherwise the next Open does nothing and the next Save As saves this report again
+    if not wait_ready(_report_closed(stravis), timeout=5, required=False):
+        raise RuntimeError('Report still open after Close')
+    if not advance:
+        return
+    # TAB x4, then shift to the next entity
+    keyinput.keys('tab', 'tab', 'tab', 'tab', 'down', pace='key')
+
+
+# per-entity recovery in export_entities: tries per entity (a retry follows a recovery), and
+# how many entities in a row may be given up on before the session is assumed broken
+ENTITY_ATTEMPTS = 2
+MAX_FAILED_IN_ROW = 3
+
+
+# STRAVIS windows the flow works in besides the main one (wait_for_base_input); recovery leaves them open
+FLOW_WINDOWS = ('Base List/Data Input',)
+
+
+def _dialogs(stravis):
+    """
+    Windows of the STRAVIS process other than its main window and FLOW_WINDOWS (Save As, message
+    boxes), top-level or owned.
+    """
+    pid, handle = stravis.ProcessId, stravis.NativeWindowHandle
+    found = [w for w in ui.GetRootControl().GetChildren()
+             if w.ControlTypeName == 'WindowControl' and w.ProcessId == pid and w.NativeWindowHandle != handle]
+    found += [c for c in stravis.GetChildren() if c.ControlTypeName == 'WindowControl']
+    return [w for w in found if w.Name not in FLOW_WINDOWS]
+
+
+def _rows_root(stravis, name='Base List/Data Input'):
+    """Where the report rows are: the top-level Base List/Data Input window if STRAVIS opened one, else STRAVIS."""
+    win = ui.WindowControl(Name=name, searchDepth=1)
+    return win if win.Exists(0, 0) else stravis
+
+
+def dismiss_dialog(dialog, timeout=3.0):
+    """Close `dialog` (WindowPattern.Close, else Esc into it); True once it is gone."""
+    name = dialog.Name
+    try:
+        dialog.GetWindowPattern().Close(waitTime=0)
+    except Exception:
+        try:
+            dialog.SetFocus()
+        except Exception:
+            pass
+        keyinput.keys('esc')
+
+    def gone():
+        return not dialog.Exists(0, 0)
+    gone.desc = f"dialog '{name}' dismissed"
+    gone.kinds = WINDOW_KINDS
+    return wait_ready(gone, timeout=timeout, required=False)
+
+
+@traced(args=('entity',))
+def recover(stravis, entity):
+    """
+    Get the session back to the displayed report list after a failed export: dismiss open
+    dialogs, close the open report and find `entity`'s row again. Returns the rows' container,
+    from which rows are then picked by name; raises if the list cannot be reached (without
+    UIA patterns rows cannot be found by name).
+    """
+    # a stale cached ribbon button may be what failed
+    locators.reset()
+    if watchdog is not None:
+        watchdog.clear_abort()
+    for dialog in _dialogs(stravis):
+        name = dialog.Name
+        print(f"Recovery: dismissing '{name}'")
+        if not dismiss_dialog(dialog):
+            raise RuntimeError(f"Could not dismiss the '{name}' dialog")
+    if _report_grid(stravis) is not None:
+        print("Recovery: closing the open report")
+        try:
+            click_operation_close(stravis)
+        except Exception as e:
+            print(f"Recovery: {e}")
+        if not wait_ready(_report_closed(stravis), timeout=8, required=False):
+            raise RuntimeError('Could not close the open report')
+    row = navigation.find_row(_rows_root(stravis), entity, types=('DataItemControl',))
+    if row is None:
+        raise RuntimeError(f"Report row for '{entity}' not found after recovery")
+    return row.GetParentControl()
+
+
+@traced(args=('period', 'iterations'))
+def export_entities(stravis, iterations, period=None, entities=None, output_dir=None, name_template=DEFAULT_NAME_TEMPLATE,
+                    manifest=None, cache=None):
+    """
+    Export `iterations` rows starting at the cursor. With output_dir each workbook is saved
+    straight to export_path(...) (entities label the rows, in order); without it the old
+    Downloads side-panel flow is used. Every file is confirmed on disk (size/mtime stable)
+    before moving on; returns the export_watcher.Export records.
+    manifest: RunManifest that records each entity as soon as its file is confirmed (or failed).
+    cache: ExportCache each confirmed workbook is stored in, with the seconds its export took; only
+    rows picked by name are, since a row the keyboard cursor walked to may not be the entity expected.
+    When an entity fails, recover() brings the report list back and it is tried again, up to
+    ENTITY_ATTEMPTS times; then it is recorded failed and the run goes on with the next one.
+    Only a failed recovery, or MAX_FAILED_IN_ROW failed entities in a row, stops the run.
+    """
+    watcher = ExportWatcher(output_dir or downloads_dir())
+    saved = []
+    # 12) Iterate items and save-as flow (unchanged from your logic)
+    pause('list_ready')
+    # rows are picked by entity name through SelectionItem when the list supports it (rows_root is
+    # then the list); otherwise the keyboard cursor walks down one row per entity
+    rows_root = None
+    if entities:
+        first = navigation.find_row(_rows_root(stravis), entities[0], types=('DataItemControl',))
+        if navigation.select_item(first):
+            rows_root = first.GetParentControl()
+    if rows_root is None:
+        keyinput.keys('down', 'down', pace='key', settle='key')
+
+    current = None  # entity being exported, for the manifest if this raises
+    failed_in_row = 0
+    try:
+        desktop = ui.GetRootControl()
+        for i in range(iterations):
+            entity = entities[i] if entities and i < len(entities) else f'entity{i + 1:02d}'
+            current = entity
+            progress.emit('entity', entity=entity, period=period, index=i + 1, of=iterations)
+            for attempt in range(ENTITY_ATTEMPTS):
+                started = time.time()
+                export = None
+                try:
+                    if rows_root is not None and (i > 0 or attempt > 0):
+                        if not navigation.select_item(navigation.find_row(rows_root, entity, types=('DataItemControl',))):
+                            raise RuntimeError(f"Report row for '{entity}' not found")
+                    export = export_entity(stravis, desktop, watcher, i, period, entity, output_dir, name_template)
+                    saved.append(export)
+                    progress.emit('saved', entity=entity, period=period, path=export.path, bytes=export.bytes)
+                    if manifest is not None:
+                        manifest.record(period, entity, export.path)
+                    # a row the keyboard cursor walked to is only a guess at `entity`
+                    if cache is not None and rows_root is not None:
+                        cache.store(period, entity, REPORT_SETTINGS, export.path, time.time() - started)
+                    current = None
+                    close_report(stravis, advance=rows_root is None)
+                    break
+                except Exception as e:
+                    print(f"{entity}: {e}")
+                    if not entities:
+                        raise
+                    progress.emit('retry', what=f'recovering after {entity}: {e}')
+                    rows_root = recover(stravis, entity)
+                    if export is not None:
+                        # saved but not closed: nothing to redo, the next entity is picked by name
+                        break
+                    if attempt == ENTITY_ATTEMPTS - 1:
+                        progress.emit('failed', entity=entity, period=period, error=str(e))
+                        if manifest is not None:
+                            manifest.record(period, entity, status=FAILED, error=str(e))
+                        current = None
+                        failed_in_row += 1
+                        if failed_in_row >= MAX_FAILED_IN_ROW:
+                            raise RuntimeError(f"{failed_in_row} entities in a row failed, last '{entity}': {e}")
+            else:
+                continue
+            failed_in_row = 0
+    except Exception as e:
+        if current is not None:
+            progress.emit('failed', entity=current, period=period, error=str(e))
+        if manifest is not None and current is not None:
+            manifest.record(period, current, status=FAILED, error=str(e))
+        raise
+    finally:
+        watcher.close()
+    return saved
+
+
+# ------------- MAIN PARAMETERIZED ENTRYPOINT -------------
+
+def run_batch(jobs, output_dir=None, name_template=DEFAULT_NAME_TEMPLATE, resume=False, trace=None, record=None,
+              timing_profile=None, window=None, cache=None):
+    """
+    Run several batch.Job(period, to_deselect, iterations) exports in one STRAVIS session.
+    Jobs are reordered by batch.plan_jobs so consecutive jobs only redo the steps that differ.
+    output_dir / name_template: save each workbook directly under a templated name (exports.py).
+    Every export is recorded in the run manifest (manifest.py) in the output folder; with
+    resume=True entities whose recorded file is still intact are skipped.
+    trace: JSONL file for per-step spans (tracing.py); defaults to $STRAVIS_TRACE, off if unset.
+    record: session recording for offline replay (recording.py); defaults to $STRAVIS_RECORD.
+    timing_profile: learned pause lengths (timing.py); defaults to $STRAVIS_TIMING, then this host's
+    profile; 'off' keeps the fixed defaults.
+    window: which STRAVIS window to drive, by handle or 'pid:<id>' (see attach); default the first one.
+    cache: export cache folder (export_cache.py); defaults to $STRAVIS_CACHE, else (or 'off') no cache.
+    Cached workbooks of closed periods are copied to the output folder instead of exported.
+    Returns the plan summary (steps run vs. steps a job-by-job run would need) plus the saved files.
+    """
+    for job in jobs:
+        if not re.match(r"^\d{4}\.\d{2}$", job.period):
+            raise ValueError("target_period must look like 'YYYY.MM', e.g. '2025.03'")
+    manifest = RunManifest(manifest_path(output_dir or downloads_dir()))
+    if resume:
+        before = sum(job.iterations for job in jobs)
+        jobs = resume_jobs(jobs, manifest.verify)
+        print(f"Resume: {before - sum(job.iterations for job in jobs)} of {before} exports already done")
+    folder = cache_dir(cache)
+    cache = ExportCache(folder) if folder else None
+    saved = []
+    if cache is not None:
+        jobs, served = serve_jobs(cache, jobs, REPORT_SETTINGS, output_dir or downloads_dir(), name_template)
+        for (period, entity), export in served.items():
+            manifest.record(period, entity, export.path)
+        saved += served.values()
+    planned = plan_jobs(jobs)
+
+    if planned:
+        progress.emit('run', total=sum(job.iterations for job, _ in planned), jobs=len(planned))
+        with session(window, trace, record, timing_profile) as stravis:
+            base_input = None
+            for job, steps in planned:
+                base_input, exports = run_job(stravis, base_input, job, steps, output_dir, name_template, manifest,
+                                              cache)
+                saved += exports
+    else:
+        print("Nothing left to export")
+
+    summary = plan_summary(planned)
+    summary['bytes'] = sum(e.bytes for e in saved)
+    # entities given up on after recovery and retries (the run went on without them)
+    summary['failed'] = [(job.period, e, manifest.entries[(job.period, e)].get('error'))
+                         for job, _ in planned for e in exported_entities(job)
+                         if manifest.entries.get((job.period, e), {}).get('status') == FAILED]
+    for period, entity, error in summary['failed']:
+        print(f"FAILED {period} {entity}: {error}")
+    summary['dialogs'] = watchdog.handled if planned and watchdog is not None else []
+    for d in summary['dialogs']:
+        print(f"Dialog '{d['name']}': {d['action']}, held the run {d.get('held', 0.0):.1f}s")
+    summary['input'] = keyinput.stats() if planned else {}
+    if cache is not None:
+        summary['cache'] = cache.report()
+        c = summary['cache']
+        if c['lookups']:
+            print(f"Cache: {c['hits']} of {c['lookups']} served ({c['hit_rate']:.0%}), "
+                  f"~{c['seconds_saved']:.0f}s of automation saved")
+    print(f"Batch: {summary}")
+    summary['files'] = [e.path for e in saved]
+    summary['exports'] = saved
+    return summary
+
+
+def attach(window=None):
+    """
+    The STRAVIS main window: the one with native handle `window` (int or '0x3004C'), the one
+    owned by process 'pid:<id>', or (None) the first top-level window named STRAVIS.
+    """
+    if window is None:
+        stravis = ui.WindowControl(Name='STRAVIS')
+        if not stravis.Exists(10, 0.2):
+            raise RuntimeError('STRAVIS window not found')
+        return stravis
+    spec = str(window)
+    if spec.lower().startswith('pid:'):
+        pid = int(spec[4:])
+        end = time.time() + 10
+        while time.time() < end:
+            found = [w for w in ui.GetRootControl().GetChildren()
+                     if w.ProcessId == pid and w.Name == 'STRAVIS']
+            if found:
+                return found[0]
+            time.sleep(0.2)
+        raise RuntimeError(f'No STRAVIS window in process {pid}')
+    handle = int(spec, 0)
+    stravis = ui.ControlFromHandle(handle)
+    if stravis is None or not stravis.Exists(0, 0):
+        raise RuntimeError(f'No window with handle {spec}')
+    return stravis
+
+
+def wait_foreground(name='STRAVIS', timeout=60.0, interval=0.05):
+    """
+    Wait until a top-level window called `name` is the foreground window, i.e. the user
+    switched to it, and return it (to attach to exactly that one). Replaces the fixed
+    "you have 3 seconds" sleep before a run.
+    """
+    start = time.time()
+    while True:
+        try:
+            fg = ui.GetForegroundControl()
+            if fg is not None and fg.Name == name:
+                progress.emit('foreground', waited=round(time.time() - start, 3))
+                return fg
+        except Exception:
+            pass  # window closed between the two calls
+        if time.time() - start >= timeout:
+            raise RuntimeError(f'{name} was not brought to the foreground within {timeout:.0f}s')
+        time.sleep(interval)
+
+
+@contextlib.contextmanager
+def session(window=None, trace=None, record=None, timing_profile=None):
+    """
+    Attach to STRAVIS (see attach) and run the per-session services around the block:
+    UIA events, the dialog watchdog, tracing / recording, the timing profile. Yields the STRAVIS window.
+    """
+    global watchdog, _list_grids
+    ui.SetGlobalSearchTimeout(3.0)
+    _list_grids = frozenset()
+    locators.reset()
+    _no_search_field.clear()
+    keyinput.reset_stats()
+    timing.profile.open(timing.profile_path(timing_profile))
+
+    # 1) Attach to STRAVIS
+    stravis = attach(window)
+    stravis.SetFocus()
+    progress.emit('attached')
+
+    # wake the waits on UIA notifications; they fall back to plain polling without them
+    try:
+        events.start(_event_source(stravis))
+    except Exception as e:
+        print(f"UIA events unavailable, polling only: {e}")
+    # dialogs the flow did not open are handled while it runs; STRAVIS_DIALOG_RULES=off turns this off
+    rules = load_rules()
+    watchdog = None
+    if rules is not None:
+        watchdog = DialogWatchdog(ui.GetRootControl, stravis, rules,
+                                  thread_context=getattr(ui, 'UIAutomationInitializerInThread', None)).start()
+    trace = trace or os.environ.get('STRAVIS_TRACE')
+    record = record or os.environ.get('STRAVIS_RECORD')
+    if trace or record:
+        tracing.start(trace)
+    recorder = None
+    if record:
+        recorder = SessionRecorder(record, state=lambda: ui_state(stravis),
+                                   thread_context=getattr(ui, 'UIAutomationInitializerInThread', None)).start()
+    try:
+        yield stravis
+        timing.profile.succeeded()
+    except Exception:
+        # the pauses that ran just before this were likely too short on this machine
+        timing.profile.failed()
+        raise
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+        events.stop()
+        if recorder is not None:
+            recorder.stop()
+            print(f"Session recorded to {record} (python bench.py replay {record})")
+        if trace or record:
+            tracing.stop()
+        if trace:
+            print(f"Trace written to {trace} (python tracing.py {trace})")
+
+
+def run_job(stravis, base_input, job, steps, output_dir=None, name_template=DEFAULT_NAME_TEMPLATE, manifest=None,
+            cache=None):
+    """
+    One batch.Job in an attached session, running only `steps` (batch.STEPS; see batch.steps_after).
+    base_input is the Base List/Data Input pane from an earlier job (None before 'navigate').
+    Returns (base_input, [export_watcher.Export]).
+    """
+    print(f"Job {job.period}: {', '.join(steps)}")
+    with tracing.span('job', period=job.period, steps=list(steps)):
+        if 'navigate' in steps:
+            with progress.step('navigate'):
+                base_input = open_base_input(stravis)
+        if 'period' in steps:
+            with progress.step('period'):
+                select_period(base_input, job.period)
+        if 'entities' in steps:
+            with progress.step('entities'):
+                select_entities(stravis, base_input, job.to_deselect)
+        with progress.step('display'):
+            display_report(stravis, base_input)
+        # rows come out in Organization list order, i.e. ALL_ENTITIES order
+        included = [e for e in ALL_ENTITIES if e not in job.to_deselect]
+        exports = export_entities(stravis, job.iterations, job.period, included, output_dir, name_template, manifest,
+                                  cache)
+    return base_input, exports
+
+def run_automation(target_period: str, to_deselect: list[str], select_n: int = 20, iterations: int = 11,
+                   output_dir: str | None = None, name_template: str = DEFAULT_NAME_TEMPLATE, resume: bool = False,
+                   window=None):
+    """Run the STRAVIS flow using the given period string (e.g., '2025.03')
+    and a list of entity codes to deselect.
+    With output_dir, files are saved there as name_template; otherwise into Downloads via the side panel.
+    resume: only export the entities the last run did not finish (see manifest.py).
+    window: the STRAVIS window to drive (see attach); default the first one.
+    """
+    summary = run_batch([Job(target_period, tuple(to_deselect), iterations)], output_dir, name_template, resume,
+                        window=window)
+    print(f"Locator cache: {locators.stats()}")
+    if summary['failed']:
+        raise RuntimeError(f"{len(summary['failed'])} of {iterations} entities failed after retries "
+                           f"({', '.join(e for _, e, _ in summary['failed'])}); the other exports were saved")
     print("Download Complete")
+    return summary['files']
 
 if __name__ == '__main__':
     run_automation("2025.03",["AN41_HSO_HMSP", "D941_HSO_HMSZ", "J34V_HSO_HOME"])
\ No newline at end of file
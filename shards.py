@@ -0,0 +1,473 @@
+"""
+Sharded runs: one export spread over several STRAVIS sessions at once.
+
+The coordinator cuts each job's entities into units of a few entities and deals
+them out to the workers in contiguous blocks. A worker takes units from the front
+of its own queue. When that runs dry it takes from the shared pool, then steals
+from the back of the fullest other queue, so a slow session simply ends up doing
+fewer units. Each unit is one batch.Job run in the worker's session (only the
+steps that differ from its previous unit). A failed unit goes back to another
+worker's queue, minus the entities it did export.
+
+Workers bind to their STRAVIS window by native handle or process id, never by
+name (script_core.attach). Keystrokes go to whichever window has the focus, so
+every worker needs a desktop of its own: an RDP session or a VM. There, each one
+connects to the coordinator over TCP:
+
+    # coordinator (any machine the sessions can reach)
+    python shards.py --period 2025.03 --include default --output-dir \\\\fs\\exports --listen 0.0.0.0:50123
+
+    # in each session
+    python shards.py --connect coordinator-host:50123 --window pid:7312 --output-dir \\\\fs\\exports
+
+STRAVIS_SHARD_KEY is the shared secret for --listen / --connect. With --window
+the coordinator also runs a local worker for that window itself; only one, since
+two STRAVIS windows on the same desktop would get each other's keystrokes (the
+other sessions connect with --listen / --connect). Every workbook is saved
+straight into the output folder, and the coordinator alone records the results in
+its run manifest, so --resume works across shards.
+"""
+import argparse
+import collections
+import itertools
+import math
+import multiprocessing as mp
+import os
+import re
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from batch import make_job, exported_entities, resume_jobs, steps_after, _parse_include
+from entities import ALL_ENTITIES
+from exports import DEFAULT_NAME_TEMPLATE, downloads_dir
+from manifest import RunManifest, manifest_path
+
+IDLE, RUNNING, STOPPED, FAILED, LOST = 'idle', 'running', 'stopped', 'failed', 'lost'
+_LIVE = (IDLE, RUNNING)
+POOL = None  # queue key of units not dealt to any worker
+
+
+class Coordinator:
+    def __init__(self, jobs, workers=(), chunk=None, retries=1, manifest=None):
+        """
+        jobs: batch.Job list; workers: names of the workers known up front (others may join).
+        chunk: entities per unit (default: about four units per worker).
+        retries: how often a unit's leftover entities are retried after a failure.
+        manifest: RunManifest the finished exports are recorded in.
+        """
+        self.lock = threading.Lock()
+        self.retries = retries
+        self.manifest = manifest
+        self.ids = itertools.count(1)
+        total = sum(job.iterations for job in jobs)
+        chunk = chunk or max(1, math.ceil(total / (4 * max(len(workers), 1))))
+        units = []
+        for job in jobs:
+            entities = exported_entities(job)
+            for i in range(0, len(entities), chunk):
+                units.append(self._unit(job.period, entities[i:i + chunk]))
+        self.queues = {POOL: collections.deque()}
+        self.workers = {}
+        for w in workers:
+            self._join(w)
+        names = list(workers)
+        if not names:
+            self.queues[POOL].extend(units)
+        else:
+            # contiguous blocks: neighbouring units share a period, so a worker rarely re-selects it
+            per = math.ceil(len(units) / len(names))
+            for n, w in enumerate(names):
+                self.queues[w].extend(units[n * per:(n + 1) * per])
+        self.total = total
+        self.inflight = {}   # worker -> unit
+        self.results = []    # (period, entity, path, bytes, worker)
+        self.failures = []   # (period, entity, error)
+        self.started = time.time()
+
+    def _unit(self, period, entities, attempt=0):
+        return {'id': next(self.ids), 'period': period, 'entities': list(entities), 'attempt': attempt}
+
+    def _join(self, worker, window=None):
+        self.queues.setdefault(worker, collections.deque())
+        st = self.workers.setdefault(worker, {'state': IDLE, 'window': window, 'unit': None, 'units': 0,
+                                              'entities': 0, 'failures': 0, 'stolen': 0, 'busy': 0.0,
+                                              'seen': time.time(), 'error': None})
+        if window is not None:
+            st['window'] = window
+        return st
+
+    # ----- called by workers (through the manager proxy) -----
+    def hello(self, worker, window=None):
+        with self.lock:
+            st = self._join(worker, window)
+            st.update(state=IDLE, seen=time.time(), error=None)
+
+    def heartbeat(self, worker):
+        with self.lock:
+            if worker in self.workers:
+                self.workers[worker]['seen'] = time.time()
+
+    def take(self, worker):
+        """Next unit for `worker`: its own queue, then the pool, then stolen from the fullest queue; None when all is done."""
+        with self.lock:
+            st = self._join(worker)
+            if st['state'] not in _LIVE:
+                return None
+            unit = None
+            for key in (worker, POOL):
+                if self.queues[key]:
+                    unit = self.queues[key].popleft()
+                    break
+            else:
+                victim = max((k for k in self.queues if k not in (worker, POOL)),
+                             key=lambda k: len(self.queues[k]), default=None)
+                if victim is not None and self.queues[victim]:
+                    unit = self.queues[victim].pop()
+                    st['stolen'] += 1
+            now = time.time()
+            st['seen'] = now
+            if unit is None:
+                # nothing left anywhere: this worker is done, retries must go to someone else
+                st.update(state=STOPPED, unit=None)
+                return None
+            self.inflight[worker] = dict(unit, since=now)
+            st.update(state=RUNNING, unit=f"{unit['period']} {','.join(unit['entities'])}")
+            return unit
+
+    def done(self, worker, unit_id, exports):
+        """Unit finished: exports is [(entity, path, bytes)]."""
+        with self.lock:
+            unit = self._finish(worker, unit_id)
+            self._record(worker, unit, exports)
+            st = self.workers[worker]
+            st['units'] += 1
+
+    def failed(self, worker, unit_id, error, exports=()):
+        """Unit failed after exporting `exports`; the rest goes back to the queues (or is given up)."""
+        with self.lock:
+            unit = self._finish(worker, unit_id)
+            self._record(worker, unit, exports)
+            self.workers[worker]['failures'] += 1
+            self.workers[worker]['error'] = error
+            self._requeue(worker, unit, [e for e, _, _ in exports], error)
+
+    def stop(self, worker, error=None, state=None):
+        """Worker is gone (finished, gave up or died); its unit in flight goes back to the queues."""
+        with self.lock:
+            st = self._join(worker)
+            unit = self.inflight.pop(worker, None)
+            if unit is not None:
+                st['busy'] += time.time() - unit['since']
+                self._requeue(worker, unit, [], error or 'worker stopped')
+            self.queues[POOL].extend(self.queues[worker])
+            self.queues[worker].clear()
+            st.update(state=state or (FAILED if error else STOPPED), unit=None, error=error or st['error'])
+
+    # ----- internals -----
+    def _finish(self, worker, unit_id):
+        unit = self.inflight.pop(worker, None)
+        st = self.workers[worker]
+        st.update(state=IDLE, unit=None, seen=time.time())
+        if unit is None or unit['id'] != unit_id:
+            raise RuntimeError(f"{worker} reported unit {unit_id}, which it does not hold")
+        st['busy'] += time.time() - unit['since']
+        return unit
+
+    def _record(self, worker, unit, exports):
+        for entity, path, size in exports:
+            self.results.append((unit['period'], entity, path, size, worker))
+            self.workers[worker]['entities'] += 1
+            if self.manifest is not None:
+                try:
+                    self.manifest.record(unit['period'], entity, path)
+                except OSError as e:
+                    # the worker's output folder is not reachable from here; the result still counts
+                    print(f"Manifest: {path} not readable here ({e})")
+
+    def _requeue(self, worker, unit, exported, error):
+        left = [e for e in unit['entities'] if e not in exported]
+        if not left:
+            return
+        if unit['attempt'] >= self.retries:
+            self.failures += [(unit['period'], e, error) for e in left]
+            return
+        retry = self._unit(unit['period'], left, unit['attempt'] + 1)
+        # to the live worker with the least queued, preferably not the one it just failed on
+        others = [w for w, st in self.workers.items() if st['state'] in _LIVE and w != worker]
+        target = min(others, key=lambda w: len(self.queues[w])) if others else POOL
+        self.queues[target].appendleft(retry)
+
+    # ----- reporting -----
+    def reap(self, timeout):
+        """Workers silent for `timeout` seconds count as lost; their unit goes back to the queues."""
+        now = time.time()
+        for w, st in list(self.workers.items()):
+            if st['state'] in _LIVE and now - st['seen'] > timeout:
+                self.stop(w, f'no heartbeat for {timeout:.0f}s', state=LOST)
+
+    def finished(self):
+        with self.lock:
+            return not self.inflight and not any(self.queues.values())
+
+    def live(self):
+        with self.lock:
+            return sum(st['state'] in _LIVE for st in self.workers.values())
+
+    def status(self):
+        with self.lock:
+            now = time.time()
+            out = {}
+            for w, st in self.workers.items():
+                out[w] = dict(st, queued=len(self.queues[w]), seen=round(now - st['seen'], 1),
+                              busy=round(st['busy'], 1))
+            return out
+
+    def summary(self):
+        with self.lock:
+            order = {e: n for n, e in enumerate(ALL_ENTITIES)}
+            results = sorted(self.results, key=lambda r: (r[0], order.get(r[1], len(order))))
+            left = [(u['period'], e) for q in self.queues.values() for u in q for e in u['entities']]
+            return {'entities': self.total, 'exported': len(results), 'failed': list(self.failures),
+                    'not_run': left, 'bytes': sum(r[3] for r in results), 'files': [r[2] for r in results],
+                    'seconds': round(time.time() - self.started, 1), 'results': results}
+
+
+# ------------- transport -------------
+
+class _Server(BaseManager):
+    pass
+
+
+class _Client(BaseManager):
+    pass
+
+
+_Client.register('coordinator')
+
+
+def _connect(address, authkey):
+    m = _Client(address=address, authkey=authkey)
+    m.connect()
+    return m.coordinator()
+
+
+def _serve(coordinator, address, authkey):
+    """Serve `coordinator` on a background thread; returns the bound (host, port)."""
+    _Server.register('coordinator', callable=lambda: coordinator)
+    server = _Server(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name='shard-coordinator', daemon=True).start()
+    return server.address
+
+
+def _address(spec):
+    host, _, port = spec.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _authkey():
+    key = os.environ.get('STRAVIS_SHARD_KEY')
+    if not key:
+        raise RuntimeError('Set STRAVIS_SHARD_KEY (the same secret on the coordinator and every worker)')
+    return key.encode()
+
+
+# ------------- worker -------------
+
+def work(coordinator, worker, window=None, output_dir=None, name_template=DEFAULT_NAME_TEMPLATE,
+         timing_profile=None, max_failures=2, heartbeat=15.0):
+    """
+    Run units from `coordinator` in the STRAVIS session at `window` until none are left
+    (or `max_failures` units in a row failed).
+    """
+    import script_core
+    import timing
+
+    output_dir = output_dir or downloads_dir()
+    # this worker's own record of what landed, to tell the coordinator what a failed unit did export
+    manifest = RunManifest(os.path.join(output_dir, f'.{worker}.{os.getpid()}.{os.path.basename(manifest_path(output_dir))}'))
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(heartbeat):
+            try:
+                coordinator.heartbeat(worker)
+            except Exception:
+                return
+
+    coordinator.hello(worker, None if window is None else str(window))
+    threading.Thread(target=beat, name='shard-heartbeat', daemon=True).start()
+    error = None
+    try:
+        with script_core.session(window, timing_profile=timing_profile) as stravis:
+            base_input, prev, failures = None, None, 0
+            while failures < max_failures:
+                unit = coordinator.take(worker)
+                if unit is None:
+                    break
+                job = make_job(unit['period'], unit['entities'])
+
+                def exported():
+                    return [(ent, manifest.entries[(job.period, ent)]['path'], manifest.entries[(job.period, ent)]['bytes'])
+                            for ent in unit['entities'] if manifest.verify(job.period, ent)]
+                try:
+                    base_input, _ = script_core.run_job(stravis, base_input, job, steps_after(prev, job),
+                                                        output_dir, name_template, manifest)
+                except Exception as e:
+                    print(f"[{worker}] unit {unit['id']} failed: {e}")
+                    timing.profile.failed()
+                    coordinator.failed(worker, unit['id'], str(e), exported())
+                    # the session is in an unknown state: next unit starts over from the navigator
+                    base_input, prev = None, None
+                    failures += 1
+                    continue
+                done = exported()
+                prev = job
+                if len(done) < len(unit['entities']):
+                    # entities given up on after recovery: another worker gets a go at them; the session is fine
+                    missing = next(ent for ent in unit['entities'] if ent not in {d[0] for d in done})
+                    reason = manifest.entries.get((job.period, missing), {}).get('error', 'not exported')
+                    coordinator.failed(worker, unit['id'], f"{missing}: {reason}", done)
+                    failures += 1
+                    continue
+                coordinator.done(worker, unit['id'], done)
+                failures = 0
+            if failures >= max_failures:
+                error = f'gave up after {failures} failed units in a row'
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        stop.set()
+        coordinator.stop(worker, error)
+        if os.path.exists(manifest.path):
+            os.remove(manifest.path)
+
+
+def _local_worker(address, authkey, worker, window, output_dir, name_template, timing_profile, setup):
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except Exception:
+        pass
+    if setup is not None:
+        # e.g. bench.py starting a simulated STRAVIS in this process; may name the window to bind to
+        window = setup(window) or window
+    work(_connect(address, authkey), worker, window, output_dir, name_template, timing_profile)
+
+
+# ------------- coordinator -------------
+
+def print_status(status):
+    for w, st in sorted(status.items()):
+        extra = f"  {st['unit']}" if st['unit'] else (f"  ({st['error']})" if st['error'] else '')
+        print(f"  {w:<10}{st['state']:<9}{st['units']:>3} units {st['entities']:>3} entities {st['queued']:>3} queued "
+              f"{st['stolen']:>2} stolen {st['failures']:>2} failed  busy {st['busy']:>6.1f}s{extra}")
+
+
+def run_sharded(jobs, windows=(), output_dir=None, name_template=DEFAULT_NAME_TEMPLATE, resume=False, listen=None,
+                chunk=None, timing_profile=None, setup=None, poll=2.0, lost_after=120.0, on_status=None,
+                own_input=False):
+    """
+    Export `jobs` with one local worker per window in `windows` (handle or 'pid:<id>') plus any
+    remote workers that connect to `listen` ('host:port'). Returns the merged summary.
+    setup(window) runs first in each local worker process (picklable; see bench.py shards).
+    on_status(status) is called with the per-worker status whenever it changes.
+    own_input: every local worker has input of its own (simulated sessions); otherwise at most one window.
+    """
+    if len(windows) > 1 and not own_input:
+        raise RuntimeError(f"{len(windows)} local windows would type into each other's STRAVIS: run one local "
+                           f"worker and connect the others from their own sessions (--listen / --connect)")
+    for job in jobs:
+        if not re.match(r"^\d{4}\.\d{2}$", job.period):
+            raise ValueError("period must look like 'YYYY.MM', e.g. '2025.03'")
+    output_dir = output_dir or downloads_dir()
+    manifest = RunManifest(manifest_path(output_dir))
+    if resume:
+        before = sum(job.iterations for job in jobs)
+        jobs = resume_jobs(jobs, manifest.verify)
+        print(f"Resume: {before - sum(job.iterations for job in jobs)} of {before} exports already done")
+    names = [f'w{n + 1}' for n in range(len(windows))]
+    coordinator = Coordinator(jobs, names, chunk=chunk, manifest=manifest)
+    if listen:
+        authkey = _authkey()
+        address = _serve(coordinator, _address(listen), authkey)
+        print(f"Coordinator listening on {address[0]}:{address[1]}")
+    else:
+        authkey = os.urandom(16)
+        address = _serve(coordinator, ('127.0.0.1', 0), authkey)
+
+    procs = {}
+    for name, window in zip(names, windows):
+        p = mp.Process(target=_local_worker, name=f'shard-{name}',
+                       args=(address, authkey, name, window, output_dir, name_template, timing_profile, setup))
+        p.daemon = True
+        p.start()
+        procs[name] = p
+
+    last = None
+    while True:
+        for name, p in procs.items():
+            if not p.is_alive() and coordinator.workers.get(name, {}).get('state') in _LIVE:
+                coordinator.stop(name, f'process exited with code {p.exitcode}')
+        coordinator.reap(lost_after)
+        status = coordinator.status()
+        shown = {w: (st['state'], st['units'], st['unit'], st['queued']) for w, st in status.items()}
+        if shown != last:
+            last = shown
+            if on_status is not None:
+                on_status(status)
+            else:
+                print_status(status)
+        # with --listen, units left by failed workers wait for another one to connect
+        if coordinator.finished() or (not listen and not any(p.is_alive() for p in procs.values())):
+            break
+        time.sleep(poll)
+    for p in procs.values():
+        p.join(timeout=10)
+
+    summary = coordinator.summary()
+    summary['workers'] = coordinator.status()
+    print(f"Sharded: {summary['exported']} of {summary['entities']} exported by {len(summary['workers'])} workers "
+          f"in {summary['seconds']}s, {len(summary['failed'])} failed, {len(summary['not_run'])} not run")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--period', nargs='+', help='periods as YYYY.MM (coordinator)')
+    parser.add_argument('--include', action='append',
+                        help="entity set to export: comma-separated codes, 'default' or 'all' (repeatable)")
+    parser.add_argument('--window', action='append', default=[],
+                        help="STRAVIS window for the local worker: native handle (0x3004C) or pid:<id>")
+    parser.add_argument('--listen', help='also accept remote workers on host:port')
+    parser.add_argument('--connect', help='run as a worker of the coordinator at host:port')
+    parser.add_argument('--name', default=None, help='worker name (with --connect; default: host name)')
+    parser.add_argument('--chunk', type=int, help='entities per unit of work (default: ~4 units per worker)')
+    parser.add_argument('--output-dir', help='folder every worker saves into (default: Downloads)')
+    parser.add_argument('--name-template', default=DEFAULT_NAME_TEMPLATE)
+    parser.add_argument('--resume', action='store_true', help='skip entities the run manifest shows as exported')
+    parser.add_argument('--timing', help="timing profile (see timing.py; 'off' for the fixed pauses)")
+    args = parser.parse_args(argv)
+
+    if args.connect:
+        import platform
+        window = args.window[0] if args.window else None
+        work(_connect(_address(args.connect), _authkey()), args.name or platform.node(), window,
+             args.output_dir, args.name_template, args.timing)
+        return
+    if not args.period or not args.include:
+        parser.error('--period and --include are required for the coordinator')
+    if not args.window and not args.listen:
+        parser.error('give a --window, or --listen for remote workers')
+    if len(args.window) > 1:
+        parser.error('one local --window at most: workers on the same desktop type into each other\'s STRAVIS; '
+                     'start the others with --connect from their own sessions')
+    jobs = [make_job(period, _parse_include(spec)) for period in args.period for spec in args.include]
+    run_sharded(jobs, args.window, args.output_dir, args.name_template, args.resume, args.listen,
+                args.chunk, args.timing)
+
+
+if __name__ == '__main__':
+    mp.freeze_support()
+    main()
@@ -0,0 +1,551 @@
+"""
+Simulated STRAVIS for running script_core end to end on any OS.
+
+SimStravis builds a fake_uia tree with the parts the flow touches (navigator
+Node1, The Ribbon / Ribbon Tabs / Lower Ribbon, the Base List/Data Input pane
+with the AY..(YTD) period entry, pnlCndOrganization, btnDisp, chkBookDisp, the
+report list and report view, the Save As dialog) and reacts to the flow's clicks
+and keystrokes the way STRAVIS does, after configurable latencies:
+
+  Node1 double-click, DOWN, ENTER  -> Base List/Data Input opens
+  Display                          -> report list (one row per included entity)
+  TAB x3, ENTER on the list        -> report view for the row under the cursor
+  ALT+DOWN, UP/DOWN, ENTER         -> drop-down of the focused combo opens, moves, commits
+  Open in pnlCndOrganization       -> Organization list, one unchecked item per entity
+  SPACE (no search hit)            -> every organization checked (select-all + SPACE)
+  Ctrl+F, text (typed or SetValue)  -> the list being searched shows only the hit
+  Ctrl+F code, DOWN, SPACE         -> that organization's check flipped
+  Toggle() on an organization      -> its check flipped (patterns)
+  Select() on a report row         -> cursor moves to that row
+  Expand / Select / Collapse       -> combo lists its items, takes one, closes (patterns)
+  Save As Excel                    -> Save As dialog; Save writes the workbook
+  Close                            -> report view closes
+  message box up                   -> keystrokes go to it: ENTER presses its first button, ESC its last
+
+Windows carry NativeWindowHandle / ProcessId (this process), so script_core.attach
+can bind to one by handle or 'pid:<id>'; other_sessions=N puts N more windows named
+STRAVIS in front of it, as other logins on a shared desktop would.
+
+    sim = SimStravis(latency='fast', tree_size=2000)
+    sim.install()     # script_core.use_backend(sim.ui, ...)
+    script_core.run_automation('2025.03', to_deselect, iterations=3, output_dir=out)
+    sim.exported      # [(period, entity, path)] as STRAVIS saw them
+
+The exported workbooks are real (small) xlsx zip containers, written to disk at a
+configurable rate so export_watcher and the run manifest see them as they would.
+
+ReplayStravis takes its latencies from a recorded real session (recording.py).
+"""
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+
+from entities import ALL_ENTITIES
+from fake_uia import FakeControl, build_stravis
+from recording import load_recording, derive_latencies
+from uia_events import FakeEventSource
+
+# seconds until STRAVIS reacts
+LATENCY_PROFILES = {
+    'instant': {'open_base': 0.0, 'display': 0.0, 'dropdown': 0.0, 'render': 0.0,
+                'dialog': 0.0, 'save': 0.0, 'write': 0.0, 'close': 0.0, 'search': 0.0},
+    'fast':    {'open_base': 0.3, 'display': 0.5, 'dropdown': 0.05, 'render': 0.5,
+                'dialog': 0.2, 'save': 0.1, 'write': 0.1, 'close': 0.1, 'search': 0.1},
+    'typical': {'open_base': 1.5, 'display': 3.0, 'dropdown': 0.2, 'render': 6.0,
+                'dialog': 1.0, 'save': 0.5, 'write': 0.8, 'close': 0.5, 'search': 0.4},
+}
+
+_PERIOD = re.compile(r'^\d{4}\.\d{2}$')
+
+# seconds until the simulated user closes a message box left to them ('session_warning', 'notice' faults)
+USER_REACTION = 2.0
+
+
+class _ControlFactory:
+    @staticmethod
+    def CreateControlFromElement(element):
+        return getattr(element, 'ctrl', element)
+
+
+class SimUI:
+    """The uiautomation functions script_core calls, against the simulated desktop."""
+    Control = _ControlFactory
+
+    def __init__(self, sim):
+        self._sim = sim
+
+    def WindowControl(self, **kwargs):
+        kwargs.setdefault('searchDepth', 1)
+        return self._sim.desktop.WindowControl(**kwargs)
+
+    def GetRootControl(self):
+        return self._sim.desktop
+
+    def ControlFromHandle(self, handle):
+        return next((w for w in self._sim.desktop.children if w.handle == handle), None)
+
+    def GetForegroundControl(self):
+        return self._sim.foreground
+
+    def GetFocusedControl(self):
+        return self._sim.focus or self._sim.stravis
+
+    def SetGlobalSearchTimeout(self, seconds):
+        pass
+
+
+class SimKeyboard:
+    """keyinput sink: injected strokes reach the simulation in order, as fast as they come."""
+
+    def __init__(self, sim):
+        self._sim = sim
+
+    def inject(self, strokes):
+        for kind, value in strokes:
+            if kind == 'key':
+                self._sim.key(value)
+            elif kind == 'text':
+                for ch in value:
+                    self._sim.text(ch)
+
+
+class SimStravis:
+    def __init__(self, latency='fast', tree_size=0, export_bytes=64 * 1024, entities=ALL_ENTITIES, other_sessions=0,
+                 foreground_after=None, faults=None, grid_list=False):
+        """
+        other_sessions: idle windows also named STRAVIS in front of this one (other logins on the desktop).
+        grid_list: the report list is a DataGrid, like the report itself (STRAVIS' lists may be grids)
+        foreground_after: seconds until the user brings STRAVIS to the front (until then another
+        window is the foreground one); None: STRAVIS is in front from the start.
+        faults: {entity: [fault, ...]}, each fault hitting that entity's next export once:
+          'no_dialog'  Save As Excel does not open the Save As dialog
+          'stuck'      Save in the Save As dialog does nothing (the dialog stays open)
+          'no_close'   Close leaves the report open
+          'error_box'  Save As Excel shows an error message box instead of the Save As dialog
+          'overwrite'  Save asks 'Confirm Save As' (Yes saves, No goes back to the Save As dialog)
+          'session_warning'  the report opens with a session expiry warning in front; the user answers it
+                       after USER_REACTION (signs in again)
+          'notice'     the report opens with a message box no rule knows; the user closes it after USER_REACTION
+        """
+        self.latency = dict(LATENCY_PROFILES[latency]) if isinstance(latency, str) else dict(latency)
+        self.export_bytes = export_bytes
+        self.entities = list(entities)
+        self.ui = SimUI(self)
+        self.keyboard = SimKeyboard(self)
+        self.lock = threading.RLock()
+
+        self.mode = 'idle'          # idle, node1, base_input, list, report
+        self.search_text = None     # text typed after Ctrl+F
+        self.pending_entity = None  # entity found by the search, toggled by SPACE
+        self.period = None
+        self.cursor = 0
+        self.rows = []
+        self.open_entity = None
+        self.dropdown = None        # (popup list, owning combo or None, highlighted index)
+        self.focus = None           # combo / button with keyboard focus, where the sim tracks it
+        self.save_as = None
+        self.modal = None           # message box in front of everything, receiving the keystrokes
+        self.exported = []          # (period, entity, path)
+        self.choices = []           # (layout combo, Edition cell) at each save
+        self.keys = 0
+        self.faults = {e: list(f) for e, f in (faults or {}).items()}
+
+        self.desktop, self.stravis = build_stravis()
+        self.stravis.pid = os.getpid()
+        self.stravis.handle = 0x10000 + os.getpid() * 4
+        for n in range(other_sessions):
+            other = FakeControl('WindowControl', 'STRAVIS')
+            other.pid, other.handle = -1 - n, 0x8 + n * 4
+            self.desktop.add(other, index=0)
+        self.foreground = self.stravis
+        if foreground_after is not None:
+            self.foreground = FakeControl('WindowControl', 'STRAVIS Automation Runner')
+            self.desktop.add(self.foreground)
+            t = threading.Timer(foreground_after, lambda: setattr(self, 'foreground', self.stravis))
+            t.daemon = True
+            t.start()
+        parts = self.stravis.parts
+        parts['op_tab'].on_invoke = lambda c: c.set(selected=True)
+        parts['save_btn'].on_invoke = lambda c: self._after('dialog', self._open_save_as)
+        parts['close_btn'].on_invoke = lambda c: self._after('close', self._close_report)
+
+        # navigator tree with `tree_size` filler items in front of Node1, so searches have work to do
+        nav = FakeControl('TreeControl', 'Navigator')
+        for g in range(max(tree_size, 0) // 50 + (1 if tree_size % 50 else 0)):
+            group = FakeControl('TreeItemControl', f'Folder {g}')
+            for i in range(min(50, tree_size - g * 50)):
+                group.add(FakeControl('TreeItemControl', f'Item {g}.{i}'))
+            nav.add(group)
+        nav.add(FakeControl('TreeItemControl', 'Node1', on_invoke=lambda c: self._set_mode('node1')))
+        self.stravis.add(nav, index=0)
+
+        self.org_items = {e: FakeControl('ListItemControl', e) for e in self.entities}
+        self.org_list = FakeControl('ListControl', 'Organizations', children=list(self.org_items.values()))
+        self.org_pane = FakeControl('PaneControl', 'Organization', 'pnlCndOrganization', children=[
+            FakeControl('ButtonControl', 'Open', on_invoke=lambda c: self._show_org_list()),
+        ])
+        self.report_list = FakeControl('DataGridControl' if grid_list else 'ListControl', 'Report List')
+        self.periods = FakeControl('ListControl', 'Periods', children=[
+            FakeControl('DataItemControl', 'AY2025 (YTD)'),
+            FakeControl('DataItemControl', 'AY2024 (YTD)'),
+        ] + [FakeControl('DataItemControl', f'{y}.{m:02d}') for y in (2024, 2025) for m in range(1, 13)])
+        self.search_box = FakeControl('EditControl', 'Search', value='',
+                                      on_value=lambda c, v: self._locked(lambda: self._search(v)))
+        # report layout combo right after Display in tab order; ALT+DOWN then 4x UP picks Period/Edition
+        self.layout_combo = self._combo('Display by', ['Period/Edition', 'Entity/Period', 'Account/Period',
+                                                       'Period/Account', 'Entity/Account'], selected=4)
+        self.display_btn = FakeControl('ButtonControl', 'Display', 'btnDisp',
+                                       on_invoke=lambda c: self._after('display', self._display))
+        self.base_input = FakeControl('PaneControl', 'Base List/Data Input', children=[
+            self.periods,
+            self.search_box,
+            self.org_pane,
+            self.display_btn,
+            self.layout_combo,
+            FakeControl('CheckBoxControl', 'Show books', 'chkBookDisp', toggle_state=0),
+        ])
+
+    # ----- wiring -----
+    def install(self):
+        """Point script_core at this simulation (and the event hub at its notifications)."""
+        import script_core
+        script_core.use_backend(self.ui, event_source=lambda stravis: FakeEventSource(self.desktop),
+                                input_sink=self.keyboard)
+        return self
+
+    def queries(self):
+        """Cross-process-style calls the flow made so far (fake_uia counters)."""
+        return sum(v for k, v in self.desktop.stats.items() if k not in ('nodes_visited', 'actions'))
+
+    def _delay(self, what):
+        return self.latency.get(what, 0.0)
+
+    def _after(self, what, fn):
+        delay = self._delay(what)
+        if delay > 0:
+            t = threading.Timer(delay, self._locked, (fn,))
+            t.daemon = True
+            t.start()
+        else:
+            self._locked(fn)
+
+    def _locked(self, fn):
+        with self.lock:
+            fn()
+
+    def _set_mode(self, mode):
+        with self.lock:
+            self.mode = mode
+
+    def _combo(self, name, options, selected=0):
+        combo = FakeControl('ComboBoxControl', name, value=options[selected],
+                            on_expand=lambda c, expand: self._after('dropdown', lambda: self._expand(c, expand)))
+        combo.options = list(options)
+        return combo
+
+    # ----- keyboard -----
+    def key(self, key):
+        with self.lock:
+            self.keys += 1
+            if self.modal is not None:
+                buttons = self.modal.buttons
+                if key == 'enter' or key in ('esc', 'escape'):
+                    self._answer(self.modal, buttons[0] if key == 'enter' else buttons[-1])
+            elif key == 'ctrl+f':
+                self.focus = self.search_box
+                self._search('')
+            elif key == 'tab':
+                # only the hop Display -> layout combo is modelled; other TABs leave focus untracked
+                self.focus = self.layout_combo if self.focus is self.display_btn else None
+            elif key == 'backspace' and self.search_text is not None:
+                self._search(self.search_text[:-1])
+            elif key == 'alt+down':
+                self._after('dropdown', self._open_dropdown)
+            elif key in ('esc', 'escape'):
+                self._escape()
+            elif key == 'enter':
+                self._enter()
+            elif key == 'down':
+                self._down()
+            elif key == 'up' and self.dropdown is not None:
+                self._move_dropdown(-1)
+            elif key == 'space' and self.pending_entity:
+                item = self.org_items[self.pending_entity]
+                item.set(toggle_state=0 if item.toggle_state else 1)
+                self.pending_entity = None
+            elif key == 'space' and self.org_list.parent is not None:
+                for item in self.org_items.values():
+                    item.set(toggle_state=1)
+
+    def text(self, ch):
+        with self.lock:
+            self.keys += 1
+            if self.search_text is None or self.modal is not None:
+                return
+            self._search(self.search_text + ch)
+
+    def _search(self, text):
+        """Search box text changed: once it names a period / entity (or is cleared) the list filters."""
+        self.search_text = text
+        if self.search_box.value != text:
+            self.search_box.set(value=text)
+        if text and not _PERIOD.match(text) and text not in self.entities:
+            return
+        items = self.org_list.children if self.org_list.parent is not None else self.periods.children
+
+        def apply():
+            if self.search_text != text:
+                return
+            if _PERIOD.match(text):
+                self.period = text
+            elif text:
+                self.pending_entity = text
+            for item in items:
+                if not text or text in item._name:
+                    if not item.visible():
+                        item.show()
+                elif item.visible():
+                    item.hide()
+        self._after('search', apply)
+
+    def _down(self):
+        if self.dropdown is not None:
+            self._move_dropdown(1)
+        elif self.search_text:
+            # DOWN after a search moves onto the hit; the next SPACE toggles it
+            self.search_text = None
+        elif self.mode == 'list' and self.dropdown is None:
+            self.cursor += 1
+
+    def _enter(self):
+        if self.dropdown is not None:
+            self._after('dropdown', self._close_dropdown)
+        elif self.mode == 'node1':
+            self.mode = 'base_input'
+            self._after('open_base', lambda: self.stravis.add(self.base_input))
+        elif self.mode == 'list' and 0 <= self.cursor < len(self.rows):
+            self.mode = 'report'
+            self.open_entity = self.rows[self.cursor]
+            self._open_report()
+
+    def _escape(self):
+        if self.save_as is not None:
+            dialog, self.save_as = self.save_as, None
+            self.desktop.remove(dialog)
+        elif self.dropdown is not None:
+            dropdown, self.dropdown = self.dropdown, None
+            self.stravis.remove(dropdown[0])
+
+    def _message_box(self, title, text, buttons, on_answer=None):
+        """A modal STRAVIS message box; pressing one of `buttons` closes it and calls on_answer(button)."""
+        box = FakeControl('WindowControl', title, children=[FakeControl('TextControl', text)] + [
+            FakeControl('ButtonControl', b, on_invoke=lambda c, b=b: self._locked(lambda: self._answer(box, b)))
+            for b in buttons
+        ])
+        box.pid = self.stravis.pid
+        box.modal = True
+        box.buttons, box.on_answer = list(buttons), on_answer
+        # the title bar's X: same as the last button (Cancel / No / the only one)
+        box.on_close = lambda c: self._locked(lambda: self._answer(box, box.buttons[-1]))
+        self.modal = box
+        self.desktop.add(box)
+        return box
+
+    def _answer(self, box, button):
+        if box.parent is None:
+            return
+        self.desktop.remove(box)
+        if self.modal is box:
+            self.modal = None
+        if box.on_answer is not None:
+            box.on_answer(button)
+
+    def _fault(self, fault):
+        """True (once) if the open report's entity has `fault` pending."""
+        pending = self.faults.get(self.open_entity)
+        if pending and fault in pending:
+            pending.remove(fault)
+            return True
+        return False
+
+    # ----- STRAVIS reactions -----
+    def _keyboard_combo(self):
+        """Combo ALT+DOWN acts on: the focused one, or in a report the Edition cell the keystrokes reach."""
+        if self.mode == 'report':
+            return self.stravis.parts.get('edition')
+        return self.focus if self.focus is self.layout_combo else None
+
+    def _open_dropdown(self):
+        if self.dropdown is None:
+            combo = self._keyboard_combo()
+            options = combo.options if combo is not None else [f'Option {i}' for i in range(5)]
+            popup = self.stravis.add(FakeControl('ListControl', 'Dropdown', children=[
+                FakeControl('ListItemControl', o) for o in options
+            ]))
+            self.dropdown = (popup, combo, options.index(combo.value) if combo is not None else 0)
+
+    def _move_dropdown(self, step):
+        popup, combo, index = self.dropdown
+        self.dropdown = (popup, combo, min(max(index + step, 0), len(popup.children) - 1))
+
+    def _close_dropdown(self):
+        dropdown, self.dropdown = self.dropdown, None
+        if dropdown is not None:
+            popup, combo, index = dropdown
+            if combo is not None:
+                combo.set(value=combo.options[index])
+            self.stravis.remove(popup)
+
+    def _expand(self, combo, expand):
+        """ExpandCollapse on a combo: items listed under it; selecting one sets the combo's value."""
+        for child in list(combo.children):
+            combo.remove(child)
+        if expand:
+            combo.add(FakeControl('ListControl', 'List', children=[
+                FakeControl('ListItemControl', o, selected=(o == combo.value),
+                            on_invoke=lambda c, o=o: combo.set(value=o)) for o in combo.options
+            ]))
+        combo.set(expanded=expand)
+
+    def _show_org_list(self):
+        if self.org_list.parent is None:
+            # opened again after a Display: a fresh list, not the removed one
+            self.org_pane.add(self.org_list.show())
+
+    def _select_row(self, entity):
+        with self.lock:
+            if self.mode == 'list' and entity in self.rows:
+                self.cursor = self.rows.index(entity)
+
+    def _display(self):
+        self.rows = [e for e in self.entities if self.org_items[e].toggle_state == 1]
+        for child in list(self.report_list.children):
+            self.report_list.remove(child)
+        for e in self.rows:
+            self.report_list.add(FakeControl('DataItemControl', e, on_invoke=lambda c, e=e: self._select_row(e)))
+        if self.report_list.parent is None:
+            self.base_input.add(self.report_list)
+        if self.org_list.parent is not None:
+            self.org_pane.remove(self.org_list)
+        # Display drops any search filter
+        self.search_text = None
+        self.search_box.set(value='')
+        for item in self.periods.children + self.org_list.children:
+            if not item.visible():
+                item.show()
+        self.mode = 'list'
+        # focus lands two rows above the first entity (header, filter row)
+        self.cursor = -2
+        self.focus = self.display_btn
+
+    def _open_report(self):
+        # five cells per row; the fourth cell of the first row is the Edition drop-down press_e changes
+        edition = self._combo('Edition', [f'Option {i}' for i in range(5)])
+        grid = FakeControl('DataGridControl', 'Report', children=[
+            FakeControl('DataItemControl', f'{self.open_entity} row {i}', children=[
+                edition if (i, c) == (0, 3) else FakeControl('TextControl', f'R{i}C{c}') for c in range(5)
+            ]) for i in range(20)
+        ])
+        self.stravis.parts['edition'] = edition
+        view = FakeControl('PaneControl', 'Report View', children=[grid.show(after=self._delay('render'))])
+        self.stravis.parts['view'] = self.stravis.add(view)
+        box = None
+        if self._fault('session_warning'):
+            box = self._message_box('Session Warning',
+                                    'Your session will expire in 5 minutes. Click OK to stay signed in.', ['OK'])
+        elif self._fault('notice'):
+            box = self._message_box('Data Check', 'Some accounts of this entity have no data for the period.', ['OK'])
+        if box is not None:
+            t = threading.Timer(USER_REACTION, self._locked, (lambda: self._answer(box, 'OK'),))
+            t.daemon = True
+            t.start()
+
+    def _close_report(self):
+        if self._fault('no_close'):
+            return
+        view = self.stravis.parts.pop('view', None)
+        if view is not None:
+            self.stravis.remove(view)
+        self.mode = 'list'
+        self.open_entity = None
+
+    def _open_save_as(self):
+        if self.mode != 'report' or self.save_as is not None or self._fault('no_dialog'):
+            return
+        if self._fault('error_box'):
+            self._message_box('STRAVIS - Error', 'The report could not be exported to Excel.', ['OK'])
+            return
+        name_box = FakeControl('EditControl', 'File name:', '1001', value='')
+        stuck = self._fault('stuck')
+        save = FakeControl('ButtonControl', 'Save', '1', on_invoke=lambda c: None if stuck else self._after(
+            'save', lambda: self._save_clicked(name_box.value)))
+        self.save_as = FakeControl('WindowControl', 'Save As', children=[
+            FakeControl('PaneControl', 'sidePanel1', children=[
+                FakeControl('GroupControl', 'Data Panel', children=[FakeControl('DataItemControl', 'Downloads')]),
+            ]),
+            name_box, save,
+        ])
+        self.save_as.pid = self.stravis.pid
+        self.save_as.modal = True
+        self.save_as.on_close = lambda c: self._locked(self._escape)
+        self.desktop.add(self.save_as)
+
+    def _save_clicked(self, path):
+        if self._fault('overwrite'):
+            self._message_box('Confirm Save As',
+                              f'{os.path.basename(path)} already exists.\nDo you want to replace it?', ['Yes', 'No'],
+                              on_answer=lambda button: self._save(path) if button == 'Yes' else None)
+        else:
+            self._save(path)
+
+    def _save(self, path):
+        dialog, self.save_as = self.save_as, None
+        if dialog is not None:
+            self.desktop.remove(dialog)
+        self.exported.append((self.period, self.open_entity, path))
+        edition = self.stravis.parts.get('edition')
+        self.choices.append((self.layout_combo.value, edition.value if edition is not None else None))
+        t = threading.Thread(target=self._write_workbook, args=(path, self.open_entity), daemon=True)
+        t.start()
+
+    def _write_workbook(self, path, entity):
+        seconds = self._delay('write')
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as z:
+            z.writestr('xl/worksheets/sheet1.xml', (f'<sheet entity="{entity}"/>').encode() + os.urandom(self.export_bytes))
+        data = buf.getvalue()
+        chunks = 8
+        step = -(-len(data) // chunks)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            for i in range(0, len(data), step):
+                f.write(data[i:i + step])
+                f.flush()
+                time.sleep(seconds / chunks)
+
+
+class ReplayStravis(SimStravis):
+    """
+    SimStravis whose reaction times come from a recording, used in recorded order (the
+    n-th Save As takes as long to appear as the n-th one did for real; the sequence repeats
+    if the replayed run does more). Reactions the recording has no sample of use `fallback`.
+    """
+
+    def __init__(self, recording, fallback='fast', **kwargs):
+        super().__init__(latency=fallback, **kwargs)
+        rec = load_recording(recording) if isinstance(recording, str) else recording
+        self.recording = rec
+        self.timeline = derive_latencies(rec)
+        self._used = {}
+
+    def _delay(self, what):
+        seq = self.timeline.get(what)
+        if not seq:
+            return super()._delay(what)
+        with self.lock:
+            i = self._used.get(what, 0)
+            self._used[what] = i + 1
+        return seq[i % len(seq)]
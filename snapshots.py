@@ -0,0 +1,111 @@
+"""
+UI snapshots used by wait_for_change to detect that something changed.
+
+safe_snapshot costs GetChildren() plus four property calls per child on every poll.
+Here each parent's children come back with RuntimeId / ControlType / Name in a single
+FindAllBuildCache request, and every tree level is reduced to (count, hash). A poll
+compares level by level against the baseline and stops at the first level that
+differs, so deeper levels are only fetched while nothing has changed yet.
+"""
+RUNTIME_ID_PROPERTY = 30000
+CONTROL_TYPE_PROPERTY = 30003
+NAME_PROPERTY = 30005
+TREE_SCOPE_CHILDREN = 2
+
+_request = None
+
+
+def safe_snapshot(root):
+    snap = []
+    try:
+        children = list(root.GetChildren())
+    except Exception:
+        return snap
+
+    for c in children:
+        try:
+            if not c.Exists(0, 0):
+                continue
+        except Exception:
+            continue
+        try:
+            rid = tuple(c.GetRuntimeId())
+        except Exception:
+            rid = None
+        try:
+            ctype = getattr(c, 'ControlTypeName', None)
+        except Exception:
+            ctype = None
+        try:
+            name = c.Name
+        except Exception:
+            name = ""
+        snap.append((rid, ctype, name))
+    return snap
+
+
+def _cache_request():
+    """(cache request, condition) built once per process; (None, None) when uiautomation is absent."""
+    global _request
+    if _request is None:
+        try:
+            import uiautomation as ui
+        except ImportError:
+            # fake_uia trees ignore the request and condition
+            _request = (None, None)
+        else:
+            iua = ui._AutomationClient.instance().IUIAutomation
+            req = iua.CreateCacheRequest()
+            for pid in (RUNTIME_ID_PROPERTY, CONTROL_TYPE_PROPERTY, NAME_PROPERTY):
+                req.AddProperty(pid)
+            _request = (req, iua.CreateTrueCondition())
+    return _request
+
+
+def batched_children(element):
+    """[(key, child_element)] for the children of an IUIAutomationElement, in one cross-process call."""
+    req, cond = _cache_request()
+    try:
+        arr = element.FindAllBuildCache(TREE_SCOPE_CHILDREN, cond, req)
+    except Exception:
+        return []
+    out = []
+    for i in range(arr.Length if arr else 0):
+        el = arr.GetElement(i)
+        try:
+            rid = tuple(el.GetCachedPropertyValue(RUNTIME_ID_PROPERTY) or ())
+        except Exception:
+            rid = None
+        out.append(((rid, el.CachedControlType, el.CachedName), el))
+    return out
+
+
+def fingerprint(root, depth=1, stop_at=None):
+    """
+    Tuple of (child count, hash) per tree level below root, down to `depth` levels.
+    With stop_at (a previous fingerprint) the walk ends at the first level that differs.
+    """
+    levels = []
+    try:
+        parents = [root.Element]
+    except Exception:
+        return ()
+    for level in range(depth):
+        keys = []
+        children = []
+        for parent in parents:
+            for key, child in batched_children(parent):
+                keys.append(key)
+                children.append(child)
+        digest = (len(keys), hash(tuple(keys)))
+        levels.append(digest)
+        if stop_at is not None and (level >= len(stop_at) or stop_at[level] != digest):
+            break
+        if not children:
+            break
+        parents = children
+    return tuple(levels)
+
+
+def fingerprint_changed(root, baseline, depth=1):
+    return fingerprint(root, depth, stop_at=baseline) != baseline
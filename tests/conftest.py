@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the repository root, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uia_events import events
+
+
+@pytest.fixture(autouse=True)
+def _polling_hub():
+    """Every test starts and ends with no event source on the shared hub."""
+    events.stop()
+    yield
+    events.stop()
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import app_gui
+
+
+def test_the_gui_does_not_load_the_automation_stack():
+    code = ("import sys, app_gui; "
+            "print(sorted(m for m in ('script_core', 'uiautomation', 'statistics') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(app_gui.__file__)))
+    assert out.stdout.strip() == '[]'
+
+
+class _Polling:
+    """The parts of App that _poll_results uses, without a Tk window."""
+    _poll_results = app_gui.App._poll_results
+
+    def __init__(self, queued=()):
+        self.queued = list(queued)
+        self.worker = type('Worker', (), {'alive': lambda self: False})()
+        self.scheduled, self.final = [], None
+
+    def _drain(self):
+        return self.queued.pop(0) if self.queued else None
+
+    def after(self, ms, fn, *args):
+        self.scheduled.append((ms, fn, args))
+        return f'after#{len(self.scheduled)}'
+
+    def _finalize_run(self, kind, message):
+        self.final = (kind, message)
+
+
+def test_a_finished_worker_gets_another_look_later_instead_of_a_sleep():
+    app = _Polling()
+    app._poll_results()
+    assert app.final is None and app.scheduled[0][0] == 100
+    # the last message arrived in the meantime
+    app.queued.append(('ok', 'Automation finished without raising errors.'))
+    _, fn, args = app.scheduled[0]
+    fn(*args)
+    assert app.final == ('ok', 'Automation finished without raising errors.')
+
+
+def test_a_worker_that_died_without_a_result_is_reported():
+    app = _Polling()
+    app._poll_results()
+    _, fn, args = app.scheduled[0]
+    fn(*args)
+    assert app.final == ('err', 'Automation process ended unexpectedly.')
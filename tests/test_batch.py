@@ -0,0 +1,35 @@
+import pytest
+
+from batch import STEPS, make_job, exported_entities, steps_after, plan_jobs, plan_summary
+from entities import ALL_ENTITIES
+
+A, B = ALL_ENTITIES[:3], ALL_ENTITIES[3:5]
+
+
+def test_make_job_keeps_the_report_order():
+    job = make_job('2025.03', list(reversed(A)))
+    assert job.iterations == 3 and exported_entities(job) == A
+    assert set(job.to_deselect) == set(ALL_ENTITIES) - set(A)
+    with pytest.raises(ValueError, match='Unknown entities: X1'):
+        make_job('2025.03', ['X1'])
+
+
+def test_only_the_steps_that_differ_are_redone():
+    first = make_job('2025.03', A)
+    assert steps_after(None, first) == STEPS
+    assert steps_after(first, make_job('2025.04', A)) == ('period', 'display')
+    assert steps_after(first, make_job('2025.03', B)) == ('entities', 'display')
+    assert steps_after(first, make_job('2025.04', B)) == ('period', 'entities', 'display')
+
+
+def test_plan_groups_jobs_so_fewer_steps_are_redone():
+    periods = ('2025.01', '2025.02', '2025.03')
+    # asked for period by period; grouped by entity set instead, each set is selected once
+    jobs = [make_job(p, include) for p in periods for include in (A, B)]
+    planned = plan_jobs(jobs)
+    assert [exported_entities(job) for job, _ in planned] == [A] * 3 + [B] * 3
+    assert [steps for _, steps in planned][:2] == [STEPS, ('period', 'display')]
+    summary = plan_summary(planned)
+    assert summary['jobs'] == 6 and summary['steps_run'] == 4 + 2 + 2 + 3 + 2 + 2
+    assert summary['steps_saved'] == 6 * 4 - summary['steps_run'] and summary['seconds_saved_est'] > 0
+    assert plan_jobs([]) == []
@@ -0,0 +1,49 @@
+import csv
+
+import pytest
+from openpyxl import Workbook
+
+from consolidate import COLUMNS, consolidate, find_exports, iter_records
+from exports import export_path
+
+
+def _workbook(folder, entity, amount):
+    path = export_path(str(folder), '2025.03', entity, template='{period}_{entity}.xlsx')
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Report'
+    ws.append(['STRAVIS report'])   # one filled cell: not the header
+    ws.append(['Account', 'Amount'])
+    ws.append(['Sales', amount])
+    ws.append([])
+    ws.append(['Costs', None])
+    wb.save(path)
+    return path
+
+
+def test_one_record_per_filled_cell_under_its_header(tmp_path):
+    path = _workbook(tmp_path, 'D342', 12.5)
+    records = list(iter_records(path, template='{period}_{entity}.xlsx'))
+    assert [(r[4], r[5], r[6], r[7]) for r in records] == [
+        (1, 'col1', 'STRAVIS report', None), (3, 'Account', 'Sales', None), (3, 'Amount', '12.5', 12.5),
+        (5, 'Account', 'Costs', None)]
+    assert {r[:4] for r in records} == {('2025.03', 'D342', '2025.03_D342.xlsx', 'Report')}
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_consolidate_appends_the_files_in_input_order(tmp_path, suffix):
+    paths = [_workbook(tmp_path, e, n) for n, e in enumerate(['D342', 'D100', 'D200'])]
+    (tmp_path / '~$D342.xlsx').write_bytes(b'lock')
+    assert find_exports([str(tmp_path)]) == sorted(paths)
+    out = str(tmp_path / f'month_end{suffix}')
+    counts = consolidate(paths, out, workers=2, template='{period}_{entity}.xlsx')
+    assert counts == {p: 4 for p in paths}
+    if suffix == '.csv':
+        with open(out, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        assert tuple(rows[0]) == COLUMNS
+        entities = [r[1] for r in rows[1:]]
+    else:
+        pq = pytest.importorskip('pyarrow.parquet')
+        entities = pq.read_table(out).column('entity').to_pylist()
+    assert entities == ['D342'] * 4 + ['D100'] * 4 + ['D200'] * 4
@@ -0,0 +1,115 @@
+import json
+import threading
+
+import pytest
+
+import keyinput
+from dialog_watchdog import (DialogWatchdog, DEFAULT_RULES, IGNORE, CONFIRM, DISMISS, PAUSE, ABORT,
+                             classify, load_rules)
+from fake_uia import FakeControl, FakeDesktop
+
+
+def _action(title, text='', own=True, rules=DEFAULT_RULES):
+    rule = classify(rules, title, text, own)
+    return rule and rule.action
+
+
+def test_default_rules():
+    assert _action('Save As') == IGNORE
+    assert _action('Base List/Data Input') == IGNORE
+    assert _action('Confirm Save As', 'D342.xlsx already exists. Do you want to replace it?') == ABORT
+    assert _action('STRAVIS', 'Your session will expire in 5 minutes.') == PAUSE
+    assert _action('STRAVIS - Error', 'The report could not be exported to Excel.') == ABORT
+    assert _action('Application Error') == ABORT
+    assert _action('STRAVIS', 'Unhandled exception has occurred in your application.') == ABORT
+    # a title merely mentioning errors is not an error box
+    assert _action('Error Log Settings') == PAUSE
+    assert _action('Data Check', 'Totals were recalculated.') == PAUSE
+
+
+def test_default_rules_leave_other_processes_alone():
+    assert _action('Windows Security', own=False) is None
+
+
+def test_first_matching_rule_wins(tmp_path, monkeypatch):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([
+        {'title': '^Confirm Save As$', 'action': 'confirm', 'button': 'Yes'},
+        {'text': '(?i)locked by', 'action': 'dismiss'},
+        {'title': '^Windows Security$', 'action': 'dismiss', 'any_process': True},
+    ]))
+    monkeypatch.setenv('STRAVIS_DIALOG_RULES', str(path))
+    rules = load_rules()
+    assert rules[3:] == list(DEFAULT_RULES)
+    assert _action('Confirm Save As', rules=rules) == CONFIRM
+    # the file's rule comes before the default session / error rules
+    assert _action('STRAVIS - Error', 'Session locked by another user', rules=rules) == DISMISS
+    assert _action('Windows Security', own=False, rules=rules) == DISMISS
+
+
+def test_load_rules_off_and_bad_action(tmp_path, monkeypatch):
+    monkeypatch.delenv('STRAVIS_DIALOG_RULES', raising=False)
+    assert load_rules() == list(DEFAULT_RULES)
+    assert load_rules('off') is None
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([{'title': 'x', 'action': 'click'}]))
+    with pytest.raises(RuntimeError, match='action must be one of'):
+        load_rules(str(path))
+
+
+def _stravis_desktop():
+    stravis = FakeControl('WindowControl', 'STRAVIS')
+    stravis.pid = 4242
+    return FakeDesktop(stravis), stravis
+
+
+def _message_box(title, text, modal=True, pid=4242):
+    box = FakeControl('WindowControl', title, children=[FakeControl('TextControl', text),
+                                                        FakeControl('ButtonControl', 'OK')])
+    box.pid, box.modal = pid, modal
+    return box
+
+
+def test_scan_closes_an_error_box_and_aborts_the_flow():
+    desktop, stravis = _stravis_desktop()
+    watchdog = DialogWatchdog(lambda: desktop, stravis)
+    watchdog.flow, watchdog.pid = threading.current_thread(), stravis.pid
+    watchdog._known = set(watchdog._windows())
+    desktop.add(_message_box('STRAVIS - Error', 'The report could not be exported to Excel.'))
+    watchdog.scan()
+    assert [w.Name for w in desktop.GetChildren()] == ['STRAVIS']
+    assert watchdog.handled[0]['action'] == ABORT
+    with pytest.raises(RuntimeError, match="Aborted by the 'STRAVIS - Error' dialog"):
+        watchdog.checkpoint()
+    # the next scan sees it gone and lets the flow go on; the abort was raised once
+    watchdog.scan()
+    assert 'held' in watchdog.handled[0]
+    watchdog.checkpoint()
+
+
+def test_scan_skips_windows_that_are_not_modal_or_not_new():
+    desktop, stravis = _stravis_desktop()
+    desktop.add(_message_box('Notice', 'Already open before the run'))
+    watchdog = DialogWatchdog(lambda: desktop, stravis)
+    watchdog.flow, watchdog.pid = threading.current_thread(), stravis.pid
+    watchdog._known = set(watchdog._windows())
+    desktop.add(_message_box('Find', 'Tool window', modal=False))
+    watchdog.scan()
+    assert watchdog.handled == []
+    assert len(desktop.GetChildren()) == 3
+
+
+def test_an_abort_while_shift_is_held_still_releases_it(monkeypatch):
+    sink, passed = keyinput.RecordingSink(), []
+
+    def gate():
+        # the dialog comes up right after Shift went down
+        if passed:
+            raise RuntimeError("Aborted by the 'STRAVIS - Error' dialog")
+        passed.append(1)
+
+    monkeypatch.setattr(keyinput, '_sink', sink)
+    monkeypatch.setattr(keyinput, 'gates', [gate])
+    with pytest.raises(RuntimeError, match='Aborted'):
+        keyinput.hold('shift', 'down', 'down')
+    assert sink.strokes() == [(keyinput.DOWN, 'shift'), (keyinput.UP, 'shift')]
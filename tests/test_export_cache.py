@@ -0,0 +1,93 @@
+import itertools
+import types
+import zipfile
+
+import pytest
+
+import export_cache
+from export_cache import ExportCache, cache_dir, entry_key
+
+SETTINGS = {'layout': 'Standard', 'edition': 'Final'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """export_cache's clock ticks one second per call, so last_used orders strictly."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(export_cache, 'time', types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def _export(folder, name, size=100):
+    path = folder / f'{name}.xlsx'
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('xl/workbook.xml', name * size)
+    return str(path)
+
+
+def test_key_covers_period_entity_and_settings():
+    key = entry_key('2025.03', 'D342', SETTINGS)
+    assert key == entry_key('2025.03', 'D342', dict(reversed(list(SETTINGS.items()))))
+    assert key != entry_key('2025.04', 'D342', SETTINGS)
+    assert key != entry_key('2025.03', 'D100', SETTINGS)
+    assert key != entry_key('2025.03', 'D342', dict(SETTINGS, edition='Draft'))
+
+
+def test_closed_periods_are_served_open_ones_are_not(tmp_path):
+    cache = ExportCache(str(tmp_path / 'cache'))
+    cache.close_period('2025.03')
+    cache.store('2025.03', 'D342', SETTINGS, _export(tmp_path, 'closed'))
+    cache.store('2025.04', 'D342', SETTINGS, _export(tmp_path, 'open'))
+    dest = tmp_path / 'out' / 'D342.xlsx'
+    assert cache.fetch('2025.03', 'D342', SETTINGS, str(dest)) is not None
+    assert dest.read_bytes() == (tmp_path / 'closed.xlsx').read_bytes()
+    assert cache.fetch('2025.03', 'D342', dict(SETTINGS, edition='Draft'), str(dest)) is None
+    assert cache.fetch('2025.04', 'D342', SETTINGS, str(dest)) is None
+    assert cache.report()['hits'] == 1 and cache.report()['lookups'] == 3
+
+
+def test_least_recently_used_is_evicted_first(tmp_path, clock):
+    cache = ExportCache(str(tmp_path / 'cache'))
+    cache.close_period('2025.03')
+    for name in ('A', 'B', 'C'):
+        entry = cache.store('2025.03', name, SETTINGS, _export(tmp_path, name, size=300))
+    cache.max_bytes = 3 * entry['bytes']  # room for three
+    # A served last: B is now the least recently used
+    assert cache.fetch('2025.03', 'A', SETTINGS, str(tmp_path / 'served.xlsx'))
+    cache.store('2025.03', 'D', SETTINGS, _export(tmp_path, 'D', size=300))
+    assert sorted(e['entity'] for e in cache.entries.values()) == ['A', 'C', 'D']
+    cache.store('2025.03', 'E', SETTINGS, _export(tmp_path, 'E', size=300))
+    assert sorted(e['entity'] for e in cache.entries.values()) == ['A', 'D', 'E']
+    assert cache.stats['evicted'] == 2
+    assert len(list((tmp_path / 'cache' / 'objects').rglob('*.xlsx'))) == 3
+
+
+def test_a_damaged_object_is_dropped(tmp_path):
+    cache = ExportCache(str(tmp_path / 'cache'))
+    cache.close_period('2025.03')
+    entry = cache.store('2025.03', 'D342', SETTINGS, _export(tmp_path, 'D342'))
+    with open(cache._object(entry), 'ab') as f:
+        f.write(b'!')
+    assert cache.fetch('2025.03', 'D342', SETTINGS, str(tmp_path / 'out.xlsx')) is None
+    assert not ExportCache(str(tmp_path / 'cache')).entries
+
+
+def test_cache_is_off_unless_named(monkeypatch, tmp_path):
+    monkeypatch.delenv('STRAVIS_CACHE', raising=False)
+    assert cache_dir() is None
+    assert cache_dir('off') is None
+    assert cache_dir(str(tmp_path)) == str(tmp_path)
+    monkeypatch.setenv('STRAVIS_CACHE', str(tmp_path))
+    assert cache_dir() == str(tmp_path)
+
+
+def test_saves_from_two_runs_are_merged(tmp_path):
+    folder = str(tmp_path / 'cache')
+    first, second = ExportCache(folder), ExportCache(folder)
+    first.close_period('2025.03')
+    second.store('2025.03', 'A', SETTINGS, _export(tmp_path, 'A'))
+    first.store('2025.03', 'B', SETTINGS, _export(tmp_path, 'B'))
+    second.reopen_period('2025.02')
+    merged = ExportCache(folder)
+    assert sorted(e['entity'] for e in merged.entries.values()) == ['A', 'B']
+    assert merged.closed == {'2025.03'}
+    assert not [p for p in (tmp_path / 'cache').iterdir() if p.suffix == '.tmp']
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import pytest
+
+from export_watcher import ExportWatcher
+
+
+def _write_slowly(path, chunks=4, delay=0.05):
+    with open(path, 'wb') as f:
+        for _ in range(chunks):
+            f.write(b'x' * 1024)
+            f.flush()
+            time.sleep(delay)
+
+
+def test_waits_until_the_file_stops_growing(tmp_path):
+    with ExportWatcher(str(tmp_path), stable_for=0.2, poll_interval=0.05) as watcher:
+        path = tmp_path / 'D342.xlsx'
+        threading.Thread(target=_write_slowly, args=(path,)).start()
+        export = watcher.wait_for_export(str(path), timeout=5)
+    assert export.path == str(path) and export.bytes == 4 * 1024
+    assert export.write_seconds >= 0.2
+
+
+def test_files_from_before_and_temporary_files_do_not_count(tmp_path):
+    (tmp_path / 'old.xlsx').write_bytes(b'old')
+    with ExportWatcher(str(tmp_path), stable_for=0.1, poll_interval=0.05) as watcher:
+        (tmp_path / '~$new.xlsx').write_bytes(b'lock')
+        (tmp_path / 'new.xlsx.tmp').write_bytes(b'partial')
+        with pytest.raises(RuntimeError, match='Export not written within 0.3s'):
+            watcher.wait_for_export(timeout=0.3)
+        (tmp_path / 'new.xlsx').write_bytes(b'rows')
+        assert watcher.wait_for_export(timeout=5).path == str(tmp_path / 'new.xlsx')
+        # the next export is measured from the next arm()
+        watcher.arm()
+        (tmp_path / 'old.xlsx').write_bytes(b'rewritten')
+        assert watcher.wait_for_export(timeout=5).path == str(tmp_path / 'old.xlsx')
@@ -0,0 +1,22 @@
+import os
+from datetime import datetime
+
+from exports import DEFAULT_NAME_TEMPLATE, export_path, parse_export_name
+
+WHEN = datetime(2025, 4, 2, 9, 30, 5)
+
+
+def test_export_path_fills_the_template():
+    path = export_path('out', '2025.03', 'D342_HSO_HGMD', when=WHEN)
+    assert path == os.path.join('out', '2025.03_D342_HSO_HGMD_20250402-093005.xlsx')
+    assert export_path('out', '2025.03', 'D342', 4, '{index:02d}-{entity}') == os.path.join('out', '05-D342.xlsx')
+
+
+def test_characters_windows_rejects_are_replaced():
+    assert os.path.basename(export_path('out', '2025.03', 'A/B:C?', template='{entity}.xls')) == 'A_B_C_.xls'
+
+
+def test_parse_export_name_reads_the_fields_back():
+    path = export_path('out', '2025.03', 'D342_HSO_HGMD', when=WHEN)
+    assert parse_export_name(path) == {'period': '2025.03', 'entity': 'D342_HSO_HGMD', 'timestamp': '20250402-093005'}
+    assert parse_export_name('out/D342 (1).xlsx', DEFAULT_NAME_TEMPLATE) == {}
@@ -0,0 +1,58 @@
+import pytest
+
+import keyinput
+from keyinput import KEY, TEXT, DOWN, UP
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = keyinput.RecordingSink()
+    monkeypatch.setattr(keyinput, '_sink', sink)
+    monkeypatch.setattr(keyinput, 'gates', [])
+    keyinput.reset_stats()
+    yield sink
+    keyinput.reset_stats()
+
+
+def test_a_sequence_is_one_injection_in_order(sink):
+    keyinput.keys('Ctrl+F')
+    keyinput.write('2025.03')
+    keyinput.keys('tab', 'tab', 'enter')
+    assert [batch for _, batch in sink.injections] == [
+        [(KEY, 'ctrl+f')], [(TEXT, '2025.03')], [(KEY, 'tab'), (KEY, 'tab'), (KEY, 'enter')]]
+    stats = keyinput.stats()
+    assert (stats['injections'], stats['sequences'], stats['strokes']) == (3, 3, 5)
+    assert 'paced_s' not in stats and 'settle_s' not in stats
+
+
+def test_pace_splits_the_sequence_and_is_counted(sink):
+    keyinput.keys('down', 'down', 'down', pace=0.02, settle=0.01)
+    assert [batch for _, batch in sink.injections] == [[(KEY, 'down')]] * 3
+    times = [t for t, _ in sink.injections]
+    assert times[2] - times[0] >= 0.04
+    stats = keyinput.stats()
+    assert stats['injections'] == 3 and stats['sequences'] == 1
+    assert stats['paced_s'] >= 0.04 and stats['settle_s'] >= 0.01
+
+
+def test_gates_run_before_every_injection(sink, monkeypatch):
+    seen = []
+    monkeypatch.setattr(keyinput, 'gates', [lambda: seen.append(len(sink.injections))])
+    keyinput.keys('tab', 'tab', 'tab', pace=0.001)
+    assert seen == [0, 1, 2]
+
+
+def test_a_raising_gate_stops_the_rest_of_the_sequence(sink, monkeypatch):
+    def gate():
+        if sink.injections:
+            raise RuntimeError("Aborted by the 'Session Warning' dialog")
+    monkeypatch.setattr(keyinput, 'gates', [gate])
+    with pytest.raises(RuntimeError, match='Aborted'):
+        keyinput.keys('down', 'down', 'down', pace=0.001)
+    assert sink.strokes() == [(KEY, 'down')]
+
+
+def test_hold_wraps_the_chords_in_the_modifier(sink):
+    keyinput.hold('shift', 'down', 'down')
+    assert sink.strokes() == [(DOWN, 'shift'), (KEY, 'down'), (KEY, 'down'), (UP, 'shift')]
+    assert len(sink.injections) == 3
@@ -0,0 +1,56 @@
+from fake_uia import FakeControl, build_stravis
+from locator_cache import LocatorCache
+
+
+def _tab_resolver(stravis, calls):
+    def resolve():
+        calls.append(1)
+        tab = stravis.TabItemControl(Name='Operation', searchDepth=10)
+        return tab if tab.Exists(0, 0) else None
+    return resolve
+
+
+def test_resolves_once_then_hits():
+    desktop, stravis = build_stravis()
+    cache, calls = LocatorCache(), []
+    first = cache.get(('tab', 'Operation'), _tab_resolver(stravis, calls))
+    again = cache.get(('tab', 'Operation'), _tab_resolver(stravis, calls))
+    assert first is again
+    assert len(calls) == 1
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'stale': 0, 'entries': 1}
+
+
+def test_stale_entry_is_resolved_again():
+    desktop, stravis = build_stravis()
+    cache, calls = LocatorCache(freeze=lambda search: search.Element), []
+    op_tab = stravis.parts['op_tab']
+    assert cache.get('tab', _tab_resolver(stravis, calls)) is op_tab
+    # the ribbon is rebuilt: same name, new element
+    tabs = op_tab.parent
+    tabs.remove(op_tab)
+    replacement = FakeControl('TabItemControl', 'Operation')
+    tabs.add(replacement)
+    assert cache.get('tab', _tab_resolver(stravis, calls)) is replacement
+    assert len(calls) == 2
+    assert cache.stale == 1
+
+
+def test_none_is_not_cached():
+    desktop, stravis = build_stravis()
+    cache = LocatorCache()
+    assert cache.get('missing', lambda: None) is None
+    assert cache.get('missing', lambda: None) is None
+    assert cache.stats() == {'hits': 0, 'misses': 2, 'stale': 0, 'entries': 0}
+
+
+def test_invalidate_drops_one_key_or_all():
+    desktop, stravis = build_stravis()
+    cache = LocatorCache()
+    cache.get('save', lambda: stravis.parts['save_btn'])
+    cache.get('close', lambda: stravis.parts['close_btn'])
+    cache.invalidate('save')
+    assert cache.stats()['entries'] == 1
+    cache.get('save', lambda: stravis.parts['save_btn'])
+    assert cache.misses == 3
+    cache.reset()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'stale': 0, 'entries': 0}
@@ -0,0 +1,50 @@
+import zipfile
+
+from batch import make_job, exported_entities, resume_jobs
+from entities import ALL_ENTITIES
+from manifest import RunManifest, manifest_path, FAILED
+
+
+def _workbook(path, text='rows'):
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('xl/workbook.xml', text)
+    return str(path)
+
+
+def test_resume_skips_entities_with_an_intact_export(tmp_path):
+    include = ALL_ENTITIES[:4]
+    jobs = [make_job('2025.03', include), make_job('2025.04', include[:1])]
+    manifest = RunManifest(manifest_path(tmp_path))
+    manifest.record('2025.03', include[0], _workbook(tmp_path / 'a.xlsx'))
+    manifest.record('2025.03', include[2], _workbook(tmp_path / 'c.xlsx'))
+    manifest.record('2025.03', include[3], status=FAILED, error='Report still open')
+    manifest.record('2025.04', include[0], _workbook(tmp_path / 'd.xlsx'))
+
+    # a later run reads the manifest back from disk
+    left = resume_jobs(jobs, RunManifest(manifest_path(tmp_path)).verify)
+    assert len(left) == 1
+    assert left[0].period == '2025.03'
+    assert exported_entities(left[0]) == [include[1], include[3]]
+
+
+def test_a_changed_or_missing_file_is_not_done(tmp_path):
+    manifest = RunManifest(manifest_path(tmp_path))
+    a = manifest.record('2025.03', 'A', _workbook(tmp_path / 'a.xlsx'))['path']
+    b = manifest.record('2025.03', 'B', _workbook(tmp_path / 'b.xlsx'))['path']
+    c = manifest.record('2025.03', 'C', _workbook(tmp_path / 'c.xlsx'))['path']
+    _workbook(a, 'other rows')
+    with open(b, 'wb') as f:
+        f.write(b'not a zip')
+    (tmp_path / 'c.xlsx').unlink()
+    assert not any(manifest.verify('2025.03', e) for e in 'ABC')
+    assert not manifest.verify('2025.03', 'D')
+
+
+def test_saves_from_two_runs_keep_both_runs_entries(tmp_path):
+    path = manifest_path(tmp_path)
+    first, second = RunManifest(path), RunManifest(path)
+    first.record('2025.03', 'A', _workbook(tmp_path / 'a.xlsx'))
+    second.record('2025.03', 'B', _workbook(tmp_path / 'b.xlsx'))
+    first.record('2025.03', 'C', status=FAILED, error='x')
+    assert set(RunManifest(path).entries) == {('2025.03', 'A'), ('2025.03', 'B'), ('2025.03', 'C')}
+    assert not [p for p in tmp_path.iterdir() if p.suffix == '.tmp']
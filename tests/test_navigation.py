@@ -0,0 +1,86 @@
+from fake_uia import FakeControl
+from navigation import select_item, find_row, grid_cell, choose_combo_item, read_checklist, match_names, set_checked
+from navigation import enter_text
+from readiness import search_applied
+from sim_stravis import SimStravis
+
+
+def _rows(*names):
+    return FakeControl('ListControl', 'Report List', children=[FakeControl('DataItemControl', n) for n in names])
+
+
+def test_find_row_prefers_the_exact_name_and_select_item_selects_it():
+    rows = _rows('D342_HSO_HGMD (old)', 'D342_HSO_HGMD', 'D100_HSO_HGM')
+    row = find_row(rows, 'D342_HSO_HGMD')
+    assert row is rows.children[1]
+    assert find_row(rows, 'D100').Name == 'D100_HSO_HGM' and find_row(rows, 'X999') is None
+    assert select_item(row) and row.selected and row.focused
+
+
+def test_keys_mode_turns_the_patterns_off(monkeypatch):
+    rows = _rows('D342_HSO_HGMD')
+    monkeypatch.setenv('STRAVIS_NAV', 'keys')
+    assert find_row(rows, 'D342_HSO_HGMD') is None
+    assert not select_item(rows.children[0]) and not rows.children[0].selected
+
+
+def test_grid_cell():
+    grid = FakeControl('DataGridControl', 'Report', children=[
+        FakeControl('DataItemControl', f'row {r}', children=[FakeControl('TextControl', f'R{r}C{c}') for c in range(3)])
+        for r in range(2)])
+    assert grid_cell(grid, 1, 2).Name == 'R1C2'
+    assert grid_cell(grid, 2, 0) is None
+    assert grid_cell(FakeControl('ListControl'), 0, 0) is None
+
+
+def test_choose_combo_item_by_name_and_by_offset():
+    # the simulated layout combo lists its items only after a drop-down delay
+    combo = SimStravis(latency='fast').layout_combo
+    assert combo.value == 'Entity/Account'
+    assert choose_combo_item(combo, name='Period/Edition')
+    assert combo.value == 'Period/Edition' and not combo.expanded
+    assert choose_combo_item(combo, offset=2) and combo.value == 'Account/Period'
+    assert not choose_combo_item(combo, name='No such layout')
+    assert combo.value == 'Account/Period' and not combo.expanded
+
+
+def _organizations():
+    return FakeControl('ListControl', 'Organizations', children=[
+        FakeControl('ListItemControl', 'D342_HSO_HGMD', toggle_state=1),
+        FakeControl('ListItemControl', 'D100_HSO_HGM', toggle_state=1),
+        FakeControl('ListItemControl', 'D200_HSO_HGB', toggle_state=0),
+    ])
+
+
+def test_checks_are_read_in_one_request_and_only_the_wrong_ones_toggled():
+    orgs = _organizations()
+    before = orgs.stats['batched']
+    index = read_checklist(orgs, types=('ListItemControl',))
+    assert orgs.stats['batched'] == before + 1
+    assert read_checklist(orgs).keys() == index.keys()
+    assert {name: checked for name, (_, checked) in index.items()} == {
+        'D342_HSO_HGMD': True, 'D100_HSO_HGM': True, 'D200_HSO_HGB': False}
+    assert match_names(index, ['D100', 'D200_HSO_HGB', 'D', 'X1']) == {
+        'D100': 'D100_HSO_HGM', 'D200_HSO_HGB': 'D200_HSO_HGB', 'D': None, 'X1': None}
+    toggled = set_checked(index, lambda name: name != 'D100_HSO_HGM')
+    assert toggled == ['D100_HSO_HGM', 'D200_HSO_HGB']
+    assert [item.toggle_state for item in orgs.children] == [1, 0, 1]
+
+
+def test_items_without_a_check_state_are_not_a_checklist():
+    plain = FakeControl('ListControl', children=[FakeControl('ListItemControl', 'A', toggle_state=None)])
+    assert read_checklist(plain) is None
+
+
+def test_enter_text_sets_the_value_and_waits_for_the_filter():
+    sim = SimStravis(latency='fast')
+    sim.stravis.add(sim.base_input)
+    assert enter_text(sim.search_box, '2025.03', ready=search_applied(sim.periods, '2025.03'), timeout=2)
+    assert [p.Name for p in sim.periods.GetChildren()] == ['2025.03']
+    assert sim.period == '2025.03'
+
+
+def test_enter_text_fails_where_the_value_does_not_stick():
+    field = FakeControl('EditControl', 'Search', value='', on_value=lambda c, v: c.set(value=v.upper()))
+    assert not enter_text(field, 'd342', timeout=0.1)
+    assert field.value == 'D342'
@@ -0,0 +1,67 @@
+import queue
+import time
+
+import pytest
+
+from progress import coalesce, QueueSink, ProgressModel, format_seconds
+
+
+def _event(kind, t, **data):
+    return kind, dict(data, t=t)
+
+
+def test_coalesce_keeps_the_last_step_and_sums_the_retries():
+    events = [_event('step', 1, name='period', state='start'), _event('retry', 2, what='find Node1'),
+              _event('entity', 3, entity='D342'), _event('retry', 4, what='find Save', count=2),
+              _event('step', 5, name='display', state='end')]
+    assert coalesce(events) == [_event('entity', 3, entity='D342'), _event('retry', 4, what='find Save', count=3),
+                                _event('step', 5, name='display', state='end')]
+
+
+def test_queue_sink_sends_coalesced_batches_and_the_rest_on_close():
+    q = queue.Queue()
+    sink = QueueSink(q, interval=0.05)
+    sink(_event('run', 1, total=2, jobs=1))
+    assert q.get(timeout=2) == ('progress', [_event('run', 1, total=2, jobs=1)])
+    sink.interval = 60
+    time.sleep(0.1)
+    for t in range(50):
+        sink(_event('retry', t, what='wait'))
+    sink(_event('saved', 50, entity='D342'))
+    sink.close()
+    retries, saved = _event('retry', 49, what='wait', count=50), _event('saved', 50, entity='D342')
+    assert q.get_nowait() == ('progress', [retries, saved])
+    assert q.empty()
+
+
+def test_model_counts_entities_and_estimates_the_rest():
+    model = ProgressModel()
+    for event in [_event('run', 100, total=4), _event('entity', 100, entity='A'), _event('saved', 110, entity='A'),
+                  _event('entity', 110, entity='B'), _event('failed', 130, entity='B', error='x'),
+                  _event('entity', 130, entity='C')]:
+        model.update(event)
+    assert (model.done, model.failed, model.current) == (1, 1, 'C')
+    assert model.durations == [('A', 10.0, 'saved'), ('B', 20.0, 'failed')]
+    assert model.per_entity() == 15.0 and model.eta() == 30.0 and format_seconds(model.eta()) == '30s'
+    assert model.fraction() == 0.5
+    assert model.throughput(now=160) == pytest.approx(2.0)
+
+
+def test_start_latency_from_click_to_attach():
+    model = ProgressModel()
+    assert model.start_latency() is None
+    for event in [_event('dispatched', 1.5, clicked=1.0), _event('foreground', 2.5, waited=0.75),
+                  _event('attached', 3.0)]:
+        model.update(event)
+    assert model.start_latency() == (2.0, 0.75)
+    assert format_seconds(None) == '–'
+
+
+def test_per_entity_is_the_median_of_the_recent_iterations():
+    model = ProgressModel(recent=3)
+    model.durations = [('A', 100.0, 'saved'), ('B', 4.0, 'saved'), ('C', 2.0, 'saved')]
+    assert model.per_entity() == 4.0
+    model.durations.append(('D', 1.0, 'failed'))
+    assert model.per_entity() == 2.0
+    model.recent = 4
+    assert model.per_entity() == 3.0
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+import readiness
+from fake_uia import FakeControl, FakeDesktop, build_stravis
+from readiness import wait_ready, window_present, button_enabled, grid_ids, new_grid, grid_populated, search_applied
+from uia_events import events, FakeEventSource
+
+
+def test_wait_ready_returns_once_the_window_appears():
+    desktop = FakeDesktop()
+    desktop.add(FakeControl('WindowControl', 'Save As').show(after=0.2))
+    t0 = time.monotonic()
+    assert wait_ready(window_present(desktop, 'Save As'), timeout=5)
+    assert 0.15 < time.monotonic() - t0 < 1.5
+
+
+def test_wait_ready_times_out():
+    desktop = FakeDesktop()
+    with pytest.raises(RuntimeError, match="window 'Save As' present within 0.2s"):
+        wait_ready(window_present(desktop, 'Save As'), timeout=0.2)
+    assert wait_ready(window_present(desktop, 'Save As'), timeout=0.2, required=False) is False
+
+
+def test_wait_ready_wakes_on_a_notification_instead_of_its_poll_interval():
+    desktop = FakeDesktop()
+    win = FakeControl('WindowControl', 'Save As')
+    win.show(after=0.2)
+    desktop.add(win)
+    events.start(FakeEventSource(desktop))
+    t0 = time.monotonic()
+    # first poll at once, the next one only after 5 s unless the window-opened event wakes it
+    assert wait_ready(window_present(desktop, 'Save As'), timeout=10, initial=5, max_interval=5)
+    assert time.monotonic() - t0 < 2
+
+
+def test_button_enabled_follows_the_property():
+    desktop, stravis = build_stravis()
+    stravis.parts['save_btn'].set(enabled=False)
+    assert not button_enabled(stravis, 'Save As Excel')()
+    stravis.parts['save_btn'].set(enabled=True)
+    assert button_enabled(stravis, 'Save As Excel')()
+
+
+def test_grid_populated_ignores_grids_that_were_there_before():
+    desktop, stravis = build_stravis()
+    report = stravis.parts['report']
+    # the report list is itself a grid
+    report.add(FakeControl('DataGridControl', 'Reports', children=[FakeControl('DataItemControl', 'R1')]))
+    before = grid_ids(stravis)
+    check = grid_populated(stravis, before=before)
+    assert not check()
+    assert grid_populated(stravis)()  # unscoped, the list counts
+    grid = FakeControl('DataGridControl', 'Report')
+    report.add(grid)
+    assert not check()
+    grid.add(FakeControl('DataItemControl', 'Row 0'))
+    assert check()
+
+
+def test_grid_helpers_walk_the_tree_without_batched_queries(monkeypatch):
+    desktop, stravis = build_stravis()
+    report = stravis.parts['report']
+    report.add(FakeControl('TableControl', 'Reports', children=[FakeControl('DataItemControl', 'R1')]))
+    before = grid_ids(stravis)
+
+    def unavailable(root, control_type, properties=()):
+        raise RuntimeError('no IUIAutomation')
+    monkeypatch.setattr(readiness, 'find_all', unavailable)
+    assert grid_ids(stravis) == before and len(before) == 1
+    grid = report.add(FakeControl('DataGridControl', 'Report', children=[FakeControl('DataItemControl', 'Row 0')]))
+    assert new_grid(stravis) is grid
+    assert grid_populated(stravis, before=before)()
+
+
+def test_search_applied_needs_every_row_to_match():
+    root = FakeControl('ListControl', 'Organizations', children=[
+        FakeControl('ListItemControl', 'D342 HSO'), FakeControl('ListItemControl', 'D100 HQ')])
+    assert not search_applied(root, 'D342')()
+    root.remove(root.children[1])
+    assert search_applied(root, 'D342')()
+    assert not search_applied(FakeControl('ListControl'), '')()
@@ -0,0 +1,41 @@
+import pytest
+
+import script_core
+from batch import make_job
+from entities import ALL_ENTITIES
+from recording import load_recording, derive_latencies, recorded_job
+from sim_stravis import SimStravis
+from uia_events import STRUCTURE, WINDOW_OPENED
+
+
+def _span(id, name, start, dur, parent=None, **attrs):
+    return dict(id=id, name=name, start=start, dur=dur, parent=parent, **attrs)
+
+
+def test_latencies_end_at_the_event_that_ended_the_wait():
+    rec = {'spans': [
+        _span(1, 'display_report', 10.0, 2.0),
+        _span(2, 'wait_for_change', 10.1, 1.0, parent=1),
+        _span(3, 'click_save_as_excel', 20.0, 1.0),
+        _span(4, 'wait_ready', 20.0, 0.9, parent=3, what="window 'Save As' present"),
+        # a wait that timed out says nothing about how long STRAVIS takes
+        _span(5, 'wait_ready', 30.0, 5.0, parent=3, what="window 'Save As' present", timeouts=1),
+    ], 'events': [{'t': 10.4, 'event': STRUCTURE}, {'t': 10.6, 'event': STRUCTURE},
+                  {'t': 20.25, 'event': WINDOW_OPENED}]}
+    assert derive_latencies(rec) == {'display': [0.5], 'dialog': [0.25]}
+
+
+def test_a_recorded_simulated_session_replays_its_job(tmp_path, monkeypatch):
+    monkeypatch.setenv('STRAVIS_TIMING', 'off')
+    monkeypatch.setenv('STRAVIS_CACHE', 'off')
+    path = str(tmp_path / 'session.rec.jsonl.gz')
+    include = ALL_ENTITIES[:2]
+    SimStravis(latency='fast').install()
+    script_core.run_batch([make_job('2025.03', include)], str(tmp_path / 'out'), record=path)
+    rec = load_recording(path)
+    assert rec['session']['version'] == 1 and rec['events'] and rec['states']
+    period, to_deselect, iterations = recorded_job(rec)
+    assert (period, iterations) == ('2025.03', 2) and set(to_deselect) == set(ALL_ENTITIES) - set(include)
+    latencies = derive_latencies(rec)
+    assert len(latencies['dialog']) == 2 and len(latencies['write']) == 2
+    assert all(s == pytest.approx(0.2, abs=0.15) for s in latencies['dialog'])
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+import navigation
+import script_core
+from batch import make_job
+from entities import ALL_ENTITIES
+from export_cache import ExportCache
+from fake_uia import FakeControl
+from manifest import RunManifest, manifest_path, FAILED
+from script_core import ENTITY_ATTEMPTS, MAX_FAILED_IN_ROW
+from sim_stravis import SimStravis
+
+# every simulated reaction after a short delay, so a run takes seconds
+QUICK = dict.fromkeys(('open_base', 'display', 'dropdown', 'render', 'dialog', 'save', 'write', 'close', 'search'),
+                      0.02)
+ENTITIES = ALL_ENTITIES[:4]
+
+
+# ------------- export_entities: retries and giving up -------------
+
+@pytest.fixture
+def flaky(monkeypatch):
+    """run(out, entity=n): a simulated run of ENTITIES in which entity's first n exports fail before any click."""
+    monkeypatch.setenv('STRAVIS_TIMING', 'off')
+    monkeypatch.setenv('STRAVIS_CACHE', 'off')
+    export_entity = script_core.export_entity
+    failures = {}
+
+    def failing(stravis, desktop, watcher, index, period=None, entity=None, *args, **kwargs):
+        if failures.get(entity):
+            failures[entity] -= 1
+            raise RuntimeError('Save As dialog did not open')
+        return export_entity(stravis, desktop, watcher, index, period, entity, *args, **kwargs)
+    monkeypatch.setattr(script_core, 'export_entity', failing)
+
+    def run(out, **fail):
+        failures.update(fail)
+        sim = SimStravis(latency=QUICK).install()
+        return sim, script_core.run_batch([make_job('2025.03', ENTITIES)], str(out))
+    return run
+
+
+def _failed(out):
+    return [e for (_, e), entry in RunManifest(manifest_path(str(out))).entries.items() if entry['status'] == FAILED]
+
+
+def test_a_failed_entity_is_retried_and_exported(flaky, tmp_path):
+    sim, summary = flaky(tmp_path, **{ENTITIES[1]: ENTITY_ATTEMPTS - 1})
+    assert [e for _, e, _ in sim.exported] == ENTITIES
+    assert summary['failed'] == [] and len(summary['files']) == len(ENTITIES)
+
+
+def test_an_entity_failing_every_attempt_is_recorded_and_skipped(flaky, tmp_path):
+    sim, summary = flaky(tmp_path, **{ENTITIES[1]: ENTITY_ATTEMPTS})
+    assert [e for _, e, _ in sim.exported] == ENTITIES[:1] + ENTITIES[2:]
+    assert summary['failed'] == [('2025.03', ENTITIES[1], 'Save As dialog did not open')]
+    assert _failed(tmp_path) == ENTITIES[1:2]
+
+
+def test_the_run_stops_after_too_many_failures_in_a_row(flaky, tmp_path):
+    given_up = ENTITIES[:MAX_FAILED_IN_ROW]
+    with pytest.raises(RuntimeError, match=f'{MAX_FAILED_IN_ROW} entities in a row failed'):
+        flaky(tmp_path, **{e: ENTITY_ATTEMPTS for e in given_up})
+    assert _failed(tmp_path) == given_up
+    assert ('2025.03', ENTITIES[-1]) not in RunManifest(manifest_path(str(tmp_path))).entries
+
+
+# ------------- search fields -------------
+
+@pytest.fixture
+def sim():
+    sim = SimStravis(latency='fast').install()
+    script_core.locators.reset()
+    script_core._no_search_field.clear()
+    yield sim
+    script_core._no_search_field.clear()
+
+
+def test_search_field_in_a_top_level_flow_window(sim):
+    field = FakeControl('EditControl', 'Search', value='')
+    sim.desktop.add(FakeControl('WindowControl', 'Base List/Data Input', children=[field]))
+    sim.focus = field
+    assert script_core._search_field('period') is field
+
+
+def test_no_search_field_is_remembered(sim, monkeypatch):
+    calls = []
+    monkeypatch.setattr(sim.ui, 'GetFocusedControl', lambda: calls.append(1) or sim.stravis)
+    assert script_core._search_field('organization') is None
+    polls = len(calls)
+    start = time.monotonic()
+    assert script_core._search_field('organization') is None
+    assert time.monotonic() - start < 0.1 and len(calls) == polls
+
+
+# ------------- export cache -------------
+
+@pytest.mark.parametrize('by_name', [True, False])
+def test_only_exports_of_rows_picked_by_name_are_cached(by_name, tmp_path, monkeypatch):
+    monkeypatch.setenv('STRAVIS_TIMING', 'off')
+    if not by_name:
+        # report rows cannot be found by name: the keyboard cursor walks down the list
+        find_row = navigation.find_row
+        monkeypatch.setattr(navigation, 'find_row', lambda root, text, types=navigation.ROW_TYPES:
+                            None if types == ('DataItemControl',) else find_row(root, text, types))
+    folder = str(tmp_path / 'cache')
+    sim = SimStravis(latency=QUICK).install()
+    script_core.run_batch([make_job('2025.03', ENTITIES[:2])], str(tmp_path / 'out'), cache=folder)
+    assert [e for _, e, _ in sim.exported] == ENTITIES[:2]
+    assert sorted(e['entity'] for e in ExportCache(folder).entries.values()) == (ENTITIES[:2] if by_name else [])
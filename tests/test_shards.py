@@ -0,0 +1,94 @@
+import contextlib
+import time
+import zipfile
+
+import script_core
+from batch import make_job, exported_entities
+from entities import ALL_ENTITIES
+from manifest import FAILED as NOT_EXPORTED
+from shards import Coordinator, work, POOL, RUNNING, STOPPED, FAILED, LOST
+
+ENTITIES = ALL_ENTITIES[:8]
+
+
+def _coordinator(retries=1):
+    # four units of two entities; 'a' is dealt the first two, 'b' the last two
+    return Coordinator([make_job('2025.03', ENTITIES)], workers=('a', 'b'), chunk=2, retries=retries)
+
+
+def _exports(unit):
+    return [(e, f'{e}.xlsx', 100) for e in unit['entities']]
+
+
+def test_units_are_dealt_in_blocks_and_stolen_from_the_back():
+    c = _coordinator()
+    first = c.take('a')
+    assert first['entities'] == ENTITIES[:2] and c.workers['a']['state'] == RUNNING
+    c.done('a', first['id'], _exports(first))
+    c.done('a', c.take('a')['id'], [])
+    # 'a' ran dry: it takes b's last unit, b keeps the one at the front of its queue
+    stolen = c.take('a')
+    assert stolen['entities'] == ENTITIES[6:] and c.workers['a']['stolen'] == 1
+    assert c.take('b')['entities'] == ENTITIES[4:6]
+    c.done('a', stolen['id'], _exports(stolen))
+    assert c.take('a') is None and c.workers['a']['state'] == STOPPED
+    assert [r[1] for r in c.results] == ENTITIES[:2] + ENTITIES[6:]
+
+
+def test_failed_unit_goes_to_another_worker_minus_what_it_exported():
+    c = _coordinator()
+    unit = c.take('a')
+    c.failed('a', unit['id'], 'Report still open', _exports(unit)[:1])
+    retry = c.queues['b'][0]
+    assert retry['entities'] == ENTITIES[1:2] and retry['attempt'] == 1
+    assert c.take('b') is retry
+    # out of retries: given up on, not queued again
+    c.failed('b', retry['id'], 'Report still open')
+    assert c.failures == [('2025.03', ENTITIES[1], 'Report still open')]
+    assert all(ENTITIES[1] not in u['entities'] for q in c.queues.values() for u in q)
+    assert c.workers['b']['failures'] == 1
+
+
+def test_stop_requeues_the_unit_in_flight_and_hands_over_the_queue():
+    c = _coordinator()
+    unit = c.take('a')
+    c.stop('a', 'STRAVIS window closed')
+    assert c.workers['a']['state'] == FAILED and c.workers['a']['error'] == 'STRAVIS window closed'
+    assert not c.queues['a']
+    assert [u['entities'] for u in c.queues[POOL]] == [ENTITIES[2:4]]
+    assert c.queues['b'][0]['entities'] == unit['entities']
+    c.stop('b')
+    assert c.workers['b']['state'] == STOPPED
+    assert not c.finished()
+
+
+def test_a_silent_worker_is_reaped():
+    c = _coordinator()
+    unit = c.take('a')
+    c.take('b')
+    c.heartbeat('b')
+    c.workers['a']['seen'] = time.time() - 60
+    c.reap(timeout=30)
+    assert c.workers['a']['state'] == LOST and c.workers['b']['state'] == RUNNING
+    assert c.queues['b'][0]['entities'] == unit['entities']
+
+
+def test_a_worker_that_gave_up_on_one_entity_still_stops_cleanly(tmp_path, monkeypatch):
+    def run_job(stravis, base_input, job, steps, output_dir, name_template, manifest):
+        for entity in exported_entities(job):
+            if entity == ENTITIES[0]:
+                manifest.record(job.period, entity, status=NOT_EXPORTED, error='Report still open')
+                continue
+            path = tmp_path / f'{entity}.xlsx'
+            with zipfile.ZipFile(path, 'w') as z:
+                z.writestr('xl/workbook.xml', entity)
+            manifest.record(job.period, entity, str(path))
+        return base_input, None
+
+    monkeypatch.setattr(script_core, 'session', lambda *a, **kw: contextlib.nullcontext(object()))
+    monkeypatch.setattr(script_core, 'run_job', run_job)
+    c = Coordinator([make_job('2025.03', ENTITIES)], workers=('a',), chunk=2, retries=0)
+    work(c, 'a', output_dir=str(tmp_path))
+    assert c.failures == [('2025.03', ENTITIES[0], f'{ENTITIES[0]}: Report still open')]
+    assert len(c.results) == len(ENTITIES) - 1
+    assert c.workers['a']['state'] == STOPPED
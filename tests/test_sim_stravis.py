@@ -0,0 +1,19 @@
+import zipfile
+
+import script_core
+from entities import ALL_ENTITIES
+from sim_stravis import SimStravis
+
+
+def test_run_automation_exports_the_selected_entities_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.setenv('STRAVIS_TIMING', 'off')
+    monkeypatch.setenv('STRAVIS_CACHE', 'off')
+    include = ALL_ENTITIES[2:4]
+    sim = SimStravis(latency='fast', tree_size=200).install()
+    files = script_core.run_automation('2025.03', [e for e in ALL_ENTITIES if e not in include], iterations=2,
+                                       output_dir=str(tmp_path))
+    assert [(period, entity) for period, entity, _ in sim.exported] == [('2025.03', e) for e in include]
+    assert sorted(files) == sorted(path for _, _, path in sim.exported)
+    assert all(zipfile.is_zipfile(f) for f in files)
+    # the report is saved with the Period/Edition layout and the Edition cell moved on by one
+    assert sim.choices == [('Period/Edition', 'Option 1')] * 2
@@ -0,0 +1,38 @@
+from fake_uia import FakeControl, build_stravis
+from snapshots import safe_snapshot, fingerprint, fingerprint_changed
+
+
+def test_safe_snapshot_lists_the_visible_children():
+    desktop, stravis = build_stravis()
+    report = stravis.parts['report']
+    report.add(FakeControl('TextControl', 'Loading'))
+    report.add(FakeControl('TextControl', 'Later').show(after=60))
+    assert [(ctype, name) for _, ctype, name in safe_snapshot(report)] == [('TextControl', 'Loading')]
+
+
+def test_fingerprint_is_stable_until_the_tree_changes():
+    desktop, stravis = build_stravis()
+    shallow, baseline = fingerprint(stravis, depth=2), fingerprint(stravis, depth=3)
+    assert len(baseline) == 3
+    assert fingerprint(stravis, depth=3) == baseline
+    assert not fingerprint_changed(stravis, baseline, depth=3)
+    # third level: a pane next to Lower Ribbon / Operation
+    lower_ribbon = stravis.parts['close_btn'].parent.parent
+    lower_ribbon.add(FakeControl('PaneControl', 'Report'))
+    assert not fingerprint_changed(stravis, shallow, depth=2)
+    assert fingerprint_changed(stravis, baseline, depth=3)
+
+
+def test_a_level_that_differs_ends_the_walk():
+    desktop, stravis = build_stravis()
+    baseline = fingerprint(stravis, depth=3)
+    stravis.parts['report'].add(FakeControl('DataGridControl', 'Report'))
+    changed = fingerprint(stravis, depth=3, stop_at=baseline)
+    assert len(changed) == 2 and changed[0] == baseline[0] and changed[1] != baseline[1]
+
+
+def test_renamed_child_changes_the_fingerprint():
+    desktop, stravis = build_stravis()
+    baseline = fingerprint(stravis)
+    stravis.parts['report'].Name = 'Report Area (1)'
+    assert fingerprint_changed(stravis, baseline)
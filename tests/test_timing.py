@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from fake_uia import FakeControl, FakeDesktop
+from timing import TimingProfile, PAUSES
+from uia_events import events, FakeEventSource
+
+
+@pytest.fixture
+def profile(tmp_path):
+    return TimingProfile(explore_every=1000).open(str(tmp_path / 'timing.json'))
+
+
+def _learn(profile, name, seconds, n=10):
+    for _ in range(n):
+        profile.observe(name, seconds)
+
+
+def test_default_until_enough_samples(profile):
+    _learn(profile, 'search', 0.2, n=profile.min_samples - 1)
+    assert profile.interval('search') == PAUSES['search'][0]
+    profile.observe('search', 0.2)
+    assert profile.interval('search') == pytest.approx(0.2 * profile.margin)
+
+
+def test_interval_stays_between_floor_and_default(profile):
+    _learn(profile, 'key', 0.0)
+    assert profile.interval('key') == PAUSES['key'][1]
+    _learn(profile, 'search', 5.0)
+    assert profile.interval('search') == PAUSES['search'][0]
+
+
+def test_no_profile_means_fixed_defaults():
+    fixed = TimingProfile().open(None)
+    _learn(fixed, 'search', 0.2)
+    assert fixed.interval('search') == PAUSES['search'][0]
+
+
+def test_failure_backs_off_then_relaxes_to_twice_the_failed_interval(profile):
+    default = PAUSES['search'][0]
+    _learn(profile, 'search', 0.1)
+    failed_at = profile.interval('search')
+    assert failed_at == pytest.approx(0.15)
+    profile.recent.append('search')
+    profile.failed()
+    assert profile.interval('search') == pytest.approx(default)
+    intervals = []
+    for _ in range(5):
+        profile.succeeded()
+        intervals.append(profile.interval('search'))
+    assert intervals == sorted(intervals, reverse=True)
+    assert intervals[-1] == pytest.approx(2 * failed_at)
+
+
+def test_profile_is_kept_across_runs(profile):
+    _learn(profile, 'search', 0.2)
+    profile.succeeded()
+    again = TimingProfile().open(profile.path)
+    assert again.interval('search') == pytest.approx(profile.interval('search'))
+
+
+def _hub():
+    desktop = FakeDesktop()
+    events.start(FakeEventSource(desktop))
+    return desktop
+
+
+def test_pause_records_when_the_ui_last_reacted(profile):
+    desktop = _hub()
+    threading.Timer(0.03, lambda: desktop.add(FakeControl('TextControl', 'row'))).start()
+    profile.pause('clear')
+    samples = profile.entries['clear']['samples']
+    assert len(samples) == 1 and 0.02 < samples[0] < 0.15
+
+
+def test_pause_without_a_reaction_counts_as_needing_all_of_it(profile):
+    _hub()
+    profile.pause('key')
+    assert profile.entries['key']['samples'] == [PAUSES['key'][0]]
+
+
+def test_shortened_pause_is_not_recorded(profile):
+    _hub()
+    _learn(profile, 'key', 0.02)
+    assert profile.interval('key') < PAUSES['key'][0]
+    profile.pause('key')
+    assert len(profile.entries['key']['samples']) == 10
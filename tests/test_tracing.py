@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import tracing
+from tracing import traced, span, note, annotate
+
+
+@traced(args=('name', 'searchDepth'))
+def find(root, name=None, searchDepth=10, **kwargs):
+    note('retries')
+    time.sleep(0.02)
+    return root
+
+
+@traced()
+def step():
+    with span('wait', what='grid'):
+        annotate('polls', 3)
+        time.sleep(0.03)
+    find('stravis', name='Node1')
+    raise RuntimeError('Report still open')
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / 'run.trace.jsonl')
+    tracing.start(path)
+    yield path
+    tracing.stop()
+
+
+def test_spans_nest_and_carry_their_attributes(trace):
+    with pytest.raises(RuntimeError):
+        step()
+    tracing.stop()
+    wait, found, outer = tracing.load(trace)
+    assert outer['name'] == 'step' and outer['parent'] is None and outer['error'] == 'RuntimeError'
+    assert wait['parent'] == found['parent'] == outer['id']
+    assert (wait['what'], wait['polls']) == ('grid', 3)
+    # 'name' is one of the record's own fields; the argument gets a suffix
+    assert (found['name'], found['name_'], found['searchDepth'], found['retries']) == ('find', 'Node1', 10, 1)
+
+
+def test_self_time_excludes_the_children(trace):
+    with pytest.raises(RuntimeError):
+        step()
+    tracing.stop()
+    records = tracing.load(trace)
+    rows = {row['name']: row for row in tracing.summarize(records)}
+    assert rows['step']['self'] < rows['step']['total'] - 0.04
+    assert rows['find']['retries'] == 1 and rows['step']['errors'] == 1
+    assert set(tracing.folded(records)) == {'step', 'step;wait', 'step;find'}
+
+
+def test_without_a_trace_nothing_is_recorded():
+    assert not tracing.enabled()
+    assert find('stravis', name='Node1') == 'stravis'
+    with span('wait') as s:
+        s.set('polls', 1)
+    assert tracing.now() is None
@@ -0,0 +1,78 @@
+import pytest
+
+import tree_search
+from fake_uia import FakeControl
+from tree_search import find_first, find_all, python_bfs_find, NAME_PROPERTY, TOGGLE_STATE_PROPERTY
+
+
+def _tree():
+    """Report pane with a deep 'Total' (first in tree order) and a shallow one after it."""
+    deep = FakeControl('TextControl', 'Total', 'deep')
+    shallow = FakeControl('TextControl', 'Total', 'shallow')
+    return FakeControl('PaneControl', 'Report', children=[
+        FakeControl('PaneControl', 'Rows', children=[
+            FakeControl('DataItemControl', 'D342_HSO_HGMD', children=[deep]),
+            FakeControl('DataItemControl', 'D100_HSO_HGM'),
+        ]),
+        FakeControl('EditControl', 'File name:', value='D342.xlsx'),
+        shallow,
+        FakeControl('CheckBoxControl', 'Show books', toggle_state=1),
+    ])
+
+
+@pytest.fixture(params=['batched', 'walk'])
+def search(request, monkeypatch):
+    """Every criterion must give the same answer through UIA conditions and through the GetChildren walk."""
+    if request.param == 'walk':
+        def unavailable(element):
+            raise RuntimeError('no IUIAutomation')
+        monkeypatch.setattr(tree_search, '_backend', unavailable)
+    return find_first
+
+
+def test_criteria(search):
+    root = _tree()
+    assert search(root, 'DataItemControl').Name == 'D342_HSO_HGMD'
+    assert search(root, 'DataItemControl', name_contains='D100').Name == 'D100_HSO_HGM'
+    assert search(root, name_regex=r'^D\d+_HSO_HGM$').Name == 'D100_HSO_HGM'
+    assert search(root, value='D342.xlsx').Name == 'File name:'
+    assert search(root, name_or_value='D342.xlsx').Name == 'File name:'
+    assert search(root, 'ButtonControl') is None
+    # root itself never matches
+    assert search(root, 'PaneControl').Name == 'Rows'
+
+
+def test_shallowest_match_first(search):
+    root = _tree()
+    assert search(root, name='Total').AutomationId == 'shallow'
+    assert search(root, name_contains='Tot').AutomationId == 'shallow'
+    assert search(root, name='Total', max_depth=5).AutomationId == 'shallow'
+
+
+def test_depth_bound_and_pruned_subtrees(search):
+    root = _tree()
+    assert search(root, 'DataItemControl', max_depth=1) is None
+    assert search(root, 'DataItemControl', max_depth=2).Name == 'D342_HSO_HGMD'
+    assert search(root, 'DataItemControl', skip_types=('PaneControl',)) is None
+    assert search(root, name='Total', skip_types=('TextControl',)).AutomationId == 'shallow'
+
+
+def test_find_all_reads_extra_properties_in_one_request():
+    root = _tree()
+    before = dict(root.stats)
+    found = find_all(root, 'CheckBoxControl', (TOGGLE_STATE_PROPERTY,))
+    assert [(c.Name, p[NAME_PROPERTY], p[TOGGLE_STATE_PROPERTY]) for c, p in found] == [('Show books', 'Show books', 1)]
+    assert root.stats['batched'] - before.get('batched', 0) == 1
+
+
+def test_find_all_raises_without_batched_queries(monkeypatch):
+    monkeypatch.setattr(tree_search, '_backend', lambda element: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        find_all(_tree(), 'DataItemControl')
+
+
+def test_python_bfs_find_honours_depth():
+    root = _tree()
+    is_row = lambda node: node.ControlTypeName == 'DataItemControl'
+    assert python_bfs_find(root, is_row, max_depth=1) is None
+    assert python_bfs_find(root, is_row).Name == 'D342_HSO_HGMD'
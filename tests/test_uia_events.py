@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from fake_uia import FakeControl, FakeDesktop
+from uia_events import EventHub, FakeEventSource, PROPERTY, STRUCTURE, WINDOW_KINDS, WINDOW_OPENED
+
+
+def _hub():
+    desktop, hub = FakeDesktop(), EventHub()
+    hub.start(FakeEventSource(desktop))
+    return desktop, hub
+
+
+def test_sleep_wakes_on_a_matching_event():
+    desktop, hub = _hub()
+    threading.Timer(0.05, lambda: desktop.add(FakeControl('WindowControl', 'Save As'))).start()
+    start = time.monotonic()
+    assert hub.sleep(2.0, WINDOW_KINDS)
+    assert time.monotonic() - start < 1.0
+    assert hub.counts[WINDOW_OPENED] == 1
+
+
+def test_sleep_ignores_other_kinds_and_older_events():
+    desktop, hub = _hub()
+    pane = desktop.add(FakeControl('PaneControl', 'Report'))
+    seen = hub.mark()
+    pane.set(Name='Report (1)')
+    threading.Timer(0.02, lambda: pane.set(Name='Report (2)')).start()
+    # the rename before `seen` and the one after are both PROPERTY: neither ends a STRUCTURE sleep
+    assert not hub.sleep(0.2, (STRUCTURE,), since=seen)
+    assert hub.sleep(0.2, (PROPERTY,), since=seen)
+
+
+def test_without_a_source_sleep_is_a_plain_sleep():
+    hub = EventHub()
+    start = time.monotonic()
+    assert not hub.sleep(0.05)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_stop_detaches_from_the_source():
+    desktop, hub = _hub()
+    hub.stop()
+    assert not hub.running and desktop.listeners == []
+    desktop.add(FakeControl('WindowControl', 'Save As'))
+    assert not hub.counts
+
+
+def test_gates_run_around_each_sleep_and_may_abort_it():
+    hub, calls = EventHub(), []
+
+    def gate():
+        calls.append(len(calls))
+        if len(calls) == 3:
+            raise RuntimeError('Aborted')
+    hub.gates.append(gate)
+    assert not hub.sleep(0.01)
+    assert calls == [0, 1]
+    with pytest.raises(RuntimeError, match='Aborted'):
+        hub.sleep(0.01)
+
+
+def test_wake_ends_a_gated_sleep_early():
+    hub = EventHub()
+    hub.gates.append(lambda: None)
+    threading.Timer(0.05, hub.wake).start()
+    start = time.monotonic()
+    assert not hub.sleep(2.0)
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,40 @@
+import functools
+import time
+
+from bench import _sim_worker
+from entities import ALL_ENTITIES
+from progress import ProgressModel
+from worker_pool import WorkerPool
+
+
+def _wait(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_a_warm_worker_runs_the_job_and_stays_warm(tmp_path):
+    pool = WorkerPool(setup=functools.partial(_sim_worker, 'fast', 0.2)).start()
+    try:
+        _wait(pool.ready)
+        assert pool.warm_seconds() > 0
+        worker = pool.submit(dict(period='2025.03', to_deselect=ALL_ENTITIES[1:], iterations=1,
+                                  output_dir=str(tmp_path), clicked=time.time()))
+        model = ProgressModel()
+        while True:
+            kind, msg = worker.result_q.get(timeout=60)
+            if kind != 'progress':
+                break
+            for event in msg:
+                model.update(event)
+        assert (kind, model.done) == ('ok', 1)
+        total, waited = model.start_latency()
+        assert total >= waited >= 0.1
+        pool.release(worker)
+        assert pool.workers == [worker] and worker.alive()
+        # Stop: the worker is killed and a fresh one takes its place
+        pool.replace(worker)
+        assert not worker.alive() and len(pool.workers) == 1 and pool.workers[0] is not worker
+    finally:
+        pool.close()
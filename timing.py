@@ -0,0 +1,216 @@
+"""
+Adaptive pauses for the blind sleeps in the flow.
+
+The fixed intervals between keystrokes, before a search hit is picked, while
+Shift is held etc. were sized for the slowest machine. Each of them is now a
+named pause (PAUSES) whose length comes from a per-host timing profile:
+
+  * every pause watches the UI notifications (uia_events.events) while it
+    sleeps and records when the UI last reacted, i.e. how long the pause
+    actually needed to be. Only pauses that ran at the full default are
+    recorded: a shortened one cannot see reactions that come after it ends,
+    and one in which nothing reacted at all counts as needing all of it;
+  * the profile keeps the recent observations per pause and, once it has
+    enough, shortens the pause to p95 * margin (never below the pause's floor,
+    never above the old default);
+  * every `explore_every`-th pause runs at the full default, so reactions
+    slower than the learned interval still get observed;
+  * when a run fails, the pauses that ran just before the failure go back to
+    their defaults for the next run and then relax again over good runs, but
+    never below twice the interval they failed at.
+
+Without UI notifications nothing is observed and the defaults stay in force.
+The profile is a JSON file per host, rewritten after every run:
+
+    %LOCALAPPDATA%\\STRAVIS\\timing-<host>.json   (STRAVIS_TIMING=<file> to move it, =off for fixed defaults)
+
+    python timing.py [profile.json]      # what was learned
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import time
+
+from uia_events import events, ALL_KINDS, TREE_KINDS
+
+# name: (default seconds, floor seconds, notifications that show the UI reacting)
+PAUSES = {
+    'key':        (0.1, 0.01, ALL_KINDS),   # between navigation keystrokes (TAB, DOWN, RIGHT, ...)
+    'list_key':   (0.05, 0.01, ALL_KINDS),  # between keystrokes in the Organization list
+    'shift_hold': (0.15, 0.03, ALL_KINDS),  # Shift down before Shift+Down selection
+    'tab_focus':  (0.2, 0.02, ALL_KINDS),   # TAB onto the Period/Edition dropdown
+    'clear':      (0.2, 0.02, TREE_KINDS),  # after Ctrl+F / Ctrl+A in a search box
+    'search':     (1.0, 0.1, TREE_KINDS),   # typed search text -> list filtered
+    'node_open':  (1.0, 0.1, TREE_KINDS),   # Node1 double-click -> children expanded
+    'list_ready': (1.0, 0.1, TREE_KINDS),   # report list shown -> first row can be navigated
+}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def profile_path(path=None):
+    """
+    Profile file to use: `path`, else $STRAVIS_TIMING, else timing-<host>.json under
+    %LOCALAPPDATA%\\STRAVIS (~/.stravis elsewhere). None ('off') means fixed defaults.
+    """
+    path = path or os.environ.get('STRAVIS_TIMING')
+    if path:
+        return None if path.lower() == 'off' else path
+    base = os.environ.get('LOCALAPPDATA')
+    folder = os.path.join(base, 'STRAVIS') if base else os.path.join(os.path.expanduser('~'), '.stravis')
+    return os.path.join(folder, f'timing-{platform.node() or "local"}.json')
+
+
+class TimingProfile:
+    def __init__(self, margin=1.5, min_samples=5, keep=200, explore_every=20):
+        self.margin = margin
+        self.min_samples = min_samples
+        self.keep = keep
+        self.explore_every = explore_every
+        self.path = None
+        self.entries = {}
+        self.recent = collections.deque(maxlen=8)  # pauses run lately, backed off on failure
+        self._count = collections.Counter()
+
+    def open(self, path):
+        """Use (and from now on update) the profile at `path`; None means fixed defaults, nothing learned."""
+        self.path = path
+        self.entries = {}
+        self.recent.clear()
+        self._count.clear()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f).get('pauses', {})
+            except (OSError, ValueError) as e:
+                print(f"Timing profile {path} unreadable, starting over: {e}")
+        return self
+
+    def save(self):
+        if not self.path:
+            return
+        for e in self.entries.values():
+            e['p50'] = _percentile(e['samples'], 0.5)
+            e['p95'] = _percentile(e['samples'], 0.95)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'host': platform.node(), 'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'pauses': self.entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _entry(self, name):
+        return self.entries.setdefault(name, {'samples': [], 'backoff': 1.0, 'failures': 0, 'min': PAUSES[name][1]})
+
+    def interval(self, name):
+        """Current length of pause `name` in seconds."""
+        default, floor, _ = PAUSES[name]
+        e = self.entries.get(name) if self.path else None
+        if not e or len(e['samples']) < self.min_samples:
+            return default
+        learned = max(_percentile(e['samples'], 0.95) * self.margin, e.get('min', floor), floor)
+        return min(learned * e.get('backoff', 1.0), default)
+
+    def observe(self, name, seconds):
+        samples = self._entry(name)['samples']
+        samples.append(round(seconds, 4))
+        del samples[:-self.keep]
+
+    def pause(self, name):
+        """Sleep for pause `name`, recording when the UI last reacted during it."""
+        seconds = self.interval(name)
+        self.recent.append(name)
+        if not self.path or not events.running:
+            time.sleep(seconds)
+            return
+        self._count[name] += 1
+        if self._count[name] % self.explore_every == 0:
+            seconds = PAUSES[name][0]
+        default, _, kinds = PAUSES[name]
+        start = time.monotonic()
+        end = start + seconds
+        last = None
+        seen = events.mark()
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            if events.sleep(remaining, kinds, since=seen):
+                last = time.monotonic()
+                seen = events.mark()
+        if seconds < default:
+            return  # censored: a later reaction would have gone unseen
+        self.observe(name, (last - start) if last is not None else seconds)
+
+    def failed(self):
+        """A step failed: back off the pauses that ran just before it."""
+        for name in set(self.recent):
+            default, floor, _ = PAUSES[name]
+            current = self.interval(name)
+            e = self._entry(name)
+            e['failures'] += 1
+            e['min'] = min(max(e.get('min', floor), current * 2), default)
+            # full default next time; succeeded() halves the extra per good run
+            e['backoff'] = default / e['min']
+        self.recent.clear()
+        self.save()
+
+    def succeeded(self):
+        """A run finished: let earlier backoff relax and persist what was learned."""
+        for e in self.entries.values():
+            e['backoff'] = max(1.0, e.get('backoff', 1.0) / 2)
+        self.save()
+
+    def report(self):
+        rows = []
+        for name, (default, floor, _) in PAUSES.items():
+            e = self.entries.get(name, {})
+            samples = e.get('samples', [])
+            rows.append({'name': name, 'default': default, 'floor': floor, 'samples': len(samples),
+                         'p50': _percentile(samples, 0.5), 'p95': _percentile(samples, 0.95),
+                         'min': e.get('min', floor), 'backoff': e.get('backoff', 1.0), 'failures': e.get('failures', 0),
+                         'interval': self.interval(name)})
+        return rows
+
+
+profile = TimingProfile()
+
+
+def pause(name):
+    profile.pause(name)
+
+
+def interval(name):
+    return profile.interval(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the learned STRAVIS timing profile.')
+    parser.add_argument('profile', nargs='?', help='profile file (default: this host\'s)')
+    args = parser.parse_args(argv)
+
+    path = profile_path(args.profile)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"No timing profile at {path}")
+    p = TimingProfile().open(path)
+    print(path)
+    print(f"{'pause':<12}{'default':>9}{'floor':>7}{'n':>5}{'p50':>8}{'p95':>8}{'min':>7}{'backoff':>9}{'fails':>7}{'now':>8}")
+    for row in p.report():
+        p50 = f"{row['p50']:.3f}" if row['p50'] is not None else '-'
+        p95 = f"{row['p95']:.3f}" if row['p95'] is not None else '-'
+        print(f"{row['name']:<12}{row['default']:>9.2f}{row['floor']:>7.2f}{row['samples']:>5}{p50:>8}{p95:>8}"
+              f"{row['min']:>7.2f}{row['backoff']:>9.2f}{row['failures']:>7}{row['interval']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Span tracing for the automation flow.
+
+Steps and helpers are wrapped with @traced (or `with span(...)`); while a trace
+is running every span is written as one JSON line when it ends:
+
+  {"id": 7, "parent": 3, "name": "find_control", "start": 12.304, "dur": 0.811,
+   "Name": "Node1", "searchDepth": 10, "retries": 1}
+
+Helpers add counters to the innermost span with note('retries') /
+note('timeouts') and values with annotate(key, value). With no trace running
+the wrappers cost one global lookup and call straight through.
+
+    tracing.start('run.trace.jsonl')   # run_batch does this when STRAVIS_TRACE is set
+    ...
+    tracing.stop()
+
+    python tracing.py run.trace.jsonl [--top 15] [--folded run.folded]
+
+The report lists the slowest steps (total / self time, calls, retries, timeouts)
+and writes the call stacks in folded form (flamegraph.pl / speedscope input).
+"""
+import argparse
+import collections
+import functools
+import inspect
+import itertools
+import json
+import threading
+import time
+
+_trace = None
+
+# callables receiving every finished span record (e.g. recording.SessionRecorder)
+listeners = []
+
+
+class _Trace:
+    def __init__(self, path=None):
+        self.path = path
+        self.f = open(path, 'w', encoding='utf-8') if path else None
+        self.t0 = time.perf_counter()
+        self.ids = itertools.count(1)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def write(self, record):
+        if self.f is not None:
+            line = json.dumps(record, default=str)
+            with self.lock:
+                # flushed per span so a crashed run still leaves its trace
+                self.f.write(line + '\n')
+                self.f.flush()
+        for fn in list(listeners):
+            fn(record)
+
+
+class Span:
+    __slots__ = ('id', 'parent', 'name', 'start', 'attrs')
+
+    def __init__(self, name, attrs, parent):
+        self.id = next(_trace.ids)
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def incr(self, key, n=1):
+        self.attrs[key] = self.attrs.get(key, 0) + n
+
+
+class _NullSpan:
+    def set(self, key, value):
+        pass
+
+    def incr(self, key, n=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+_RESERVED = ('id', 'parent', 'name', 'start', 'dur', 'error')
+
+
+class _SpanContext:
+    __slots__ = ('trace', 'span')
+
+    def __init__(self, trace, name, attrs):
+        stack = trace.stack()
+        self.trace = trace
+        self.span = Span(name, attrs, stack[-1].id if stack else None)
+        stack.append(self.span)
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        s = self.span
+        end = time.perf_counter()
+        stack = self.trace.stack()
+        if stack and stack[-1] is s:
+            stack.pop()
+        record = {'id': s.id, 'parent': s.parent, 'name': s.name,
+                  'start': round(s.start - self.trace.t0, 6), 'dur': round(end - s.start, 6)}
+        for k, v in s.attrs.items():
+            # an argument called e.g. 'name' must not overwrite the span's own fields
+            record[f'{k}_' if k in _RESERVED else k] = v
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        self.trace.write(record)
+        return False
+
+
+def start(path=None):
+    """Start tracing, writing spans to `path` (JSONL) if given; replaces any running trace."""
+    global _trace
+    stop()
+    _trace = _Trace(path)
+
+
+def stop():
+    global _trace
+    if _trace is not None:
+        trace, _trace = _trace, None
+        if trace.f is not None:
+            trace.f.close()
+
+
+def enabled():
+    return _trace is not None
+
+
+def now():
+    """Seconds since the running trace started (the time base of span 'start'), or None."""
+    return time.perf_counter() - _trace.t0 if _trace is not None else None
+
+
+def span(name, **attrs):
+    """Context manager timing a block; yields an object with set()/incr() for attributes."""
+    if _trace is None:
+        return _NULL
+    return _SpanContext(_trace, name, attrs)
+
+
+def note(key, n=1):
+    """Add n to counter `key` of the innermost open span (no-op when not tracing)."""
+    if _trace is None:
+        return
+    stack = _trace.stack()
+    if stack:
+        stack[-1].incr(key, n)
+
+
+def annotate(key, value):
+    """Set attribute `key` on the innermost open span (no-op when not tracing)."""
+    if _trace is None:
+        return
+    stack = _trace.stack()
+    if stack:
+        stack[-1].set(key, value)
+
+
+def traced(name=None, args=()):
+    """
+    Decorator: run the function in a span named `name` (default: function name), with the
+    listed arguments (by parameter name, defaults included, **kwargs looked into) recorded
+    as attributes.
+    """
+    def deco(fn):
+        label = name or fn.__name__
+        sig = inspect.signature(fn) if args else None
+        var_kw = next((p.name for p in sig.parameters.values() if p.kind is p.VAR_KEYWORD), None) if sig else None
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _trace is None:
+                return fn(*a, **kw)
+            attrs = {}
+            if sig is not None:
+                try:
+                    bound = sig.bind(*a, **kw)
+                    bound.apply_defaults()
+                    values = dict(bound.arguments)
+                    if var_kw:
+                        values.update(values.pop(var_kw))
+                    attrs = {k: values[k] for k in args if values.get(k) is not None}
+                except TypeError:
+                    pass
+            with _SpanContext(_trace, label, attrs):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+# ------------- report -------------
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def self_times(records):
+    """{span id: duration minus the time spent in child spans}"""
+    child = collections.Counter()
+    for r in records:
+        if r['parent'] is not None:
+            child[r['parent']] += r['dur']
+    return {r['id']: max(r['dur'] - child[r['id']], 0.0) for r in records}
+
+
+def summarize(records):
+    """Per span name: calls, total, self, max seconds, retries and timeouts; slowest first."""
+    selfs = self_times(records)
+    rows = {}
+    for r in records:
+        row = rows.setdefault(r['name'], {'name': r['name'], 'calls': 0, 'total': 0.0, 'self': 0.0,
+                                          'max': 0.0, 'retries': 0, 'timeouts': 0, 'errors': 0})
+        row['calls'] += 1
+        row['total'] += r['dur']
+        row['self'] += selfs[r['id']]
+        row['max'] = max(row['max'], r['dur'])
+        row['retries'] += r.get('retries', 0)
+        row['timeouts'] += r.get('timeouts', 0)
+        row['errors'] += 'error' in r
+    return sorted(rows.values(), key=lambda row: row['total'], reverse=True)
+
+
+def folded(records):
+    """Folded stacks ('run_batch;export_entities;entity;save_as_direct' -> self ms)."""
+    by_id = {r['id']: r for r in records}
+    selfs = self_times(records)
+    out = collections.Counter()
+    for r in records:
+        names, node = [], r
+        while node is not None:
+            names.append(node['name'])
+            node = by_id.get(node['parent'])
+        out[';'.join(reversed(names))] += selfs[r['id']] * 1000
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a STRAVIS automation trace.')
+    parser.add_argument('trace', help='JSONL trace written with STRAVIS_TRACE / batch.py --trace')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--folded', help='write folded stacks here (flamegraph.pl / speedscope)')
+    args = parser.parse_args(argv)
+
+    records = load(args.trace)
+    wall = max((r['start'] + r['dur'] for r in records), default=0.0)
+    print(f"{len(records)} spans, {wall:.1f}s traced")
+    print(f"{'step':<28}{'calls':>6}{'total s':>9}{'self s':>9}{'max s':>8}{'retries':>9}{'timeouts':>10}")
+    for row in summarize(records)[:args.top]:
+        print(f"{row['name']:<28}{row['calls']:>6}{row['total']:>9.2f}{row['self']:>9.2f}{row['max']:>8.2f}"
+              f"{row['retries']:>9}{row['timeouts']:>10}")
+
+    stacks = folded(records)
+    print("\nwhere the time goes (self time by call stack):")
+    for stack, ms in stacks.most_common(args.top):
+        print(f"{ms / 1000:>9.2f}s  {stack}")
+    if args.folded:
+        with open(args.folded, 'w', encoding='utf-8') as f:
+            for stack, ms in stacks.items():
+                f.write(f"{stack} {int(round(ms))}\n")
+        print(f"\nfolded stacks written to {args.folded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Find a control by pushing the match condition into UI Automation instead of
+walking GetChildren() from Python.
+
+find_first builds a UIA condition from the criteria (control type, exact name,
+name substring, value) and asks for the matches with the properties it still has
+to check (ControlType, Name, Value) cached in the same request:
+
+  - no depth bound / pruning: one FindAllBuildCache over the descendants; a name
+    regex is applied to the cached names. UIA returns matches in tree (depth-first)
+    order, so when several match the subtree is cached and walked as below to keep
+    the shallowest one, as the breadth-first walk did
+  - max_depth or skip_types: one BuildUpdatedCache of the subtree, then a local
+    breadth-first walk over the cached tree (shallowest match first)
+
+find_all returns every match of a control type with extra properties (e.g.
+Toggle.ToggleState) cached in the same request, for reading a whole list at once.
+
+python_bfs_find is the per-node GetChildren walk the flow used before; it stays
+as the fallback when the batched query is not available.
+"""
+import collections
+import functools
+import re
+
+CONTROL_TYPE_PROPERTY = 30003
+NAME_PROPERTY = 30005
+VALUE_PROPERTY = 30045
+TOGGLE_STATE_PROPERTY = 30086
+
+TREE_SCOPE_DESCENDANTS = 4
+TREE_SCOPE_SUBTREE = 7
+PROPERTY_CONDITION_MATCH_SUBSTRING = 2
+
+
+def _backend(element):
+    """(IUIAutomation, control-type-name -> id, cached element -> control) for a real or fake element."""
+    fake = getattr(element, 'automation', None)
+    if fake is not None:
+        return fake, (lambda name: name), (lambda el: el.ctrl)
+    import uiautomation as ui
+    return (ui._AutomationClient.instance().IUIAutomation,
+            lambda name: getattr(ui.ControlType, name),
+            ui.Control.CreateControlFromElement)
+
+
+def _cached(el, property_id):
+    try:
+        v = el.GetCachedPropertyValue(property_id)
+    except Exception:
+        return None
+    # properties an element does not support come back as a sentinel object
+    return v if isinstance(v, (str, int)) else None
+
+
+def find_first(root, control_type=None, name=None, name_contains=None, name_regex=None,
+               value=None, name_or_value=None, max_depth=None, skip_types=()):
+    """
+    First control below root matching every given criterion, or None.
+
+    control_type   - e.g. 'DataItemControl'
+    name / value   - exact Name / Value.Value
+    name_or_value  - Name or Value.Value equals this (Save As side panel items)
+    name_contains  - substring of Name, evaluated by UIA where supported
+    name_regex     - regex (str or compiled) that Name must match; checked on cached names
+    max_depth      - levels below root to consider (None = unbounded)
+    skip_types     - control types whose subtrees are not searched
+    """
+    try:
+        return _find_batched(root, control_type, name, name_contains, name_regex,
+                             value, name_or_value, max_depth, skip_types)
+    except Exception:
+        pass
+    # no batched queries available (e.g. COM error): fall back to walking the tree from Python
+    regex = re.compile(name_regex) if isinstance(name_regex, str) else name_regex
+    need_value = value is not None or name_or_value is not None
+
+    def match(node):
+        if node is root:
+            return False
+        return _matches(getattr(node, 'ControlTypeName', None), node.Name, _live_value(node) if need_value else None,
+                        control_type, name, name_contains, regex, value, name_or_value)
+    return python_bfs_find(root, match, max_depth=max_depth, skip_types=skip_types)
+
+
+def _live_value(node):
+    try:
+        return node.GetValuePattern().Value
+    except Exception:
+        return None
+
+
+def _matches(ctype, cname, cvalue, control_type, name, name_contains, regex, value, name_or_value):
+    if control_type is not None and ctype != control_type:
+        return False
+    if name is not None and cname != name:
+        return False
+    if name_contains is not None and name_contains not in (cname or ''):
+        return False
+    if regex is not None and not regex.search(cname or ''):
+        return False
+    if value is not None and cvalue != value:
+        return False
+    if name_or_value is not None and name_or_value not in (cname, cvalue):
+        return False
+    return True
+
+
+def _find_batched(root, control_type, name, name_contains, name_regex, value, name_or_value, max_depth, skip_types):
+    element = root.Element
+    iua, type_id, wrap = _backend(element)
+    regex = re.compile(name_regex) if isinstance(name_regex, str) else name_regex
+
+    req = iua.CreateCacheRequest()
+    for pid in (CONTROL_TYPE_PROPERTY, NAME_PROPERTY, VALUE_PROPERTY):
+        req.AddProperty(pid)
+
+    def walk_cached():
+        # one round trip for the whole subtree, then depth / pruning are applied locally
+        req.TreeScope = TREE_SCOPE_SUBTREE
+        req.TreeFilter = iua.CreateTrueCondition()
+        cached_root = element.BuildUpdatedCache(req)
+        wanted_type = type_id(control_type) if control_type is not None else None
+        skip = {type_id(t) for t in skip_types}
+        queue = collections.deque([(cached_root, 0)])
+        while queue:
+            el, depth = queue.popleft()
+            ctype = _cached(el, CONTROL_TYPE_PROPERTY)
+            if depth and _matches(ctype, _cached(el, NAME_PROPERTY), _cached(el, VALUE_PROPERTY),
+                                  wanted_type, name, name_contains, regex, value, name_or_value):
+                return wrap(el)
+            if (max_depth is not None and depth >= max_depth) or (depth and ctype in skip):
+                continue
+            children = el.GetCachedChildren()
+            for i in range(children.Length if children else 0):
+                queue.append((children.GetElement(i), depth + 1))
+        return None
+
+    if max_depth is not None or skip_types:
+        return walk_cached()
+
+    conds = []
+    if control_type is not None:
+        conds.append(iua.CreatePropertyCondition(CONTROL_TYPE_PROPERTY, type_id(control_type)))
+    if name is not None:
+        conds.append(iua.CreatePropertyCondition(NAME_PROPERTY, name))
+    if value is not None:
+        conds.append(iua.CreatePropertyCondition(VALUE_PROPERTY, value))
+    if name_or_value is not None:
+        conds.append(iua.CreateOrCondition(iua.CreatePropertyCondition(NAME_PROPERTY, name_or_value),
+                                           iua.CreatePropertyCondition(VALUE_PROPERTY, name_or_value)))
+    if name_contains is not None:
+        try:
+            conds.append(iua.CreatePropertyConditionEx(NAME_PROPERTY, name_contains, PROPERTY_CONDITION_MATCH_SUBSTRING))
+        except Exception:
+            # substring matching needs Windows 10 1809+; the regex / local check still applies
+            regex = regex or re.compile(re.escape(name_contains))
+    cond = functools.reduce(iua.CreateAndCondition, conds) if conds else iua.CreateTrueCondition()
+
+    arr = element.FindAllBuildCache(TREE_SCOPE_DESCENDANTS, cond, req)
+    found = [arr.GetElement(i) for i in range(arr.Length if arr else 0)]
+    if regex is not None:
+        found = [el for el in found if regex.search(_cached(el, NAME_PROPERTY) or '')]
+    if len(found) > 1:
+        # the first in tree order may sit deeper than a later one
+        return walk_cached()
+    return wrap(found[0]) if found else None
+
+
+def find_all(root, control_type, properties=()):
+    """
+    [(control, {property id: cached value})] for every control_type below root, in tree
+    order, with Name and `properties` fetched in one batched request. Values the element
+    does not support come back as None. Raises if batched queries are unavailable.
+    """
+    element = root.Element
+    iua, type_id, wrap = _backend(element)
+    req = iua.CreateCacheRequest()
+    wanted = (NAME_PROPERTY,) + tuple(properties)
+    for pid in wanted:
+        req.AddProperty(pid)
+    cond = iua.CreatePropertyCondition(CONTROL_TYPE_PROPERTY, type_id(control_type))
+    arr = element.FindAllBuildCache(TREE_SCOPE_DESCENDANTS, cond, req)
+    found = []
+    for i in range(arr.Length if arr else 0):
+        el = arr.GetElement(i)
+        found.append((wrap(el), {pid: _cached(el, pid) for pid in wanted}))
+    return found
+
+
+def python_bfs_find(root, match, max_depth=None, skip_types=()):
+    """Breadth-first walk with GetChildren(); several cross-process calls per node."""
+    queue = collections.deque([(root, 0)])
+    while queue:
+        node, depth = queue.popleft()
+        try:
+            if match(node):
+                return node
+        except Exception:
+            pass
+        if max_depth is not None and depth >= max_depth:
+            continue
+        if depth and skip_types and getattr(node, 'ControlTypeName', None) in skip_types:
+            continue
+        try:
+            queue.extend((c, depth + 1) for c in node.GetChildren())
+        except Exception:
+            pass
+    return None
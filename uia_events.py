@@ -0,0 +1,215 @@
+"""
+Event-driven waking for the polling helpers.
+
+An EventHub receives UI notifications (window opened/closed, structure changed,
+focus changed, property changed) from an event source running on a background
+thread. Waiters call events.sleep(...) instead of time.sleep(...): it returns as
+soon as a relevant notification arrives, and otherwise after the normal poll
+interval, so polling stays the fallback. With no source started, events.sleep is
+exactly time.sleep.
+
+Gates are checks the sleeping thread runs before and after each sleep; one may
+raise (abort the waiting step) or block (hold it). wake() ends every sleep at
+once so they run now rather than at the end of the poll interval; that is how
+dialog_watchdog.py stops a run's waits when an unexpected dialog appears.
+
+Sources:
+  UIAEventSource  - real UIA subscriptions on an MTA COM thread (Windows)
+  FakeEventSource - notifications from a fake_uia tree, for measuring on any OS
+"""
+import collections
+import threading
+import time
+
+WINDOW_OPENED = 'window_opened'
+WINDOW_CLOSED = 'window_closed'
+STRUCTURE = 'structure'
+FOCUS = 'focus'
+PROPERTY = 'property'
+
+ALL_KINDS = (WINDOW_OPENED, WINDOW_CLOSED, STRUCTURE, FOCUS, PROPERTY)
+WINDOW_KINDS = (WINDOW_OPENED, WINDOW_CLOSED)
+TREE_KINDS = (WINDOW_OPENED, WINDOW_CLOSED, STRUCTURE, PROPERTY)
+
+
+class EventHub:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._last = {}
+        self.counts = collections.Counter()
+        self.source = None
+        # callables receiving every notification kind (e.g. recording.SessionRecorder)
+        self.taps = []
+        # callables run by every sleeping thread before and after it sleeps (e.g. dialog_watchdog.DialogWatchdog)
+        self.gates = []
+        self._woken = 0
+
+    @property
+    def running(self):
+        return self.source is not None
+
+    def start(self, source):
+        self.stop()
+        source.start(self)
+        self.source = source
+
+    def stop(self):
+        if self.source is not None:
+            try:
+                self.source.stop()
+            finally:
+                self.source = None
+
+    def notify(self, kind):
+        with self._cond:
+            self._seq += 1
+            self._last[kind] = self._seq
+            self.counts[kind] += 1
+            self._cond.notify_all()
+        for tap in list(self.taps):
+            tap(kind)
+
+    def wake(self):
+        """End every current sleep (not a UI notification: taps and counts do not see it)."""
+        with self._cond:
+            self._woken += 1
+            self._cond.notify_all()
+
+    def _pass_gates(self):
+        for gate in list(self.gates):
+            gate()
+
+    def mark(self):
+        """Sequence number to pass as `since`, taken before checking the UI."""
+        return self._seq
+
+    def sleep(self, timeout, kinds=ALL_KINDS, since=None):
+        """
+        Sleep up to timeout, waking early on any notification of `kinds` newer than `since`.
+        Returns True if woken by an event (not by wake()).
+        """
+        woken_at = self._woken
+        self._pass_gates()
+        if not self.running and not self.gates:
+            time.sleep(timeout)
+            return False
+        if since is None:
+            since = self._seq
+        if not self.running:
+            kinds = ()
+        notified = lambda: any(self._last.get(k, 0) > since for k in kinds)
+        with self._cond:
+            self._cond.wait_for(lambda: self._woken > woken_at or notified(), timeout)
+            woken = notified()
+        self._pass_gates()
+        return woken
+
+
+events = EventHub()
+
+
+# ------------- sources -------------
+
+class UIAEventSource:
+    """
+    Subscribes to UIA notifications on its own MTA thread: window opened/closed on the
+    desktop, and structure/property changes under the window given by hwnd (the whole
+    desktop if None), plus focus changes.
+    """
+    UIA_CLSID = '{ff48dba4-60ef-4201-aa87-54103eef594e}'
+    WINDOW_OPENED_EVENT = 20016
+    WINDOW_CLOSED_EVENT = 20017
+    TREE_SCOPE_SUBTREE = 7
+    # Name, IsEnabled, SelectionItem.IsSelected, Value.Value, Toggle.ToggleState
+    PROPERTIES = (30005, 30010, 30079, 30045, 30086)
+
+    def __init__(self, hwnd=None):
+        self.hwnd = hwnd
+        self._thread = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._error = None
+
+    def start(self, hub):
+        self._hub = hub
+        self._thread = threading.Thread(target=self._run, name='uia-events', daemon=True)
+        self._thread.start()
+        if not self._ready.wait(10):
+            # a subscription that comes through later unsubscribes again at once; the hub stays on polling
+            self._stop.set()
+            raise RuntimeError('UIA event subscription did not complete within 10s')
+        if self._error is not None:
+            raise RuntimeError(f"UIA event subscription failed: {self._error}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        import comtypes
+        import comtypes.client
+        comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        iua = None
+        try:
+            core = comtypes.client.GetModule('UIAutomationCore.dll')
+            iua = comtypes.client.CreateObject(self.UIA_CLSID, interface=core.IUIAutomation)
+            hub = self._hub
+            opened = self.WINDOW_OPENED_EVENT
+
+            class _Handler(comtypes.COMObject):
+                _com_interfaces_ = [
+                    core.IUIAutomationEventHandler,
+                    core.IUIAutomationStructureChangedEventHandler,
+                    core.IUIAutomationFocusChangedEventHandler,
+                    core.IUIAutomationPropertyChangedEventHandler,
+                ]
+
+                def HandleAutomationEvent(self, sender, eventId):
+                    hub.notify(WINDOW_OPENED if eventId == opened else WINDOW_CLOSED)
+
+                def HandleStructureChangedEvent(self, sender, changeType, runtimeId):
+                    hub.notify(STRUCTURE)
+
+                def HandleFocusChangedEvent(self, sender):
+                    hub.notify(FOCUS)
+
+                def HandlePropertyChangedEvent(self, sender, propertyId, newValue):
+                    hub.notify(PROPERTY)
+
+            handler = _Handler()
+            root = iua.GetRootElement()
+            scoped = iua.ElementFromHandle(self.hwnd) if self.hwnd else root
+            for event_id in (self.WINDOW_OPENED_EVENT, self.WINDOW_CLOSED_EVENT):
+                iua.AddAutomationEventHandler(event_id, root, self.TREE_SCOPE_SUBTREE, None, handler)
+            iua.AddStructureChangedEventHandler(scoped, self.TREE_SCOPE_SUBTREE, None, handler)
+            iua.AddFocusChangedEventHandler(None, handler)
+            iua.AddPropertyChangedEventHandler(scoped, self.TREE_SCOPE_SUBTREE, None, handler, list(self.PROPERTIES))
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            comtypes.CoUninitialize()
+            return
+
+        self._ready.set()
+        self._stop.wait()
+        try:
+            iua.RemoveAllEventHandlers()
+        except Exception:
+            pass
+        comtypes.CoUninitialize()
+
+
+class FakeEventSource:
+    """Forwards the notifications a fake_uia tree raises when it is mutated."""
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def start(self, hub):
+        self._listener = lambda kind, node: hub.notify(kind)
+        self.desktop.listeners.append(self._listener)
+
+    def stop(self):
+        self.desktop.listeners.remove(self._listener)
@@ -0,0 +1,153 @@
+"""
+Warm worker processes for the GUI.
+
+Clicking Run used to spawn a process that (in the frozen build) imported
+script_core, pyautogui and uiautomation, initialized COM and then slept 3 s
+hoping STRAVIS had been brought to the front. Now the GUI starts a worker when
+it opens; by the time Run is clicked its imports, COM and the UI Automation
+client are ready and it is blocked on its job queue:
+
+    pool = WorkerPool().start()                      # when the window opens
+    worker = pool.submit(dict(period='2025.03', to_deselect=[...], iterations=11,
+                              output_dir=..., resume=False, clicked=time.time()))
+    worker.result_q                                  # ('progress', [events]) batches, then ('ok' | 'err', message)
+    pool.release(worker)                             # finished: idle again, warm for the next Run
+    pool.replace(worker)                             # Stop: kill it and start a fresh one
+
+A job starts as soon as a STRAVIS window is the foreground window
+(script_core.wait_foreground) and drives exactly that window. Its progress
+events 'dispatched', 'foreground' and 'attached' carry the start-up timing:
+Run clicked -> worker took the job -> STRAVIS in front -> attached and focused
+(ProgressModel.start_latency).
+"""
+import multiprocessing as mp
+import time
+
+# how long a job waits for the user to bring STRAVIS to the front
+FOCUS_TIMEOUT = 60.0
+
+
+def _serve(jobs_q, result_q, ready, warm_s, setup):
+    """Worker process: get everything a run needs loaded, then run jobs until None arrives."""
+    start = time.perf_counter()
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except Exception:
+        pass  # pywin32 missing (e.g. Linux with setup installing a simulation)
+    import script_core
+    if setup is not None:
+        # e.g. bench.py putting a simulated STRAVIS behind script_core
+        setup()
+    try:
+        script_core.ui.GetRootControl()  # creates the UI Automation client
+    except Exception:
+        pass
+    warm_s.value = time.perf_counter() - start
+    ready.set()
+    while True:
+        job = jobs_q.get()
+        if job is None:
+            return
+        result_q.put(_run(script_core, job, result_q))
+
+
+def _run(script_core, job, result_q):
+    import progress
+
+    sink = progress.QueueSink(result_q)
+    progress.listeners.append(sink)
+    try:
+        progress.emit('dispatched', clicked=job.get('clicked'))
+        stravis = script_core.wait_foreground(timeout=job.get('focus_timeout', FOCUS_TIMEOUT))
+        # Hardcode Shift+Down rows to 20 (same as before)
+        script_core.run_automation(job['period'], job['to_deselect'], select_n=20, iterations=job['iterations'],
+                                   output_dir=job.get('output_dir'), resume=job.get('resume', False),
+                                   window=stravis.NativeWindowHandle)
+        return "ok", "Automation finished without raising errors."
+    except Exception as e:
+        return "err", f"Automation failed: {e}"
+    finally:
+        progress.listeners.remove(sink)
+        # the last progress batch goes on the queue before the result
+        sink.close()
+
+
+class Worker:
+    def __init__(self, setup=None):
+        self.jobs_q = mp.Queue()
+        self.result_q = mp.Queue()
+        self.ready = mp.Event()
+        self.warm_s = mp.Value('d', 0.0)
+        self.busy = False
+        self.proc = mp.Process(target=_serve, name='stravis-worker',
+                               args=(self.jobs_q, self.result_q, self.ready, self.warm_s, setup))
+        self.proc.daemon = True  # auto-kill with parent if needed
+
+    def start(self):
+        self.proc.start()
+        return self
+
+    def alive(self):
+        return self.proc.is_alive()
+
+    def kill(self):
+        try:
+            if self.proc.is_alive():
+                self.proc.terminate()
+            self.proc.join(timeout=2)
+        except Exception:
+            pass
+
+
+class WorkerPool:
+    def __init__(self, size=1, setup=None):
+        """size: idle warm workers to keep; setup: picklable callable run in each worker after its imports."""
+        self.size = size
+        self.setup = setup
+        self.workers = []
+
+    def start(self):
+        self._fill()
+        return self
+
+    def _fill(self):
+        self.workers = [w for w in self.workers if w.busy or w.alive()]
+        while sum(not w.busy for w in self.workers) < self.size:
+            self.workers.append(Worker(self.setup).start())
+
+    def ready(self):
+        """An idle worker has finished warming up."""
+        return any(not w.busy and w.ready.is_set() for w in self.workers)
+
+    def warm_seconds(self):
+        """How long the ready workers took to warm up (imports, COM, UIA client)."""
+        return max((w.warm_s.value for w in self.workers if w.ready.is_set()), default=None)
+
+    def submit(self, job):
+        """Hand `job` to an idle worker (a warm one if there is one) and return that worker."""
+        self._fill()
+        idle = [w for w in self.workers if not w.busy]
+        worker = next((w for w in idle if w.ready.is_set()), idle[0])
+        worker.busy = True
+        worker.jobs_q.put(job)
+        return worker
+
+    def release(self, worker):
+        """The worker's job is over; it waits for the next one (a dead one is replaced)."""
+        worker.busy = False
+        self._fill()
+
+    def replace(self, worker):
+        worker.kill()
+        self.workers.remove(worker)
+        self._fill()
+
+    def close(self):
+        for w in self.workers:
+            if not w.busy and w.alive():
+                w.jobs_q.put(None)
+        for w in self.workers:
+            w.proc.join(timeout=1)
+            w.kill()
+        self.workers = []